@@ -2,7 +2,6 @@
 NYC 311 Operations Dashboard - Main App
 """
 import streamlit as st
-import subprocess
 import sys
 import os
 import pandas as pd
@@ -11,14 +10,19 @@ from sqlalchemy import text
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
-from src.db import get_engine
+from src.db import get_read_engine
 from src.config import get_database_url
+from src.queries import KPI_SUMMARY_QUERY
+from src.instrumentation import checkpoint, render_debug_panel, start_run
+from src.result_cache import cached_read_sql
+from src.pipeline import run_pipeline
 
 st.set_page_config(
     page_title="NYC 311 Operations Dashboard",
     layout="wide",
     initial_sidebar_state="expanded"
 )
+start_run("app")
 
 # Custom CSS for professional dashboard look
 st.markdown("""
@@ -169,38 +173,21 @@ with st.sidebar:
     
     # Refresh Data button
     st.markdown("### Data Management")
+    stream = st.checkbox(
+        "Stream directly into the database",
+        value=False,
+        help="Fetch, validate and load in one pass: pages are written to the database while later pages "
+             "are still downloading, and no CSV file is written."
+    )
+    force = st.checkbox(
+        "Rerun unchanged steps",
+        value=False,
+        help="Steps whose inputs (fetched file, raw data checksum, SQL files) are unchanged since their "
+             "last success are skipped, and a failed refresh resumes where it stopped. Tick to rerun everything."
+    )
     if st.button("Refresh Data", type="primary", use_container_width=True):
         with st.spinner("Refreshing data... This may take a few minutes."):
             try:
-                # Step 1: Fetch data
-                st.info("**Step 1/4:** Fetching data from NYC Open Data API...")
-                result = subprocess.run(
-                    [sys.executable, "scripts/fetch_311.py", "--days", str(days)],
-                    capture_output=True,
-                    text=True,
-                    cwd=os.getcwd()
-                )
-                if result.returncode != 0:
-                    st.error(f"Error fetching data: {result.stderr}")
-                    st.stop()
-                st.success("Data fetched successfully from API")
-                
-                # Step 2: Load to Postgres
-                st.info("**Step 2/4:** Loading data into PostgreSQL database...")
-                result = subprocess.run(
-                    [sys.executable, "scripts/load_311_to_postgres.py"],
-                    capture_output=True,
-                    text=True,
-                    cwd=os.getcwd(),
-                    env=os.environ.copy()
-                )
-                if result.returncode != 0:
-                    st.error(f"Error loading data: {result.stderr}")
-                    st.stop()
-                st.success("Data loaded into raw schema")
-                
-                # Step 3: Rebuild core table
-                st.info("**Step 3/4:** Rebuilding cleaned core data table...")
                 try:
                     database_url = get_database_url()
                 except RuntimeError as e:
@@ -209,38 +196,22 @@ with st.sidebar:
                 
                 env = os.environ.copy()
                 env['DATABASE_URL'] = database_url
-                result = subprocess.run(
-                    ["psql", database_url, "-f", "sql/schema/03_create_core_311.sql"],
-                    capture_output=True,
-                    text=True,
-                    cwd=os.getcwd(),
-                    env=env
-                )
-                if result.returncode != 0:
-                    st.error(f"Error rebuilding core table: {result.stderr}")
-                    if result.stdout:
-                        st.text(result.stdout)
-                    st.stop()
-                st.success("Core table rebuilt with cleaned data")
                 
-                # Step 4: Build marts
-                st.info("**Step 4/4:** Building analytics mart tables...")
-                result = subprocess.run(
-                    ["psql", database_url, "-f", "sql/marts/00_build_all_marts.sql"],
-                    capture_output=True,
-                    text=True,
-                    cwd=os.getcwd(),
-                    env=env
-                )
-                if result.returncode != 0:
-                    st.error(f"Error building marts: {result.stderr}")
-                    if result.stdout:
-                        st.text(result.stdout)
-                    st.stop()
-                st.success("Analytics marts built successfully")
+                def report(event, stage, index, total, detail):
+                    step = f"**Step {index}/{total}:** {stage.description}"
+                    if event == 'start':
+                        st.info(f"{step}...")
+                    elif event == 'skip':
+                        st.info(f"{step}: skipped, inputs unchanged since the last run")
+                    elif event == 'done':
+                        st.success(stage.done_message)
+                    else:
+                        st.error(stage.error_message)
+                        st.text(detail)
                 
-                st.success("**Data refresh complete!** Dashboard will reload automatically.")
-                st.rerun()
+                if run_pipeline(days=days, stream=stream, force=force, env=env, on_stage=report):
+                    st.success("**Data refresh complete!** Dashboard will reload automatically.")
+                    st.rerun()
                 
             except Exception as e:
                 st.error(f"Error during refresh: {str(e)}")
@@ -249,6 +220,8 @@ with st.sidebar:
     st.markdown(f"**Current Data Range:** Last {days} days")
     st.caption("Select a different range and click Refresh to update")
 
+checkpoint("header and sidebar")
+
 # Store days in session state
 st.session_state['days'] = days
 
@@ -289,19 +262,11 @@ with col2:
 
 # Try to load and display key metrics
 try:
-    engine = get_engine()
-    query = text("""
-        SELECT 
-            SUM(total_requests) as total,
-            SUM(open_requests) as open,
-            SUM(closed_requests) as closed,
-            AVG(median_resolution_hours) as avg_resolution,
-            MIN(month) as first_month,
-            MAX(month) as last_month
-        FROM marts.kpi_monthly
-    """)
+    engine = get_read_engine()
+    query = text(KPI_SUMMARY_QUERY)
     
-    summary_df = pd.read_sql(query, engine)
+    summary_df = cached_read_sql(query, engine)
+    checkpoint("load KPI summary")
     
     if not summary_df.empty and summary_df.iloc[0]['total'] is not None and pd.notna(summary_df.iloc[0]['total']):
         st.markdown("---")
@@ -340,6 +305,8 @@ try:
                 help="Average time taken to resolve requests, measured in hours"
             )
         
+        checkpoint("KPI cards")
+        
         # Quick visualization
         st.markdown("---")
         st.markdown("## Quick Insights")
@@ -386,6 +353,7 @@ try:
             
             This metric helps track how quickly NYC agencies respond to and resolve service requests across all boroughs.
             """)
+        checkpoint("quick insights charts")
     
 except Exception as e:
     # Show helpful content even when no data
@@ -466,3 +434,5 @@ st.markdown("""
 - **Technology Stack:** PostgreSQL, Python, Streamlit, Plotly
 - **Last Updated:** Refresh data to see the most recent information
 """)
+
+render_debug_panel()
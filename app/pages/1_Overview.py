@@ -9,9 +9,16 @@ from sqlalchemy import text
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
-from src.db import get_engine
+from src.db import get_read_engine
+from src.queries import BACKLOG_BY_AGENCY_QUERY, BACKLOG_TREND_QUERY, KPI_MONTHLY_QUERY
+from src import figures, insights
+from src.config import get_trend_max_points
+from src.export import render_export
+from src.instrumentation import checkpoint, render_debug_panel, start_run
+from src.result_cache import cached_read_sql, get_data_version
 
 st.set_page_config(page_title="Overview - KPI Metrics", layout="wide")
+start_run("1_Overview")
 st.title("Overview - Key Performance Indicators")
 
 st.markdown("""
@@ -23,22 +30,14 @@ Monitor request volumes, resolution times, and performance indicators over time.
 days = st.session_state.get('days', 30)
 
 try:
-    engine = get_engine()
+    engine = get_read_engine()
     
     # Load KPI monthly data (show all available data)
-    query = text("""
-    SELECT 
-        month,
-        total_requests,
-        open_requests,
-        closed_requests,
-        median_resolution_hours,
-        p90_resolution_hours
-    FROM marts.kpi_monthly
-    ORDER BY month
-    """)
-    
-    df = pd.read_sql(query, engine)
+    query = text(KPI_MONTHLY_QUERY)
+    
+    version = get_data_version(engine)
+    df = cached_read_sql(query, engine, version=version)
+    checkpoint("load data")
     
     if df.empty:
         st.warning("No data available. Please refresh data using the sidebar.")
@@ -85,6 +84,8 @@ try:
     
     st.divider()
     
+    checkpoint("summary metrics")
+    
     # Main Charts Section
     st.markdown("## Trend Analysis")
     st.caption("Visual representation of key metrics over time")
@@ -95,28 +96,7 @@ try:
         st.markdown("### Total Requests Trend Over Time")
         st.caption("Monthly volume of service requests received")
         try:
-            import plotly.graph_objects as go
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(
-                x=df['month'],
-                y=df['total_requests'],
-                mode='lines+markers',
-                name='Total Requests',
-                line=dict(color='#2563eb', width=3),
-                marker=dict(size=8),
-                fill='tozeroy',
-                fillcolor='rgba(37, 99, 235, 0.1)'
-            ))
-            fig.update_layout(
-                xaxis_title="Month",
-                yaxis_title="Number of Requests",
-                hovermode='x unified',
-                height=400,
-                showlegend=False,
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)'
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(figures.figure('overview_total_requests', df, version), use_container_width=True)
         except ImportError:
             import matplotlib.pyplot as plt
             fig, ax = plt.subplots(figsize=(10, 5))
@@ -133,28 +113,7 @@ try:
         st.markdown("### Median Resolution Time Trend")
         st.caption("Average time to resolve requests (in hours)")
         try:
-            import plotly.graph_objects as go
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(
-                x=df['month'],
-                y=df['median_resolution_hours'],
-                mode='lines+markers',
-                name='Median Resolution Hours',
-                line=dict(color='#f59e0b', width=3),
-                marker=dict(size=8),
-                fill='tozeroy',
-                fillcolor='rgba(245, 158, 11, 0.1)'
-            ))
-            fig.update_layout(
-                xaxis_title="Month",
-                yaxis_title="Resolution Time (Hours)",
-                hovermode='x unified',
-                height=400,
-                showlegend=False,
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)'
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(figures.figure('overview_median_resolution', df, version), use_container_width=True)
         except ImportError:
             import matplotlib.pyplot as plt
             fig, ax = plt.subplots(figsize=(10, 5))
@@ -167,6 +126,21 @@ try:
             plt.tight_layout()
             st.pyplot(fig)
     
+    st.markdown("### Request Volume Over Time")
+    max_points = get_trend_max_points()
+    trend = insights.requests_trend(max_points=max_points, engine=engine)
+    if not trend.empty:
+        # The bucket is the finest that fits the data's date range
+        st.caption(f"Requests per {trend.attrs['bucket']} "
+                   f"({len(trend):,} of {trend.attrs['buckets']:,} points shown)")
+        try:
+            st.plotly_chart(figures.figure('requests_trend', trend, version, agency=None, max_points=max_points),
+                            use_container_width=True)
+        except ImportError:
+            st.line_chart(trend.set_index('period')['requests'])
+    
+    checkpoint("trend charts")
+    
     # Additional visualizations
     st.divider()
     st.markdown("## Detailed Analytics")
@@ -177,33 +151,7 @@ try:
         st.markdown("### Resolution Time Comparison")
         st.caption("Median vs 90th Percentile resolution times")
         try:
-            import plotly.graph_objects as go
-            fig = go.Figure()
-            fig.add_trace(go.Bar(
-                x=df['month'],
-                y=df['median_resolution_hours'],
-                name='Median Resolution Time',
-                marker_color='#2563eb',
-                text=df['median_resolution_hours'].round(1),
-                textposition='outside'
-            ))
-            fig.add_trace(go.Bar(
-                x=df['month'],
-                y=df['p90_resolution_hours'],
-                name='90th Percentile Resolution Time',
-                marker_color='#f59e0b',
-                text=df['p90_resolution_hours'].round(1),
-                textposition='outside'
-            ))
-            fig.update_layout(
-                barmode='group',
-                xaxis_title="Month",
-                yaxis_title="Resolution Time (Hours)",
-                height=400,
-                hovermode='x unified',
-                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(figures.figure('overview_resolution_comparison', df, version), use_container_width=True)
         except:
             st.info("Chart data unavailable")
     
@@ -211,37 +159,12 @@ try:
         st.markdown("### Request Status Over Time")
         st.caption("Open vs Closed requests comparison")
         try:
-            import plotly.graph_objects as go
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(
-                x=df['month'],
-                y=df['open_requests'],
-                mode='lines+markers',
-                name='Open Requests',
-                line=dict(color='#ef4444', width=2),
-                fill='tonexty',
-                fillcolor='rgba(239, 68, 68, 0.15)'
-            ))
-            fig.add_trace(go.Scatter(
-                x=df['month'],
-                y=df['closed_requests'],
-                mode='lines+markers',
-                name='Closed Requests',
-                line=dict(color='#10b981', width=2),
-                fill='tozeroy',
-                fillcolor='rgba(16, 185, 129, 0.15)'
-            ))
-            fig.update_layout(
-                xaxis_title="Month",
-                yaxis_title="Number of Requests",
-                height=400,
-                hovermode='x unified',
-                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(figures.figure('overview_request_status', df, version), use_container_width=True)
         except:
             st.info("Chart data unavailable")
     
+    checkpoint("detailed charts")
+    
     # Performance indicators
     st.markdown("---")
     st.markdown("## Performance Indicators")
@@ -281,6 +204,48 @@ try:
             help="Highest median resolution time observed"
         )
     
+    checkpoint("performance indicators")
+    
+    # Open backlog
+    st.markdown("---")
+    st.markdown("## Open Backlog")
+    try:
+        backlog_df = cached_read_sql(text(BACKLOG_TREND_QUERY), engine, version=version)
+        backlog_agency_df = cached_read_sql(text(BACKLOG_BY_AGENCY_QUERY), engine, version=version)
+    except Exception:
+        backlog_df = pd.DataFrame()
+    
+    if backlog_df.empty:
+        st.info("Backlog snapshots are not built yet. Refresh the data to build them.")
+    else:
+        aging_buckets = figures.AGING_BUCKETS
+        latest = backlog_df.iloc[-1]
+        st.caption(f"Requests still open at the end of each day, by age. Latest snapshot: {latest['snapshot_date']}")
+        
+        col1, col2, col3, col4 = st.columns(4)
+        for col, (bucket, (label, _)) in zip((col1, col2, col3, col4), aging_buckets.items()):
+            col.metric(f"Open {label}", f"{latest[bucket]:,.0f}")
+        
+        col1, col2 = st.columns(2)
+        try:
+            with col1:
+                st.markdown("### Backlog by Age Over Time")
+                st.plotly_chart(figures.figure('overview_backlog_by_age', backlog_df, version,
+                                               max_points=get_trend_max_points()),
+                                use_container_width=True)
+            
+            with col2:
+                st.markdown("### Current Backlog by Agency")
+                st.plotly_chart(figures.figure('overview_backlog_by_agency', backlog_agency_df, version),
+                                use_container_width=True)
+        except ImportError:
+            with col1:
+                st.area_chart(backlog_df.set_index('snapshot_date')[list(aging_buckets)])
+            with col2:
+                st.bar_chart(backlog_agency_df.set_index('agency')[list(aging_buckets)].head(15))
+    
+    checkpoint("open backlog")
+    
     # Data table
     st.divider()
     st.markdown("## Monthly KPI Data Table")
@@ -296,7 +261,13 @@ try:
         use_container_width=True,
         hide_index=True
     )
+    checkpoint("data table")
     
+    render_export('overview', df, core_filters={}, engine=engine)
+    checkpoint("export")
+
 except Exception as e:
     st.error(f"Error loading data: {str(e)}")
     st.info("Make sure Postgres is running and data has been loaded. Use the sidebar to refresh data.")
+
+render_debug_panel()
@@ -8,9 +8,16 @@ import os
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
-from src.db import get_engine
+from src.db import get_read_engine
+from src.queries import TOP_COMPLAINTS_QUERY
+from src import figures
+from src.export import render_export
+from src.figures import ALL_BOROUGHS, ALL_MONTHS
+from src.instrumentation import checkpoint, render_debug_panel, start_run
+from src.result_cache import cached_read_sql, get_data_version
 
 st.set_page_config(page_title="Complaints Analysis", layout="wide")
+start_run("2_Complaints")
 st.title("Complaints Analysis - Top Complaints by Borough")
 
 st.markdown("""
@@ -19,20 +26,14 @@ patterns and prioritize resource allocation.
 """)
 
 try:
-    engine = get_engine()
+    engine = get_read_engine()
     
     # Load all complaints data
-    query = """
-    SELECT 
-        month,
-        borough,
-        complaint_type,
-        requests
-    FROM marts.top_complaints_monthly
-    ORDER BY month DESC, borough, requests DESC
-    """
-    
-    df = pd.read_sql(query, engine)
+    query = TOP_COMPLAINTS_QUERY
+    
+    version = get_data_version(engine)
+    df = cached_read_sql(query, engine, version=version)
+    checkpoint("load data")
     
     if df.empty:
         st.warning("No data available. Please refresh data using the sidebar.")
@@ -46,7 +47,7 @@ try:
     col1, col2 = st.columns(2)
     
     with col1:
-        boroughs = ['All Boroughs'] + sorted(df['borough'].dropna().unique().tolist())
+        boroughs = [ALL_BOROUGHS] + sorted(df['borough'].dropna().unique().tolist())
         selected_borough = st.selectbox(
             "Select Borough",
             boroughs,
@@ -54,7 +55,7 @@ try:
         )
     
     with col2:
-        months = ['All Months'] + sorted(df['month'].unique(), reverse=True)
+        months = [ALL_MONTHS] + sorted(df['month'].unique(), reverse=True)
         selected_month = st.selectbox(
             "Select Month",
             months,
@@ -62,16 +63,14 @@ try:
         )
     
     # Apply filters
-    filtered_df = df.copy()
-    if selected_borough != 'All Boroughs':
-        filtered_df = filtered_df[filtered_df['borough'] == selected_borough]
-    if selected_month != 'All Months':
-        filtered_df = filtered_df[filtered_df['month'] == selected_month]
+    filtered_df = figures.filter_complaints(df, selected_borough, selected_month)
     
     if filtered_df.empty:
         st.info("No data matches the selected filters. Try selecting different options.")
         st.stop()
     
+    checkpoint("filters")
+    
     # Summary stats
     st.markdown("---")
     st.markdown("## Summary Statistics")
@@ -102,6 +101,8 @@ try:
             help="Average number of requests per complaint type"
         )
     
+    checkpoint("summary statistics")
+    
     # Display data
     st.markdown("---")
     st.markdown("## Detailed Analysis")
@@ -112,7 +113,7 @@ try:
         st.markdown("### Top Complaints Data Table")
         st.caption("Ranked list of top complaint types with request counts")
         display_df = filtered_df.copy()
-        if selected_month == 'All Months':
+        if selected_month == ALL_MONTHS:
             # Aggregate if viewing all months
             display_df = display_df.groupby(['borough', 'complaint_type'])['requests'].sum().reset_index()
             display_df = display_df.sort_values('requests', ascending=False)
@@ -128,41 +129,19 @@ try:
     with col2:
         st.markdown("### Complaints Visualization")
         st.caption("Bar chart showing top complaint types by volume")
-        # Prepare data for chart
-        chart_df = filtered_df.copy()
-        if selected_month == 'All Months':
-            # Aggregate by complaint_type if month is 'All'
-            chart_df = chart_df.groupby('complaint_type')['requests'].sum().reset_index()
-            chart_df = chart_df.sort_values('requests', ascending=False).head(15)
-            x_col = 'complaint_type'
-            y_col = 'requests'
-        else:
-            chart_df = chart_df.sort_values('requests', ascending=False).head(15)
-            x_col = 'complaint_type'
-            y_col = 'requests'
-        
         try:
-            import plotly.graph_objects as go
-            fig = go.Figure()
-            fig.add_trace(go.Bar(
-                x=chart_df[y_col],
-                y=chart_df[x_col],
-                orientation='h',
-                marker_color='#10b981',
-                text=chart_df[y_col],
-                textposition='outside',
-                texttemplate='%{text:,.0f}'
-            ))
-            fig.update_layout(
-                xaxis_title="Number of Requests",
-                yaxis_title="Complaint Type",
-                height=500,
-                showlegend=False,
-                yaxis={'categoryorder':'total ascending'}
+            st.plotly_chart(
+                figures.figure('complaints_top_types', df, version, borough=selected_borough, month=selected_month),
+                use_container_width=True
             )
-            st.plotly_chart(fig, use_container_width=True)
         except ImportError:
             import matplotlib.pyplot as plt
+            chart_df = filtered_df
+            if selected_month == ALL_MONTHS:
+                chart_df = chart_df.groupby('complaint_type')['requests'].sum().reset_index()
+            chart_df = chart_df.sort_values('requests', ascending=False).head(15)
+            x_col = 'complaint_type'
+            y_col = 'requests'
             fig, ax = plt.subplots(figsize=(10, 8))
             ax.barh(chart_df[x_col], chart_df[y_col], color='#10b981')
             ax.set_xlabel('Number of Requests', fontsize=12)
@@ -171,8 +150,10 @@ try:
             plt.tight_layout()
             st.pyplot(fig)
     
+    checkpoint("detailed analysis")
+    
     # Borough comparison if viewing all boroughs
-    if selected_borough == 'All Boroughs':
+    if selected_borough == ALL_BOROUGHS:
         st.markdown("---")
         st.markdown("## Borough Comparison")
         st.caption("Compare complaint volumes across different boroughs")
@@ -180,26 +161,23 @@ try:
         borough_summary = filtered_df.groupby('borough')['requests'].sum().sort_values(ascending=False).reset_index()
         
         try:
-            import plotly.graph_objects as go
-            fig = go.Figure()
-            fig.add_trace(go.Bar(
-                x=borough_summary['borough'],
-                y=borough_summary['requests'],
-                marker_color='#2563eb',
-                text=borough_summary['requests'],
-                textposition='outside',
-                texttemplate='%{text:,.0f}'
-            ))
-            fig.update_layout(
-                xaxis_title="Borough",
-                yaxis_title="Total Complaints",
-                height=400,
-                showlegend=False
+            st.plotly_chart(
+                figures.figure('complaints_by_borough', df, version, month=selected_month),
+                use_container_width=True
             )
-            st.plotly_chart(fig, use_container_width=True)
         except:
             st.dataframe(borough_summary, use_container_width=True, hide_index=True)
-    
+        checkpoint("borough comparison")
+    
+    render_export('complaints', display_df, core_filters={
+        'borough': None if selected_borough == ALL_BOROUGHS else selected_borough,
+        'start': None if selected_month == ALL_MONTHS else selected_month,
+        'end': None if selected_month == ALL_MONTHS else pd.Timestamp(selected_month) + pd.DateOffset(months=1),
+    }, engine=engine)
+    checkpoint("export")
+
 except Exception as e:
     st.error(f"Error loading data: {str(e)}")
     st.info("Make sure Postgres is running and data has been loaded.")
+
+render_debug_panel()
@@ -8,9 +8,17 @@ import os
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
-from src.db import get_engine
+from src.db import get_read_engine
+from src.queries import AGENCY_PERFORMANCE_QUERY
+from src import figures, insights
+from src.config import get_trend_max_points
+from src.export import render_export
+from src.figures import ALL_AGENCIES
+from src.instrumentation import checkpoint, render_debug_panel, start_run
+from src.result_cache import cached_read_sql, get_data_version
 
 st.set_page_config(page_title="Agency Performance", layout="wide")
+start_run("3_Agency_Performance")
 st.title("Agency Performance Analysis")
 
 st.markdown("""
@@ -19,21 +27,14 @@ Track request volumes, resolution times, and efficiency metrics over time.
 """)
 
 try:
-    engine = get_engine()
+    engine = get_read_engine()
     
     # Load all agency performance data
-    query = """
-    SELECT 
-        month,
-        agency,
-        requests,
-        median_resolution_hours,
-        p90_resolution_hours
-    FROM marts.agency_performance_monthly
-    ORDER BY month DESC, agency
-    """
+    query = AGENCY_PERFORMANCE_QUERY
     
-    df = pd.read_sql(query, engine)
+    version = get_data_version(engine)
+    df = cached_read_sql(query, engine, version=version)
+    checkpoint("load data")
     
     if df.empty:
         st.warning("No data available. Please refresh data using the sidebar.")
@@ -44,7 +45,7 @@ try:
     st.markdown("## Filter Options")
     st.caption("Select a specific agency to view detailed performance metrics")
     
-    agencies = ['All Agencies'] + sorted(df['agency'].dropna().unique().tolist())
+    agencies = [ALL_AGENCIES] + sorted(df['agency'].dropna().unique().tolist())
     selected_agency = st.selectbox(
         "Select Agency",
         agencies,
@@ -53,13 +54,15 @@ try:
     
     # Apply filter
     filtered_df = df.copy()
-    if selected_agency != 'All Agencies':
+    if selected_agency != ALL_AGENCIES:
         filtered_df = filtered_df[filtered_df['agency'] == selected_agency]
     
     if filtered_df.empty:
         st.info("No data matches the selected filter.")
         st.stop()
     
+    checkpoint("filters")
+    
     # Summary metrics
     st.markdown("---")
     st.markdown("## Performance Summary")
@@ -98,6 +101,8 @@ try:
             help="Average 90th percentile resolution time"
         )
     
+    checkpoint("performance summary")
+    
     # Display data
     st.markdown("---")
     st.markdown("## Performance Trends")
@@ -122,68 +127,10 @@ try:
         st.markdown("### Performance Trends Visualization")
         st.caption("Dual-axis chart showing request volume and resolution times")
         try:
-            import plotly.graph_objects as go
-            from plotly.subplots import make_subplots
-            
-            fig = make_subplots(
-                rows=2, cols=1,
-                subplot_titles=('Request Volume Over Time', 'Resolution Time Performance'),
-                vertical_spacing=0.15,
-                row_heights=[0.5, 0.5]
-            )
-            
-            # Requests chart
-            fig.add_trace(
-                go.Scatter(
-                    x=filtered_df['month'],
-                    y=filtered_df['requests'],
-                    mode='lines+markers',
-                    name='Request Volume',
-                    line=dict(color='#2563eb', width=3),
-                    marker=dict(size=8),
-                    fill='tozeroy',
-                    fillcolor='rgba(37, 99, 235, 0.15)'
-                ),
-                row=1, col=1
-            )
-            
-            # Resolution hours chart
-            fig.add_trace(
-                go.Scatter(
-                    x=filtered_df['month'],
-                    y=filtered_df['median_resolution_hours'],
-                    mode='lines+markers',
-                    name='Median Resolution',
-                    line=dict(color='#f59e0b', width=3),
-                    marker=dict(size=8)
-                ),
-                row=2, col=1
-            )
-            
-            fig.add_trace(
-                go.Scatter(
-                    x=filtered_df['month'],
-                    y=filtered_df['p90_resolution_hours'],
-                    mode='lines+markers',
-                    name='90th Percentile',
-                    line=dict(color='#ef4444', width=2, dash='dash'),
-                    marker=dict(size=6)
-                ),
-                row=2, col=1
+            st.plotly_chart(
+                figures.figure('agency_trends', df, version, agency=selected_agency),
+                use_container_width=True
             )
-            
-            fig.update_xaxes(title_text="Month", row=1, col=1)
-            fig.update_xaxes(title_text="Month", row=2, col=1)
-            fig.update_yaxes(title_text="Number of Requests", row=1, col=1)
-            fig.update_yaxes(title_text="Resolution Time (Hours)", row=2, col=1)
-            fig.update_layout(
-                height=600,
-                hovermode='x unified',
-                showlegend=True,
-                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
         except ImportError:
             import matplotlib.pyplot as plt
             fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8))
@@ -207,70 +154,55 @@ try:
             plt.tight_layout()
             st.pyplot(fig)
     
+    st.markdown("### Request Volume Over Time")
+    max_points = get_trend_max_points()
+    agency = None if selected_agency == ALL_AGENCIES else selected_agency
+    trend = insights.requests_trend(agency=agency, max_points=max_points, engine=engine)
+    if not trend.empty:
+        # The bucket is the finest that fits the data's date range
+        st.caption(f"Requests per {trend.attrs['bucket']} "
+                   f"({len(trend):,} of {trend.attrs['buckets']:,} points shown)")
+        try:
+            st.plotly_chart(figures.figure('requests_trend', trend, version, agency=agency, max_points=max_points),
+                            use_container_width=True)
+        except ImportError:
+            st.line_chart(trend.set_index('period')['requests'])
+    
+    checkpoint("performance trends")
+    
     # Agency comparison if viewing all agencies
-    if selected_agency == 'All Agencies':
+    if selected_agency == ALL_AGENCIES:
         st.markdown("---")
         st.markdown("## Agency Comparison")
         st.caption("Compare performance metrics across all agencies")
         
-        agency_summary = df.groupby('agency').agg({
-            'requests': 'sum',
-            'median_resolution_hours': 'mean'
-        }).sort_values('requests', ascending=False).head(15).reset_index()
+        agency_summary = figures.agency_volume_summary(df)
         
         col1, col2 = st.columns(2)
         
         with col1:
             st.markdown("### Top Agencies by Request Volume")
             try:
-                import plotly.graph_objects as go
-                fig = go.Figure()
-                fig.add_trace(go.Bar(
-                    x=agency_summary['requests'],
-                    y=agency_summary['agency'],
-                    orientation='h',
-                    marker_color='#2563eb',
-                    text=agency_summary['requests'],
-                    textposition='outside',
-                    texttemplate='%{text:,.0f}'
-                ))
-                fig.update_layout(
-                    xaxis_title="Total Requests",
-                    yaxis_title="Agency",
-                    height=500,
-                    showlegend=False,
-                    yaxis={'categoryorder':'total ascending'}
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(figures.figure('agency_volume', df, version), use_container_width=True)
             except:
                 st.dataframe(agency_summary[['agency', 'requests']], use_container_width=True, hide_index=True)
         
         with col2:
             st.markdown("### Agencies by Average Resolution Time")
-            resolution_summary = df.groupby('agency')['median_resolution_hours'].mean().sort_values().head(15).reset_index()
+            resolution_summary = figures.agency_resolution_summary(df)
             try:
-                import plotly.graph_objects as go
-                fig = go.Figure()
-                fig.add_trace(go.Bar(
-                    x=resolution_summary['median_resolution_hours'],
-                    y=resolution_summary['agency'],
-                    orientation='h',
-                    marker_color='#f59e0b',
-                    text=resolution_summary['median_resolution_hours'].round(1),
-                    textposition='outside',
-                    texttemplate='%{text:.1f} hrs'
-                ))
-                fig.update_layout(
-                    xaxis_title="Average Resolution Time (Hours)",
-                    yaxis_title="Agency",
-                    height=500,
-                    showlegend=False,
-                    yaxis={'categoryorder':'total ascending'}
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(figures.figure('agency_resolution', df, version), use_container_width=True)
             except:
                 st.dataframe(resolution_summary, use_container_width=True, hide_index=True)
+        checkpoint("agency comparison")
     
+    render_export('agency_performance', filtered_df, core_filters={
+        'agency': None if selected_agency == ALL_AGENCIES else selected_agency,
+    }, engine=engine)
+    checkpoint("export")
+
 except Exception as e:
     st.error(f"Error loading data: {str(e)}")
     st.info("Make sure Postgres is running and data has been loaded.")
+
+render_debug_panel()
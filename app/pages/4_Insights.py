@@ -0,0 +1,256 @@
+"""
+Insights Page - Daily Trends, Top Complaints, Borough Differences and Resolution Times
+"""
+import streamlit as st
+import pandas as pd
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.db import get_read_engine
+from src import histograms, insights
+from src.export import render_export
+from src.instrumentation import checkpoint, render_debug_panel, start_run
+
+st.set_page_config(page_title="Key Insights", layout="wide")
+start_run("4_Insights")
+st.title("Key Insights")
+
+st.markdown("""
+Daily request trends, the most frequent complaint types, borough differences and the distribution of 
+resolution times. These are the same analyses as the Key Insights notebook, served from the marts.
+""")
+
+try:
+    engine = get_read_engine()
+    
+    daily_df = insights.daily_requests(engine=engine)
+    checkpoint("load daily requests")
+    
+    if daily_df.empty:
+        st.warning("No data available. Please refresh data using the sidebar.")
+        st.stop()
+    
+    # Daily trend
+    st.markdown("---")
+    st.markdown("## Total Requests Trend Over Time")
+    st.caption(f"Daily request volume from {daily_df['day'].min()} to {daily_df['day'].max()}")
+    try:
+        import plotly.graph_objects as go
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=daily_df['day'],
+            y=daily_df['requests'],
+            mode='lines',
+            name='Requests',
+            line=dict(color='#2563eb', width=2)
+        ))
+        fig.update_layout(
+            xaxis_title="Date",
+            yaxis_title="Number of Requests",
+            height=400,
+            hovermode='x unified',
+            showlegend=False
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    except ImportError:
+        st.line_chart(daily_df.set_index('day')['requests'])
+    
+    checkpoint("daily trend chart")
+    
+    col1, col2 = st.columns(2)
+    
+    # Top complaint types
+    with col1:
+        st.markdown("### Top 10 Complaint Types")
+        top_df = insights.top_complaint_types(10, engine=engine)
+        try:
+            import plotly.graph_objects as go
+            fig = go.Figure()
+            fig.add_trace(go.Bar(
+                x=top_df['requests'],
+                y=top_df['complaint_type'],
+                orientation='h',
+                marker_color='#10b981',
+                text=top_df['requests'],
+                textposition='outside',
+                texttemplate='%{text:,.0f}'
+            ))
+            fig.update_layout(
+                xaxis_title="Number of Requests",
+                yaxis_title="Complaint Type",
+                height=450,
+                showlegend=False,
+                yaxis={'categoryorder': 'total ascending'}
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        except ImportError:
+            st.dataframe(top_df, use_container_width=True, hide_index=True)
+    
+    checkpoint("top complaint types")
+    
+    # Borough differences
+    with col2:
+        st.markdown("### Borough Differences")
+        borough_df = insights.borough_stats(engine=engine)
+        st.dataframe(
+            borough_df.style.format({
+                'total_requests': '{:,.0f}',
+                'avg_resolution_hours': '{:.2f}',
+                'median_resolution_hours': '{:.2f}'
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+        try:
+            import plotly.graph_objects as go
+            fig = go.Figure()
+            fig.add_trace(go.Bar(
+                x=borough_df['borough'],
+                y=borough_df['median_resolution_hours'],
+                marker_color='#f59e0b',
+                text=borough_df['median_resolution_hours'],
+                textposition='outside',
+                texttemplate='%{text:.1f} hrs'
+            ))
+            fig.update_layout(
+                xaxis_title="Borough",
+                yaxis_title="Median Resolution Hours",
+                height=300,
+                showlegend=False
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        except:
+            pass
+    
+    checkpoint("borough differences")
+    
+    # Resolution time distribution
+    st.markdown("---")
+    st.markdown("## Resolution Time Distribution")
+    st.caption("Closed requests in log-spaced resolution-time buckets, from the histogram mart")
+    filters_df = insights.resolution_filters(engine=engine)
+    checkpoint("load distribution filters")
+    
+    if filters_df.empty:
+        st.info("No closed requests available yet.")
+        st.stop()
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        months = sorted(filters_df['month'].unique().tolist())
+        if len(months) > 1:
+            first_month, last_month = st.select_slider(
+                "Months",
+                options=months,
+                value=(months[0], months[-1]),
+                format_func=lambda m: pd.Timestamp(m).strftime('%b %Y')
+            )
+        else:
+            first_month = last_month = months[0]
+            st.caption(f"Month: {pd.Timestamp(first_month).strftime('%b %Y')}")
+    with col2:
+        selected_agency = st.selectbox("Agency", ['All Agencies'] + sorted(filters_df['agency'].unique().tolist()))
+    with col3:
+        selected_borough = st.selectbox("Borough", ['All Boroughs'] + sorted(filters_df['borough'].unique().tolist()))
+    with col4:
+        complaint_types = (
+            filters_df.groupby('complaint_type')['requests'].sum()
+            .sort_values(ascending=False).index.tolist()
+        )
+        selected_complaint = st.selectbox("Complaint Type", ['All Complaint Types'] + complaint_types)
+    
+    hist_df = insights.resolution_histogram(
+        start=first_month,
+        end=pd.Timestamp(last_month) + pd.DateOffset(months=1),
+        agency=None if selected_agency == 'All Agencies' else selected_agency,
+        borough=None if selected_borough == 'All Boroughs' else selected_borough,
+        complaint_type=None if selected_complaint == 'All Complaint Types' else selected_complaint,
+        engine=engine
+    )
+    checkpoint("load resolution histogram")
+    
+    closed_requests = int(hist_df['requests'].sum())
+    if not closed_requests:
+        st.info("No closed requests match the selected filters.")
+        st.stop()
+    
+    median_hours, p90_hours = histograms.percentiles(hist_df, [0.5, 0.9])
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Closed Requests", f"{closed_requests:,}")
+    with col2:
+        st.metric("Mean Resolution Time", f"{histograms.mean_hours(hist_df):.2f} hrs")
+    with col3:
+        st.metric("Median Resolution Time", f"{median_hours:.2f} hrs")
+    with col4:
+        st.metric("90th Percentile", f"{p90_hours:.2f} hrs")
+    
+    # Only the buckets between the first and last non-empty one
+    nonzero = hist_df.index[hist_df['requests'] > 0]
+    shown = hist_df.loc[nonzero.min():nonzero.max()].copy()
+    shown['cdf'] = histograms.cdf(hist_df)[shown.index] * 100
+    shown['label'] = [
+        f"< {end:.3g} h" if start == 0 else (f"≥ {start:.3g} h" if end == float('inf') else f"{start:.3g}–{end:.3g} h")
+        for start, end in zip(shown['bucket_start'], shown['bucket_end'])
+    ]
+    
+    col1, col2 = st.columns(2)
+    try:
+        import plotly.graph_objects as go
+        with col1:
+            fig = go.Figure(go.Bar(
+                x=shown['label'],
+                y=shown['requests'],
+                marker_color='#2563eb',
+                hovertemplate='%{x}: %{y:,.0f} requests<extra></extra>'
+            ))
+            fig.update_layout(
+                xaxis_title="Resolution Hours (log-spaced buckets)",
+                yaxis_title="Frequency",
+                height=400,
+                showlegend=False,
+                bargap=0.05
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        with col2:
+            fig = go.Figure(go.Scatter(
+                x=shown['label'],
+                y=shown['cdf'],
+                mode='lines+markers',
+                line=dict(color='#16a34a', width=2),
+                hovertemplate='%{x}: %{y:.1f}% resolved<extra></extra>'
+            ))
+            fig.update_layout(
+                xaxis_title="Resolution Hours (log-spaced buckets)",
+                yaxis_title="Cumulative % Resolved",
+                yaxis=dict(range=[0, 100]),
+                height=400,
+                showlegend=False
+            )
+            st.plotly_chart(fig, use_container_width=True)
+    except ImportError:
+        col1.bar_chart(shown.set_index('label')['requests'])
+        col2.line_chart(shown.set_index('label')['cdf'])
+    
+    # Any percentile comes from the same bucket counts
+    percentile = st.slider("Percentile lookup", min_value=1, max_value=99, value=75)
+    hours = histograms.percentiles(hist_df, percentile / 100)[0]
+    st.markdown(f"**{percentile}%** of these requests were resolved within **{hours:,.2f} hours** ({hours / 24:,.1f} days).")
+    checkpoint("resolution distribution")
+    
+    render_export('insights', hist_df, core_filters={
+        'start': first_month,
+        'end': pd.Timestamp(last_month) + pd.DateOffset(months=1),
+        'agency': None if selected_agency == 'All Agencies' else selected_agency,
+        'borough': None if selected_borough == 'All Boroughs' else selected_borough,
+        'complaint_type': None if selected_complaint == 'All Complaint Types' else selected_complaint,
+    }, engine=engine)
+    checkpoint("export")
+
+except Exception as e:
+    st.error(f"Error loading data: {str(e)}")
+    st.info("Make sure Postgres is running and data has been loaded.")
+
+render_debug_panel()
@@ -0,0 +1,150 @@
+"""
+Map Page - Request Density Heatmap from the Grid Mart
+"""
+import streamlit as st
+import pandas as pd
+import math
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.db import get_read_engine
+from src import geo
+from src.export import render_export
+from src.instrumentation import checkpoint, render_debug_panel, start_run
+
+st.set_page_config(page_title="Request Map", layout="wide")
+start_run("5_Map")
+st.title("Request Map")
+
+st.markdown("""
+Where service requests come from. Counts are pre-aggregated into grid cells, and the grid gets finer
+as the view gets smaller, so only the cells in view are loaded.
+""")
+
+try:
+    engine = get_read_engine()
+    
+    filters_df = geo.grid_filters(engine=engine)
+    checkpoint("load filters")
+    
+    if filters_df.empty:
+        st.warning("No data available. Please refresh data using the sidebar.")
+        st.stop()
+    
+    # Filters
+    st.markdown("---")
+    st.markdown("## Filter Options")
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        view = st.selectbox("View", list(geo.VIEWS), help="Citywide or a single borough")
+    
+    with col2:
+        months = sorted(filters_df['month'].unique().tolist())
+        if len(months) > 1:
+            first_month, last_month = st.select_slider(
+                "Months",
+                options=months,
+                value=(months[0], months[-1]),
+                format_func=lambda m: pd.Timestamp(m).strftime('%b %Y')
+            )
+        else:
+            first_month = last_month = months[0]
+            st.caption(f"Month: {pd.Timestamp(first_month).strftime('%b %Y')}")
+    
+    with col3:
+        agencies = ['All Agencies'] + sorted(filters_df['agency'].unique().tolist())
+        selected_agency = st.selectbox("Agency", agencies)
+    
+    with col4:
+        complaint_types = (
+            filters_df.groupby('complaint_type')['requests'].sum()
+            .sort_values(ascending=False).index.tolist()
+        )
+        selected_complaint = st.selectbox("Complaint Type", ['All Complaint Types'] + complaint_types)
+    
+    bounds = geo.VIEWS[view]
+    cells_df = geo.grid_cells(
+        bounds,
+        start=first_month,
+        end=pd.Timestamp(last_month) + pd.DateOffset(months=1),
+        agency=None if selected_agency == 'All Agencies' else selected_agency,
+        complaint_type=None if selected_complaint == 'All Complaint Types' else selected_complaint,
+        engine=engine
+    )
+    resolution = cells_df.attrs['resolution']
+    checkpoint("load cells")
+    
+    # Summary metrics
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Requests in View", f"{cells_df['requests'].sum():,.0f}")
+    col2.metric("Grid Cells", f"{len(cells_df):,}")
+    cell_km = geo.GRID_RESOLUTIONS[resolution] * 111
+    col3.metric("Cell Size", f"~{cell_km:.1f} km" if cell_km >= 1 else f"~{cell_km * 1000:.0f} m")
+    
+    if cells_df.empty:
+        st.info("No requests match the selected filters.")
+        st.stop()
+    
+    # Map
+    st.markdown("---")
+    st.markdown("## Request Density")
+    lat_min, lat_max, lon_min, lon_max = bounds
+    try:
+        import plotly.graph_objects as go
+        # Zoom level at which the view's longitude span fills the map
+        zoom = math.log2(360 / (lon_max - lon_min)) - 1.2
+        fig = go.Figure(go.Densitymap(
+            lat=cells_df['latitude'],
+            lon=cells_df['longitude'],
+            z=cells_df['requests'],
+            radius=12 + 4 * resolution,
+            colorscale='YlOrRd',
+            colorbar=dict(title="Requests"),
+            hovertemplate='%{z:,.0f} requests<extra></extra>'
+        ))
+        fig.update_layout(
+            map=dict(
+                style='carto-positron',
+                center=dict(lat=(lat_min + lat_max) / 2, lon=(lon_min + lon_max) / 2),
+                zoom=zoom
+            ),
+            height=650,
+            margin=dict(l=0, r=0, t=0, b=0)
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    except ImportError:
+        st.map(cells_df, latitude='latitude', longitude='longitude', size='requests')
+    
+    checkpoint("map")
+    
+    # Busiest cells
+    st.markdown("### Busiest Cells")
+    busiest = cells_df.sort_values('requests', ascending=False).head(10)
+    st.dataframe(
+        busiest[['latitude', 'longitude', 'requests']].style.format({
+            'latitude': '{:.4f}',
+            'longitude': '{:.4f}',
+            'requests': '{:,.0f}'
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+    checkpoint("busiest cells")
+    
+    render_export('map', cells_df, core_filters={
+        'start': first_month,
+        'end': pd.Timestamp(last_month) + pd.DateOffset(months=1),
+        'agency': None if selected_agency == 'All Agencies' else selected_agency,
+        'complaint_type': None if selected_complaint == 'All Complaint Types' else selected_complaint,
+        'bounds': bounds,
+    }, engine=engine)
+    checkpoint("export")
+
+except Exception as e:
+    st.error(f"Error loading data: {str(e)}")
+    st.info("Make sure Postgres is running and data has been loaded.")
+
+render_debug_panel()
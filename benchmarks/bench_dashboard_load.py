@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Load test: concurrent simulated dashboard sessions on one replica.
+
+Each session is a thread driving the pages headlessly with Streamlit's
+AppTest, the way one Streamlit server runs each browser session's reruns
+on its own thread. A session opens a random page, then changes a random
+filter (selectbox, slider or month range) and reruns, for --reruns
+reruns in total. Every concurrency level runs in a fresh process and
+reports:
+- p50/p95/p99 rerun latency (AppTest.run wall time) and reruns that
+  showed an exception or st.error
+- DB connections: peak checked out at once and opened in total (SQLAlchemy
+  pool events); on Postgres also the peak server-side count from
+  pg_stat_activity
+- memory per session: growth of the process RSS over its baseline,
+  divided by the number of sessions (shared caches included)
+AppTest points a process-wide Runtime at each run while it runs, so now and
+then a concurrent rerun fails inside AppTest itself; those are counted as
+harness failures and left out of the latencies.
+    
+    python benchmarks/bench_dashboard_load.py --sessions 1,4,8,16 --reruns 20
+    python benchmarks/bench_dashboard_load.py --seed-rows 200000    # generate and build data first
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'scripts'))
+
+PAGES = [
+    "app/app.py",
+    "app/pages/1_Overview.py",
+    "app/pages/2_Complaints.py",
+    "app/pages/3_Agency_Performance.py",
+    "app/pages/4_Insights.py",
+    "app/pages/5_Map.py",
+]
+
+
+def _rss_mb():
+    """
+    Current resident set size of this process in MB (Linux; 0 elsewhere).
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def seed_database(rows, seed):
+    """
+    Generate synthetic requests and build raw, core and the marts from them.
+    """
+    from load_311_to_postgres import load_311_to_postgres
+    from src.db import publish_duckdb_replica
+    from src.marts import build_marts
+    from src.synthetic import write_synthetic
+    
+    with tempfile.TemporaryDirectory() as work_dir:
+        csv_path = os.path.join(work_dir, '311.csv')
+        write_synthetic(csv_path, rows, seed=seed)
+        load_311_to_postgres(csv_path=csv_path, build_core=True)
+    build_marts()
+    publish_duckdb_replica()
+
+
+class ConnectionStats:
+    """
+    Count pool checkouts across every engine in the process.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.opened = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+    
+    def install(self):
+        from sqlalchemy import event
+        from sqlalchemy.pool import Pool
+        event.listen(Pool, 'connect', self._connect)
+        event.listen(Pool, 'checkout', self._checkout)
+        event.listen(Pool, 'checkin', self._checkin)
+    
+    def _connect(self, *args):
+        with self.lock:
+            self.opened += 1
+    
+    def _checkout(self, *args):
+        with self.lock:
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+    
+    def _checkin(self, *args):
+        with self.lock:
+            self.in_use -= 1
+
+
+class Sampler(threading.Thread):
+    """
+    Sample the process RSS and, on Postgres, the server's connection count.
+    """
+    
+    def __init__(self, interval=0.2):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.peak_rss_mb = _rss_mb()
+        self.peak_server_connections = None
+    
+    def run(self):
+        from sqlalchemy import text
+        from src.config import get_db_backend
+        from src.db import get_read_engine
+        engine = None
+        if get_db_backend() == 'postgres':
+            # Outside the read engine's pool, so it does not count itself there
+            from sqlalchemy import create_engine
+            engine = create_engine(get_read_engine().url, pool_size=1)
+            self.peak_server_connections = 0
+        while not self.stopped.wait(self.interval):
+            self.peak_rss_mb = max(self.peak_rss_mb, _rss_mb())
+            if engine is not None:
+                with engine.connect() as conn:
+                    count = conn.execute(text(
+                        "SELECT COUNT(*) - 1 FROM pg_stat_activity WHERE datname = current_database()"
+                    )).scalar()
+                self.peak_server_connections = max(self.peak_server_connections, count)
+        if engine is not None:
+            engine.dispose()
+    
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def change_random_filter(at, rng, ranges):
+    """
+    Change one random filter on the page, if it has any.
+    
+    Buttons and checkboxes (Refresh, debug panel) are left alone.
+    
+    Args:
+        at: AppTest after a run
+        rng: random.Random
+        ranges: dict remembering each range slider's full range, per label
+    
+    Returns:
+        str: Label of the changed widget, or None
+    """
+    widgets = list(at.selectbox) + list(at.select_slider) + list(at.slider)
+    if not widgets:
+        return None
+    widget = rng.choice(widgets)
+    if widget.type == 'selectbox':
+        widget.select_index(rng.randrange(len(widget.options)))
+    elif isinstance(widget.value, (list, tuple)):
+        # AppTest only knows the formatted options, so pick among the full
+        # range and its two ends
+        lower, upper = ranges.setdefault(widget.label, tuple(widget.value))
+        widget.set_range(*rng.choice([(lower, upper), (lower, lower), (upper, upper)]))
+    else:
+        widget.set_value(rng.randint(widget.min, widget.max))
+    return widget.label
+
+
+def run_session(index, reruns, seed, think_time, latencies, errors, harness_failures):
+    from streamlit.testing.v1 import AppTest
+    
+    rng = random.Random(seed * 1000 + index)
+    apps = {}
+    ranges = {}
+    for _ in range(reruns):
+        page = rng.choice(PAGES)
+        if page in apps:
+            change_random_filter(apps[page], rng, ranges)
+        else:
+            apps[page] = AppTest.from_file(os.path.join(REPO_ROOT, page), default_timeout=120)
+        start = time.perf_counter()
+        try:
+            apps[page].run()
+        except Exception:
+            harness_failures.append(page)
+            continue
+        latencies.append(time.perf_counter() - start)
+        if apps[page].exception or apps[page].error:
+            errors.append(page)
+        if think_time:
+            time.sleep(rng.uniform(0, 2 * think_time))
+
+
+def run_level(sessions, reruns, seed, think_time):
+    """
+    Run `sessions` concurrent sessions in this process.
+    
+    Returns:
+        dict of latency, connection and memory results
+    """
+    import streamlit.testing.v1  # noqa: F401  (import cost is not per session)
+    
+    stats = ConnectionStats()
+    stats.install()
+    baseline_mb = _rss_mb()
+    sampler = Sampler()
+    sampler.start()
+    latencies, errors, harness_failures = [], [], []
+    threads = [
+        threading.Thread(
+            target=run_session, args=(i, reruns, seed, think_time, latencies, errors, harness_failures)
+        )
+        for i in range(sessions)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    sampler.stop()
+    
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        'sessions': sessions,
+        'reruns': len(latencies),
+        'errors': len(errors),
+        'harness_failures': len(harness_failures),
+        'wall_s': wall,
+        'reruns_per_s': len(latencies) / wall,
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'peak_connections': stats.peak_in_use,
+        'opened_connections': stats.opened,
+        'peak_server_connections': sampler.peak_server_connections,
+        'mb_per_session': (sampler.peak_rss_mb - baseline_mb) / sessions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the dashboard with concurrent simulated sessions")
+    parser.add_argument("--sessions", default="1,4,8", help="Comma-separated concurrency levels (default: 1,4,8)")
+    parser.add_argument("--reruns", type=int, default=20, help="Reruns per session (default: 20)")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="Mean pause between a session's reruns in seconds (default: 0)")
+    parser.add_argument("--seed", type=int, default=0, help="Interaction and data seed (default: 0)")
+    parser.add_argument("--seed-rows", type=int, default=0,
+                        help="Generate this many rows and rebuild the database first (default: use existing data)")
+    parser.add_argument("--output", default=None, help="Optional JSON output path")
+    parser.add_argument("--level", type=int, default=None, help=argparse.SUPPRESS)
+    
+    args = parser.parse_args()
+    
+    os.chdir(REPO_ROOT)
+    if args.level is not None:
+        print(json.dumps(run_level(args.level, args.reruns, args.seed, args.think_time)))
+        return
+    
+    if args.seed_rows:
+        print(f"Seeding the database with {args.seed_rows:,} synthetic rows...")
+        seed_database(args.seed_rows, args.seed)
+    
+    results = []
+    for sessions in [int(s) for s in args.sessions.split(',')]:
+        print(f"Running {sessions} concurrent session(s), {args.reruns} reruns each...")
+        # A fresh process per level, so memory and connection counts start from zero
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--level', str(sessions),
+             '--reruns', str(args.reruns), '--seed', str(args.seed), '--think-time', str(args.think_time)],
+            capture_output=True, text=True, cwd=REPO_ROOT
+        )
+        if result.returncode != 0:
+            print(result.stdout + result.stderr)
+            sys.exit(1)
+        results.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    
+    print(f"\n{'Sessions':>8} {'Reruns/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'Errors':>7} "
+          f"{'Harness':>8} {'Conns':>6} {'Opened':>7} {'Server':>7} {'MB/session':>11}")
+    print("-" * 101)
+    for r in results:
+        server = f"{r['peak_server_connections']:>7}" if r['peak_server_connections'] is not None else f"{'-':>7}"
+        print(f"{r['sessions']:>8} {r['reruns_per_s']:>9.2f} {r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} "
+              f"{r['p99_ms']:>8.0f} {r['errors']:>7} {r['harness_failures']:>8} {r['peak_connections']:>6} "
+              f"{r['opened_connections']:>7} "
+              f"{server} {r['mb_per_session']:>11.1f}")
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark decoding of API pages into typed DataFrames.
+
+Generates synthetic rows, encodes them into pages exactly as the stand-in
+server would (JSON records without null fields, or CSV), and decodes every
+page with:
+- records:        json.loads + pd.DataFrame(records), what fetch_311 used to do
+- records+typed:  the same, then coerce_raw_types, so the output matches the rest
+- json columnar:  decode_page(..., 'json') with orjson (if installed)
+- json stdlib:    decode_page(..., 'json') with the json module
+- csv arrow:      decode_page(..., 'csv'), pyarrow's CSV reader
+No network is involved, so this is the CPU cost a fast link exposes. Each
+typed result is checked against records+typed.
+    
+    python benchmarks/bench_decode.py --rows 200000 --page-size 50000 --repeat 3
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+from src import decoding
+from src.decoding import concat_pages, decode_page
+from src.socrata_stub import SocrataDataset, _records
+from src.synthetic import generate_dataframe
+from src.transform import RAW_COLUMNS, coerce_raw_types
+
+
+def make_pages(rows, page_size, seed):
+    """
+    Encode synthetic rows as JSON and CSV pages.
+    
+    Returns:
+        tuple: (list of JSON bodies, list of CSV bodies), as bytes
+    """
+    dataset = SocrataDataset(generate_dataframe(rows, seed=seed)[RAW_COLUMNS])
+    json_pages, csv_pages = [], []
+    for offset in range(0, rows, page_size):
+        page = dataset.query_frame(order='unique_key', limit=page_size, offset=offset)
+        json_pages.append(json.dumps(_records(page)).encode())
+        csv_pages.append(page.to_csv(index=False).encode())
+    return json_pages, csv_pages
+
+
+def decode_records(pages, typed):
+    all_records = []
+    for page in pages:
+        all_records.extend(json.loads(page))
+    df = pd.DataFrame(all_records)[RAW_COLUMNS]
+    return coerce_raw_types(df) if typed else df
+
+
+def decode_columnar(pages, page_format, loads=None):
+    original = decoding._loads
+    decoding._loads = loads or original
+    try:
+        return concat_pages([decode_page(page, page_format) for page in pages])
+    finally:
+        decoding._loads = original
+
+
+def same_values(expected, actual):
+    """
+    Compare two typed frames value by value, ignoring dtypes (text columns
+    are categoricals in the decoded frames).
+    """
+    for column in RAW_COLUMNS:
+        a = expected[column].astype(object).where(expected[column].notna(), None).tolist()
+        b = actual[column].astype(object).where(actual[column].notna(), None).tolist()
+        if a != b:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark decoding of Socrata API pages")
+    parser.add_argument("--rows", type=int, default=200000, help="Rows to decode (default: 200000)")
+    parser.add_argument("--page-size", type=int, default=50000, help="Rows per page (default: 50000)")
+    parser.add_argument("--seed", type=int, default=0, help="Data seed (default: 0)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per decoder, best is reported (default: 3)")
+    parser.add_argument("--output", default=None, help="Optional JSON output path")
+    
+    args = parser.parse_args()
+    
+    print(f"Encoding {args.rows:,} synthetic rows in pages of {args.page_size:,}...")
+    json_pages, csv_pages = make_pages(args.rows, args.page_size, args.seed)
+    json_mb = sum(len(p) for p in json_pages) / 1e6
+    csv_mb = sum(len(p) for p in csv_pages) / 1e6
+    print(f"JSON: {json_mb:.1f} MB, CSV: {csv_mb:.1f} MB, orjson: {'yes' if decoding._loads is not json.loads else 'no'}")
+    
+    decoders = [
+        ('records', json_mb, lambda: decode_records(json_pages, typed=False)),
+        ('records+typed', json_mb, lambda: decode_records(json_pages, typed=True)),
+        ('json columnar', json_mb, lambda: decode_columnar(json_pages, 'json')),
+        ('json stdlib', json_mb, lambda: decode_columnar(json_pages, 'json', loads=json.loads)),
+        ('csv arrow', csv_mb, lambda: decode_columnar(csv_pages, 'csv')),
+    ]
+    expected = decode_records(json_pages, typed=True)
+    
+    results = []
+    print(f"\n{'Decoder':<15} {'Seconds':>9} {'Rows/sec':>12} {'MB/sec':>8} {'Memory MB':>10} {'Speedup':>8} {'Match':>6}")
+    print("-" * 74)
+    for name, mb, decode in decoders:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            df = decode()
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        if not results:
+            baseline = best
+        match = name == 'records' or same_values(expected, df)
+        memory_mb = df.memory_usage(deep=True).sum() / 1e6
+        print(f"{name:<15} {best:>9.3f} {args.rows / best:>12,.0f} {mb / best:>8.1f} {memory_mb:>10.1f} "
+              f"{baseline / best:>7.1f}x {'✓' if match else '✗':>6}")
+        results.append({'decoder': name, 'seconds': best, 'memory_mb': memory_mb, 'match': match})
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
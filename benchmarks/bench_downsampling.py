@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark what downsampling saves on long trend charts.
+
+For synthetic request-count series at daily and hourly grain over several
+years, compares drawing every point with drawing TREND_MAX_POINTS points
+chosen by LTTB (src/timeseries.py). Reports the chart's JSON size (what
+is sent over the websocket and parsed by Plotly in the browser), the time to
+build and serialize it, and how far the downsampled series' peak is from
+the true one.
+    
+    python benchmarks/bench_downsampling.py --max-points 500
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+from src.timeseries import downsample
+
+SERIES = [
+    ('daily, 1 year', 'D', 365),
+    ('daily, 5 years', 'D', 5 * 365),
+    ('hourly, 90 days', 'h', 90 * 24),
+    ('hourly, 2 years', 'h', 2 * 365 * 24),
+]
+
+
+def make_series(freq, periods, seed=0):
+    """
+    Requests per period with a weekly cycle, slow drift, noise and rare spikes.
+    """
+    rng = np.random.default_rng(seed)
+    period = pd.date_range('2020-01-01', periods=periods, freq=freq)
+    days = (period - period[0]) / pd.Timedelta(days=1)
+    base = 1000 + 200 * np.sin(2 * np.pi * days / 7) + 0.2 * days
+    spikes = rng.random(periods) < 0.002
+    requests = rng.poisson(np.maximum(base, 1)) + spikes * rng.integers(500, 3000, periods)
+    return pd.DataFrame({'period': period, 'requests': requests})
+
+
+def chart_json(df):
+    import plotly.graph_objects as go
+    
+    fig = go.Figure(go.Scatter(x=df['period'], y=df['requests'], mode='lines'))
+    return fig.to_json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LTTB downsampling of trend charts")
+    parser.add_argument("--max-points", type=int, default=500, help="Point budget (default: 500)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repetitions (default: 5)")
+    parser.add_argument("--output", default=None, help="Optional JSON output path")
+    
+    args = parser.parse_args()
+    
+    # Import Plotly outside the timings
+    chart_json(make_series('D', 2))
+    results = []
+    for label, freq, periods in SERIES:
+        df = make_series(freq, periods)
+        row = {'series': label, 'points': len(df)}
+        modes = (('full', lambda: df), ('lttb', lambda: downsample(df, 'period', 'requests', args.max_points)))
+        for mode, prepare in modes:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                shown = prepare()
+                spec = chart_json(shown)
+            row[f'{mode}_ms'] = (time.perf_counter() - start) / args.repeat * 1000
+            row[f'{mode}_kb'] = len(spec) / 1024
+            row[f'{mode}_peak'] = int(shown['requests'].max())
+        results.append(row)
+    
+    print(f"\n{'Series':<18} {'Points':>7} {'Full KB':>8} {'LTTB KB':>8} {'Full ms':>8} {'LTTB ms':>8} "
+          f"{'Peak':>6} {'LTTB peak':>10}")
+    print("-" * 82)
+    for r in results:
+        print(f"{r['series']:<18} {r['points']:>7,} {r['full_kb']:>8.1f} {r['lttb_kb']:>8.1f} "
+              f"{r['full_ms']:>8.1f} {r['lttb_ms']:>8.1f} {r['full_peak']:>6} {r['lttb_peak']:>10}")
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
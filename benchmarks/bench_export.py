@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark the memory an export of the core rows takes.
+
+Exports every core request (or --limit of them) to CSV and Parquet two
+ways, each in a fresh process:
+- streamed:  src/export.py, a server-side cursor (chunked fetches on
+             DuckDB) and one chunk of EXPORT_CHUNK_ROWS rows in memory
+- read_sql:  the whole result read with pandas.read_sql, then written out
+Reports the peak RSS over the process's baseline after imports, the time
+and the file size. The streamed peak should stay flat as the row count
+grows; the read_sql peak grows with it.
+    
+    DB_BACKEND=duckdb python benchmarks/bench_export.py --chunk-rows 50000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+
+MODES = ['streamed', 'read_sql']
+FORMATS = ['csv', 'parquet']
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_case(mode, fmt, chunk_rows, limit):
+    """
+    Export once in this process.
+    
+    Returns:
+        dict of rows, seconds, file size and peak memory over the baseline
+    """
+    import pandas as pd
+    from sqlalchemy import text
+    from src.db import get_read_engine
+    from src.export import CORE_SCHEMA, core_rows_query, iter_query_chunks, write_chunks
+    
+    engine = get_read_engine()
+    query, params = core_rows_query()
+    if limit:
+        query = text(f"{query.text} LIMIT {int(limit)}")
+    baseline_mb = _peak_rss_mb()
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, f"export.{fmt}")
+        start = time.perf_counter()
+        if mode == 'streamed':
+            chunks = iter_query_chunks(query, params, engine=engine, chunk_rows=chunk_rows)
+        else:
+            chunks = [pd.read_sql(query, engine, params=params)]
+        rows = write_chunks(chunks, path, fmt, schema=CORE_SCHEMA)
+        seconds = time.perf_counter() - start
+        size_mb = os.path.getsize(path) / 1024 / 1024
+    return {
+        'mode': mode,
+        'format': fmt,
+        'rows': rows,
+        'seconds': seconds,
+        'file_mb': size_mb,
+        'peak_mb': _peak_rss_mb() - baseline_mb,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the memory of streamed exports")
+    parser.add_argument("--chunk-rows", type=int, default=50_000, help="Rows per chunk (default: 50000)")
+    parser.add_argument("--limit", type=int, default=0, help="Export at most this many rows (default: all)")
+    parser.add_argument("--output", default=None, help="Optional JSON output path")
+    parser.add_argument("--case", default=None, help=argparse.SUPPRESS)
+    
+    args = parser.parse_args()
+    
+    if args.case:
+        mode, fmt = args.case.split(':')
+        print(json.dumps(run_case(mode, fmt, args.chunk_rows, args.limit)))
+        return
+    
+    results = []
+    for fmt in FORMATS:
+        for mode in MODES:
+            print(f"Exporting {fmt} ({mode})...")
+            # A fresh process per case, so each peak starts from the same baseline
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--case', f"{mode}:{fmt}",
+                 '--chunk-rows', str(args.chunk_rows), '--limit', str(args.limit)],
+                capture_output=True, text=True, cwd=REPO_ROOT
+            )
+            if result.returncode != 0:
+                print(result.stdout + result.stderr)
+                sys.exit(1)
+            results.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    
+    print(f"\n{'Format':<8} {'Mode':<9} {'Rows':>11} {'Seconds':>8} {'File MB':>8} {'Peak MB':>8}")
+    print("-" * 57)
+    for r in results:
+        print(f"{r['format']:<8} {r['mode']:<9} {r['rows']:>11,} {r['seconds']:>8.1f} {r['file_mb']:>8.1f} "
+              f"{r['peak_mb']:>8.0f}")
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
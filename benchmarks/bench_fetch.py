@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Benchmark Socrata paging strategies against the local stand-in server.
+
+Starts scripts/serve_socrata_stub.py in a separate process (so the server
+does not share the GIL with the client) and fetches the same window with:
+- offset:  fetch_311_data as used by the pipeline ($offset paging, one request at a time)
+- keyset:  $where unique_key > <last key>, one request at a time
+- offset xN: $offset pages requested by N concurrent workers
+    
+    python benchmarks/bench_fetch.py --rows 200000 --page-sizes 10000,50000 --workers 2,4,8 --latency 0.05
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'scripts'))
+from fetch_311 import fetch_311_data
+from src.socrata import get_page
+
+FIELDS = ",".join([
+    "unique_key", "created_date", "closed_date", "agency",
+    "complaint_type", "descriptor", "status", "borough",
+    "incident_zip", "city", "latitude", "longitude"
+])
+
+
+def _date_filter(days):
+    start_date = datetime.now() - timedelta(days=days)
+    return f"created_date >= '{start_date.strftime('%Y-%m-%dT%H:%M:%S')}'"
+
+
+def fetch_offset(base_url, days, limit):
+    """
+    The pipeline's own fetcher.
+    """
+    df = fetch_311_data(days=days, limit=limit, base_url=base_url)
+    # Every full page is followed by one more request that comes back short or empty
+    return len(df), len(df) // limit + 1
+
+
+def fetch_keyset(base_url, days, limit):
+    """
+    Page on unique_key instead of $offset, so the server never skips rows.
+    
+    Synthetic data re-uses a few keys (see SyntheticConfig.duplicate_rate);
+    a repeat that straddles a page boundary is not fetched, so the row count
+    can come out slightly lower.
+    """
+    date_filter = _date_filter(days)
+    rows = pages = 0
+    last_key = None
+    while True:
+        where = date_filter if last_key is None else f"{date_filter} AND unique_key > {last_key}"
+        params = {"$select": FIELDS, "$where": where, "$limit": limit, "$order": "unique_key"}
+        data = get_page(base_url, params).json()
+        pages += 1
+        rows += len(data)
+        if len(data) < limit:
+            return rows, pages
+        last_key = data[-1]["unique_key"]
+
+
+def fetch_offset_concurrent(base_url, days, limit, workers):
+    """
+    Request $offset pages in waves of `workers` until a short page comes back.
+    """
+    date_filter = _date_filter(days)
+    
+    def fetch(offset):
+        params = {"$select": FIELDS, "$where": date_filter, "$limit": limit,
+                  "$offset": offset, "$order": "unique_key"}
+        return get_page(base_url, params).json()
+    
+    rows = pages = 0
+    offset = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            offsets = [offset + i * limit for i in range(workers)]
+            results = list(pool.map(fetch, offsets))
+            pages += len(results)
+            rows += sum(len(data) for data in results)
+            if any(len(data) < limit for data in results):
+                return rows, pages
+            offset += workers * limit
+
+
+def start_server(args):
+    """
+    Start the stand-in server and wait until it answers.
+    """
+    command = [
+        sys.executable, os.path.join(REPO_ROOT, 'scripts', 'serve_socrata_stub.py'),
+        '--rows', str(args.rows), '--days', str(args.days), '--seed', str(args.seed),
+        '--port', str(args.port), '--latency', str(args.latency),
+        '--throttle-rate', str(args.throttle_rate), '--error-rate', str(args.error_rate),
+        '--retry-after', '0',
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{args.port}/resource/erm2-nwe9.json"
+    deadline = time.time() + 300
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Stand-in server exited during startup")
+        try:
+            requests.get(base_url, params={"$limit": 1}, timeout=1)
+            return process, base_url
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("Stand-in server did not start within 300s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Socrata paging strategies")
+    parser.add_argument("--rows", type=int, default=200000, help="Rows served (default: 200000)")
+    parser.add_argument("--days", type=int, default=30, help="Days fetched (default: 30)")
+    parser.add_argument("--seed", type=int, default=0, help="Data and fault seed (default: 0)")
+    parser.add_argument("--port", type=int, default=8399, help="Server port (default: 8399)")
+    parser.add_argument(
+        "--page-sizes",
+        default="10000,50000",
+        help="Comma-separated $limit values (default: 10000,50000)"
+    )
+    parser.add_argument(
+        "--workers",
+        default="2,4,8",
+        help="Comma-separated concurrency levels for offset paging (default: 2,4,8)"
+    )
+    parser.add_argument("--latency", type=float, default=0.05, help="Server latency in seconds (default: 0.05)")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of 429 responses (default: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 500 responses (default: 0)")
+    parser.add_argument("--output", default=None, help="Optional JSON output path")
+    
+    args = parser.parse_args()
+    page_sizes = [int(s) for s in args.page_sizes.split(",") if s]
+    worker_counts = [int(s) for s in args.workers.split(",") if s]
+    
+    print(f"Starting stand-in server with {args.rows:,} rows...")
+    process, base_url = start_server(args)
+    results = []
+    try:
+        print(f"\n{'Strategy':<14} {'Page size':>10} {'Pages':>7} {'Rows':>10} {'Seconds':>9} {'Rows/sec':>12}")
+        print("-" * 67)
+        for limit in page_sizes:
+            runs = [('offset', lambda: fetch_offset(base_url, args.days, limit)),
+                    ('keyset', lambda: fetch_keyset(base_url, args.days, limit))]
+            runs += [(f'offset x{w}', lambda w=w: fetch_offset_concurrent(base_url, args.days, limit, w))
+                     for w in worker_counts]
+            for name, run in runs:
+                start = time.perf_counter()
+                # Progress and retry messages from the fetcher would break up the table
+                with contextlib.redirect_stdout(io.StringIO()):
+                    rows, pages = run()
+                elapsed = time.perf_counter() - start
+                print(f"{name:<14} {limit:>10,} {pages:>7,} {rows:>10,} {elapsed:>9.2f} {rows / elapsed:>12,.0f}")
+                results.append({'strategy': name, 'page_size': limit, 'pages': pages,
+                                'rows': rows, 'wall_s': elapsed})
+    finally:
+        process.terminate()
+        process.wait()
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
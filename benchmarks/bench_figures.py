@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark building the dashboard's Plotly figures against serving them from
+the figure cache.
+
+For every chart registered in src/figures.py and each of its pre-rendered
+views, times what a rerun pays to get the chart to the browser:
+- build:   build the figure from the page's DataFrame (no cache)
+- memory:  figures.figure() with the spec memoized in this process
+- shared:  figures.figure() reading the spec from RESULT_CACHE_DIR (a new
+           replica, or the first rerun after scripts/build_marts.py)
+Each includes what st.plotly_chart does with the figure (to_dict and
+to_json), since that is paid on every rerun either way.
+    
+    DB_BACKEND=duckdb python benchmarks/bench_figures.py --repeat 20
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+
+
+def _send(fig):
+    """
+    Serialize a figure the way st.plotly_chart does.
+    """
+    import plotly.io
+    import plotly.tools
+    return plotly.io.to_json(plotly.tools.return_figure_from_figure_or_data(fig, validate_figure=True),
+                             validate=False)
+
+
+def _time(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run(repeat):
+    from sqlalchemy import text
+    from src import figures
+    from src.db import get_read_engine
+    from src.instrumentation import read_sql
+    from src.result_cache import get_data_version
+    
+    engine = get_read_engine()
+    version = get_data_version(engine)
+    frames = {}
+    results = []
+    for item in figures.CHARTS.values():
+        if item.query not in frames:
+            frames[item.query] = read_sql(text(item.query), engine)
+        df = frames[item.query]
+        views = item.views(df)
+        build = _time(lambda: [_send(item.build(df, **filters)) for filters in views], repeat)
+        # Fill the memo and the shared cache
+        for filters in views:
+            figures.figure(item.name, df, version, **filters)
+        memory = _time(
+            lambda: [_send(figures.figure(item.name, df, version, **filters)) for filters in views], repeat
+        )
+        
+        def from_disk():
+            figures.clear_cache()
+            for filters in views:
+                _send(figures.figure(item.name, df, version, **filters))
+        shared = _time(from_disk, repeat)
+        results.append({
+            'chart': item.name,
+            'views': len(views),
+            'build_ms': build / len(views),
+            'memory_ms': memory / len(views),
+            'shared_ms': shared / len(views),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cached dashboard figures")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed repetitions per chart (default: 20)")
+    parser.add_argument("--output", default=None, help="Optional JSON output path")
+    
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ['RESULT_CACHE_DIR'] = cache_dir
+        results = run(args.repeat)
+    
+    print(f"\n{'Chart':<32} {'Views':>6} {'Build ms':>9} {'Memory ms':>10} {'Shared ms':>10} {'Speedup':>8}")
+    print("-" * 80)
+    for r in results:
+        print(f"{r['chart']:<32} {r['views']:>6} {r['build_ms']:>9.2f} {r['memory_ms']:>10.2f} "
+              f"{r['shared_ms']:>10.2f} {r['build_ms'] / r['memory_ms']:>7.1f}x")
+    build = sum(r['build_ms'] for r in results)
+    memory = sum(r['memory_ms'] for r in results)
+    print(f"\nOne view of every chart: {build:.1f} ms built, {memory:.1f} ms from memory")
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
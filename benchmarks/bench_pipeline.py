@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+End-to-end pipeline benchmark on synthetic data.
+
+Runs every pipeline stage for each dataset size and records wall time,
+peak RSS and rows/sec. Each stage runs in its own process so peak RSS is
+per stage. Results are written as JSON; `compare` flags regressions
+against a stored baseline.
+    
+    python benchmarks/bench_pipeline.py run --sizes 10000,100000 --output benchmarks/results/latest.json
+    python benchmarks/bench_pipeline.py compare benchmarks/results/latest.json benchmarks/baseline.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue as queue_module
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'scripts'))
+
+FETCH_FIELDS = [
+    "unique_key", "created_date", "closed_date", "agency",
+    "complaint_type", "descriptor", "status", "borough",
+    "incident_zip", "city", "latitude", "longitude"
+]
+PAGE_SIZE = 50000
+# A stage still running after this many seconds is stopped and reported as an error
+DEFAULT_STAGE_TIMEOUT_S = 3600
+
+
+def _peak_rss_mb():
+    """
+    Peak resident set size of the current process in MB.
+    
+    On Linux, ru_maxrss carries over the parent's peak into a spawned child,
+    so VmHWM from /proc is preferred where it exists.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def _json_pages(csv_path):
+    """
+    Re-encode a generated CSV as Socrata-style JSON pages (all values are strings).
+    """
+    import pandas as pd
+    df = pd.read_csv(csv_path, dtype=str)
+    pages = []
+    for offset in range(0, len(df), PAGE_SIZE):
+        page = df.iloc[offset:offset + PAGE_SIZE]
+        records = [
+            {k: v for k, v in record.items() if isinstance(v, str)}
+            for record in page.to_dict(orient='records')
+        ]
+        pages.append(json.dumps(records).encode())
+    return pages
+
+
+def stage_json_parse(ctx):
+    pages = _json_pages(ctx['csv_path'])
+    from src.decoding import concat_pages, decode_page
+    start = time.perf_counter()
+    # Same work as fetch_311_data: decode each page into typed columns, then concatenate
+    df = concat_pages([decode_page(page, 'json') for page in pages])
+    df = df[FETCH_FIELDS]
+    return time.perf_counter() - start
+
+
+def stage_csv_write(ctx):
+    import pandas as pd
+    df = pd.read_csv(ctx['csv_path'], dtype=str)
+    start = time.perf_counter()
+    df.to_csv(os.path.join(ctx['work_dir'], 'write_test.csv'), index=False)
+    return time.perf_counter() - start
+
+
+def stage_parquet_write(ctx):
+    import pandas as pd
+    df = pd.read_csv(ctx['csv_path'], dtype=str)
+    start = time.perf_counter()
+    df.to_parquet(os.path.join(ctx['work_dir'], 'write_test.parquet'), index=False)
+    return time.perf_counter() - start
+
+
+def stage_raw_load(ctx):
+    from load_311_to_postgres import load_311_to_postgres
+    from src.db import get_engine, run_sql_file
+    engine = get_engine()
+    for schema_file in ('sql/schema/01_create_schemas.sql', 'sql/schema/02_create_raw_311_table.sql'):
+        run_sql_file(os.path.join(REPO_ROOT, schema_file), engine)
+    engine.dispose()
+    start = time.perf_counter()
+    load_311_to_postgres(csv_path=ctx['csv_path'])
+    return time.perf_counter() - start
+
+
+def stage_core_build(ctx):
+    from src.db import run_sql_file
+    start = time.perf_counter()
+    run_sql_file(os.path.join(REPO_ROOT, 'sql/schema/03_create_core_311.sql'))
+    return time.perf_counter() - start
+
+
+def stage_mart_build(ctx):
+    from src.marts import build_marts
+    start = time.perf_counter()
+    build_marts()
+    return time.perf_counter() - start
+
+
+def _page_stage(page):
+    """
+    Build a stage that runs one page's dashboard queries.
+    """
+    def stage(ctx):
+        import pandas as pd
+        from sqlalchemy import text
+        from src.db import get_engine
+        from src.queries import PAGE_QUERIES
+        engine = get_engine()
+        start = time.perf_counter()
+        for query in PAGE_QUERIES[page]:
+            pd.read_sql(text(query), engine)
+        return time.perf_counter() - start
+    return stage
+
+
+def stage_page_insights(ctx):
+    from src import insights
+    from src.db import get_engine
+    engine = get_engine()
+    insights.clear_cache()
+    start = time.perf_counter()
+    insights.daily_requests(engine=engine)
+    insights.top_complaint_types(10, engine=engine)
+    insights.borough_stats(engine=engine)
+    insights.resolution_distribution(engine=engine)
+    return time.perf_counter() - start
+
+
+def stage_page_map(ctx):
+    from src import geo, result_cache
+    from src.db import get_engine
+    engine = get_engine()
+    start = time.perf_counter()
+    # Every view at every grid resolution, not only the one the page would choose
+    with result_cache.disabled():
+        geo.grid_filters(engine=engine)
+        for bounds in geo.VIEWS.values():
+            for resolution in geo.GRID_RESOLUTIONS:
+                geo.grid_cells(bounds, resolution=resolution, engine=engine)
+    return time.perf_counter() - start
+
+
+STAGES = {
+    'json_parse': stage_json_parse,
+    'csv_write': stage_csv_write,
+    'parquet_write': stage_parquet_write,
+    'raw_load': stage_raw_load,
+    'core_build': stage_core_build,
+    'mart_build': stage_mart_build,
+    'page_app': _page_stage('app'),
+    'page_1_Overview': _page_stage('1_Overview'),
+    'page_2_Complaints': _page_stage('2_Complaints'),
+    'page_3_Agency_Performance': _page_stage('3_Agency_Performance'),
+    'page_4_Insights': stage_page_insights,
+    'page_5_Map': stage_page_map,
+}
+
+
+def _run_stage_in_child(stage_name, ctx, env, queue):
+    """
+    Child process entry point: run one stage and report its timing.
+    """
+    os.environ.update(env)
+    os.chdir(REPO_ROOT)
+    # Stage output (loader progress messages) is not part of the result
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        wall = STAGES[stage_name](ctx)
+        queue.put({'wall_s': wall, 'peak_rss_mb': _peak_rss_mb()})
+    except BaseException as e:
+        queue.put({'error': f"{type(e).__name__}: {e}"})
+
+
+def run_stage(stage_name, ctx, env, timeout_s=DEFAULT_STAGE_TIMEOUT_S):
+    """
+    Run a stage in a fresh process.
+    
+    The result queue is polled, so a child that dies without reporting
+    (e.g. killed for running out of memory) or that hangs does not block
+    the run.
+    
+    Args:
+        stage_name: Key of STAGES
+        ctx: Stage context
+        env: Environment variables for the child
+        timeout_s: Seconds before the child is terminated
+    
+    Returns:
+        dict with wall_s and peak_rss_mb, or error
+    """
+    mp = multiprocessing.get_context('spawn')
+    queue = mp.Queue()
+    process = mp.Process(target=_run_stage_in_child, args=(stage_name, ctx, env, queue))
+    process.start()
+    deadline = time.monotonic() + timeout_s
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=1.0)
+        except queue_module.Empty:
+            if not process.is_alive():
+                # The child may have put its result just before exiting
+                try:
+                    result = queue.get(timeout=1.0)
+                except queue_module.Empty:
+                    result = {'error': f"stage process exited with code {process.exitcode} without a result"}
+            elif time.monotonic() > deadline:
+                process.terminate()
+                result = {'error': f"stage did not finish within {timeout_s:,.0f}s"}
+    process.join()
+    return result
+
+
+def run_benchmarks(sizes, stages, backend, database_url, seed, stage_timeout_s=DEFAULT_STAGE_TIMEOUT_S):
+    """
+    Run the selected stages for each dataset size.
+    
+    Returns:
+        dict: JSON-serializable benchmark report
+    """
+    from src.synthetic import write_synthetic
+    
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        env = {'DB_BACKEND': backend}
+        if backend == 'duckdb':
+            env['DUCKDB_PATH'] = os.path.join(work_dir, 'bench.duckdb')
+        elif database_url:
+            env['DATABASE_URL'] = database_url
+        
+        for size in sizes:
+            csv_path = os.path.join(work_dir, f'311_{size}.csv')
+            print(f"\nGenerating {size:,} rows...")
+            write_synthetic(csv_path, size, seed=seed)
+            ctx = {'csv_path': csv_path, 'work_dir': work_dir, 'rows': size}
+            
+            for stage_name in stages:
+                result = run_stage(stage_name, ctx, env, timeout_s=stage_timeout_s)
+                result.update({'stage': stage_name, 'rows': size})
+                if 'error' in result:
+                    print(f"  {stage_name:<28} ERROR {result['error']}")
+                else:
+                    result['rows_per_s'] = size / result['wall_s'] if result['wall_s'] > 0 else None
+                    print(f"  {stage_name:<28} {result['wall_s']:>8.3f}s  "
+                          f"{result['peak_rss_mb']:>8.1f} MB  {result['rows_per_s']:>12,.0f} rows/s")
+                results.append(result)
+    
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'backend': backend,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def compare_reports(current, baseline, threshold):
+    """
+    Find stages that got slower or used more memory than the baseline.
+    
+    Args:
+        current: Report dict from the current run
+        baseline: Report dict to compare against
+        threshold: Allowed relative increase (0.2 = 20%)
+    
+    Returns:
+        list of str: One message per regression
+    """
+    base = {(r['stage'], r['rows']): r for r in baseline['results'] if 'error' not in r}
+    regressions = []
+    for result in current['results']:
+        key = (result['stage'], result['rows'])
+        if key not in base:
+            continue
+        if 'error' in result:
+            regressions.append(f"{result['stage']} @ {result['rows']:,} rows: {result['error']}")
+            continue
+        for metric in ('wall_s', 'peak_rss_mb'):
+            old, new = base[key][metric], result[metric]
+            if old and new > old * (1 + threshold):
+                regressions.append(
+                    f"{result['stage']} @ {result['rows']:,} rows: {metric} "
+                    f"{old:.3f} -> {new:.3f} (+{(new / old - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NYC 311 pipeline benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    run_parser = subparsers.add_parser("run", help="Run the benchmark suite")
+    run_parser.add_argument(
+        "--sizes",
+        default="10000,100000",
+        help="Comma-separated dataset sizes (default: 10000,100000)"
+    )
+    run_parser.add_argument(
+        "--stages",
+        default=",".join(STAGES),
+        help="Comma-separated stages to run (default: all)"
+    )
+    run_parser.add_argument(
+        "--backend",
+        choices=["duckdb", "postgres"],
+        default="duckdb",
+        help="Database backend; duckdb uses a temporary file (default: duckdb)"
+    )
+    run_parser.add_argument(
+        "--database-url",
+        default=os.getenv("DATABASE_URL"),
+        help="Postgres URL for --backend postgres (default: DATABASE_URL)"
+    )
+    run_parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Synthetic data seed (default: 0)"
+    )
+    run_parser.add_argument(
+        "--output",
+        default=None,
+        help="JSON output path (default: benchmarks/results/<timestamp>.json)"
+    )
+    run_parser.add_argument(
+        "--stage-timeout",
+        type=float,
+        default=DEFAULT_STAGE_TIMEOUT_S,
+        help=f"Seconds before a stage's process is stopped (default: {DEFAULT_STAGE_TIMEOUT_S})"
+    )
+    
+    compare_parser = subparsers.add_parser("compare", help="Compare a run against a baseline")
+    compare_parser.add_argument("current", help="JSON report of the current run")
+    compare_parser.add_argument("baseline", help="JSON report to compare against")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Allowed relative increase before flagging (default: 0.2)"
+    )
+    
+    args = parser.parse_args()
+    
+    if args.command == "run":
+        sizes = [int(s) for s in args.sizes.split(",") if s]
+        stages = [s for s in args.stages.split(",") if s]
+        unknown = [s for s in stages if s not in STAGES]
+        if unknown:
+            print(f"Error: unknown stages: {', '.join(unknown)}")
+            sys.exit(1)
+        
+        report = run_benchmarks(sizes, stages, args.backend, args.database_url, args.seed,
+                                stage_timeout_s=args.stage_timeout)
+        output_path = args.output or os.path.join(
+            REPO_ROOT, 'benchmarks', 'results', f"{datetime.now():%Y%m%dT%H%M%S}.json"
+        )
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Results written to {output_path}")
+        return
+    
+    with open(args.current) as f:
+        current = json.load(f)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    
+    regressions = compare_reports(current, baseline, args.threshold)
+    if regressions:
+        print(f"✗ {len(regressions)} regression(s) over {args.threshold:.0%}:")
+        for message in regressions:
+            print(f"  - {message}")
+        sys.exit(1)
+    print(f"✓ No regressions over {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark dashboard reads while a refresh writes, with and without a replica.
+
+A writer process rebuilds every mart on the primary (get_engine()) in a
+loop, while this process runs the dashboard page queries through
+get_read_engine() and records their latency and failures:
+- primary:  no replica configured, reads go to the primary
+- replica:  reads go to the replica (DATABASE_READ_URL on Postgres; on
+            DuckDB the primary is first published to a temporary
+            DUCKDB_READ_PATH)
+On DuckDB only one process can open the primary, so reads from it and
+builds fail while the other holds the lock. On Postgres both succeed, but
+reads compete with the build.
+    
+    DB_BACKEND=duckdb python benchmarks/bench_read_split.py --duration 10
+    DATABASE_READ_URL=postgresql://...:5433/nyc311 python benchmarks/bench_read_split.py
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+from src.config import get_db_backend
+
+
+def run_writer(duration):
+    """
+    Rebuild the marts on the primary until `duration` seconds have passed.
+    """
+    from src.marts import build_marts
+    
+    builds = 0
+    failed = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        try:
+            build_marts(record=False)
+            builds += 1
+        except Exception:
+            # On DuckDB, a reader holding the primary's lock fails the build
+            failed += 1
+            time.sleep(0.01)
+    print(json.dumps({'builds': builds, 'failed_builds': failed}))
+
+
+def run_readers(duration):
+    """
+    Run the page queries on the read engine until `duration` seconds have passed.
+    
+    Returns:
+        dict with the read engine's URL, query latencies and failures
+    """
+    import pandas as pd
+    from sqlalchemy import text
+    from src.db import get_read_engine
+    from src.queries import PAGE_QUERIES
+    
+    engine = get_read_engine()
+    queries = [query for page in PAGE_QUERIES.values() for query in page]
+    latencies = []
+    failures = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        for query in queries:
+            start = time.perf_counter()
+            try:
+                pd.read_sql(text(query), engine)
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                failures += 1
+                # Lock errors return at once; do not spin
+                time.sleep(0.01)
+    return {
+        'engine': engine.url.render_as_string(hide_password=True),
+        'queries': len(latencies),
+        'failures': failures,
+        'p50_ms': float(np.percentile(latencies, 50) * 1000) if latencies else None,
+        'p95_ms': float(np.percentile(latencies, 95) * 1000) if latencies else None,
+    }
+
+
+def run_mode(duration):
+    writer = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--writer', '--duration', str(duration)],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, cwd=REPO_ROOT
+    )
+    # Let the first build start
+    time.sleep(1)
+    result = run_readers(duration)
+    stdout, stderr = writer.communicate()
+    if writer.returncode != 0:
+        print(stdout + stderr)
+        sys.exit(1)
+    result.update(json.loads(stdout.strip().splitlines()[-1]))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dashboard reads during a refresh")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per mode (default: 10)")
+    parser.add_argument("--output", default=None, help="Optional JSON output path")
+    parser.add_argument("--writer", action="store_true", help=argparse.SUPPRESS)
+    
+    args = parser.parse_args()
+    
+    os.chdir(REPO_ROOT)
+    if args.writer:
+        run_writer(args.duration)
+        return
+    
+    from src.db import publish_duckdb_replica
+    backend = get_db_backend()
+    results = {}
+    with tempfile.TemporaryDirectory() as replica_dir:
+        read_url = os.environ.pop('DATABASE_READ_URL', None)
+        os.environ.pop('DUCKDB_READ_PATH', None)
+        results['primary'] = run_mode(args.duration)
+        
+        if backend == 'duckdb':
+            os.environ['DUCKDB_READ_PATH'] = os.path.join(replica_dir, 'replica.duckdb')
+            publish_duckdb_replica()
+        elif read_url:
+            os.environ['DATABASE_READ_URL'] = read_url
+        else:
+            print("DATABASE_READ_URL is not set; skipping the replica run")
+        if backend == 'duckdb' or read_url:
+            results['replica'] = run_mode(args.duration)
+    
+    print(f"\n{'Reads from':<10} {'Builds':>7} {'Failed':>7} {'Queries':>8} {'Failed':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    print("-" * 61)
+    for mode, r in results.items():
+        p50 = f"{r['p50_ms']:>8.1f}" if r['p50_ms'] is not None else f"{'-':>8}"
+        p95 = f"{r['p95_ms']:>8.1f}" if r['p95_ms'] is not None else f"{'-':>8}"
+        print(f"{mode:<10} {r['builds']:>7} {r['failed_builds']:>7} {r['queries']:>8} {r['failures']:>7} {p50} {p95}")
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark the shared result cache across dashboard replicas.
+
+Each replica is a fresh process (so its in-memory memo is cold) that runs
+the queries of every dashboard page: the page queries, the Insights
+analyses and the Map page's grid queries. Replicas run one after another
+against the configured database:
+- no cache:  RESULT_CACHE_DIR unset, every replica queries the database
+- shared:    all replicas use one RESULT_CACHE_DIR; the first one fills it
+Reports each replica's time, database queries and cache hits.
+    
+    DB_BACKEND=duckdb python benchmarks/bench_result_cache.py --replicas 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+
+
+def run_workload():
+    """
+    Run every page's queries once, as a cold replica would.
+    
+    Returns:
+        dict with seconds, queries (sent to the database), hits and misses
+    """
+    from sqlalchemy import event, text
+    from src import geo, insights
+    from src.db import get_read_engine
+    from src.queries import PAGE_QUERIES
+    from src.result_cache import cached_read_sql, get_result_cache
+    
+    engine = get_read_engine()
+    sent = []
+    event.listen(engine, 'before_cursor_execute', lambda *args: sent.append(1))
+    start = time.perf_counter()
+    with engine.connect():
+        for page_queries in PAGE_QUERIES.values():
+            for query in page_queries:
+                cached_read_sql(text(query), engine)
+        insights.daily_requests(engine=engine)
+        insights.top_complaint_types(10, engine=engine)
+        insights.borough_stats(engine=engine)
+        insights.resolution_distribution(engine=engine)
+        insights.resolution_filters(engine=engine)
+        insights.resolution_histogram(engine=engine)
+        geo.grid_filters(engine=engine)
+        for bounds in geo.VIEWS.values():
+            geo.grid_cells(bounds, engine=engine)
+    seconds = time.perf_counter() - start
+    cache = get_result_cache()
+    stats = cache.stats() if cache is not None else {'hits': 0, 'misses': 0}
+    return {'seconds': seconds, 'queries': len(sent), 'hits': stats['hits'], 'misses': stats['misses']}
+
+
+def run_replica(cache_dir):
+    env = os.environ.copy()
+    env.pop('RESULT_CACHE_DIR', None)
+    if cache_dir:
+        env['RESULT_CACHE_DIR'] = cache_dir
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker'],
+        capture_output=True, text=True, cwd=REPO_ROOT, env=env
+    )
+    if result.returncode != 0:
+        print(result.stdout + result.stderr)
+        sys.exit(1)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shared result cache across replicas")
+    parser.add_argument("--replicas", type=int, default=4, help="Replica processes per mode (default: 4)")
+    parser.add_argument("--output", default=None, help="Optional JSON output path")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    
+    args = parser.parse_args()
+    
+    if args.worker:
+        print(json.dumps(run_workload()))
+        return
+    
+    results = {}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for mode, directory in (('no cache', None), ('shared', cache_dir)):
+            results[mode] = [run_replica(directory) for _ in range(args.replicas)]
+    
+    print(f"\n{'Mode':<10} {'Replica':>8} {'Seconds':>9} {'DB queries':>11} {'Hits':>6} {'Misses':>7}")
+    print("-" * 56)
+    for mode, replicas in results.items():
+        for i, r in enumerate(replicas, start=1):
+            print(f"{mode:<10} {i:>8} {r['seconds']:>9.3f} {r['queries']:>11} {r['hits']:>6} {r['misses']:>7}")
+    cold = sum(r['seconds'] for r in results['no cache'][1:])
+    warm = sum(r['seconds'] for r in results['shared'][1:])
+    if args.replicas > 1 and warm > 0:
+        print(f"\nReplicas after the first: {cold:.3f}s without the cache, {warm:.3f}s with it "
+              f"({cold / warm:.1f}x)")
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark the core and mart SQL builds on Postgres and DuckDB.
+
+DuckDB is benchmarked on a temporary database file loaded from the fetched
+CSV/Parquet file. Postgres is benchmarked against DATABASE_URL (or
+--postgres-url) and expects raw.nyc311_requests to be loaded already.
+    
+    python benchmarks/bench_sql_build.py --repeat 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from src.db import run_sql_file
+from src.transform import RAW_COLUMNS
+
+SCHEMA_FILES = [
+    "sql/schema/01_create_schemas.sql",
+    "sql/schema/02_create_raw_311_table.sql",
+]
+BUILD_FILES = [
+    "sql/schema/03_create_core_311.sql",
+    "sql/marts/00_build_all_marts.sql",
+]
+
+
+def prepare_duckdb(data_path, db_path):
+    """
+    Create a DuckDB file with raw.nyc311_requests loaded from data_path.
+    
+    Args:
+        data_path: Fetched .csv or .parquet file
+        db_path: DuckDB file to create
+    
+    Returns:
+        sqlalchemy.engine.Engine for the DuckDB file
+    """
+    import duckdb
+    
+    engine = create_engine(f"duckdb:///{db_path}", poolclass=NullPool)
+    for schema_file in SCHEMA_FILES:
+        run_sql_file(schema_file, engine)
+    
+    reader = "read_parquet" if data_path.endswith(".parquet") else "read_csv_auto"
+    conn = duckdb.connect(db_path)
+    try:
+        columns = ', '.join(RAW_COLUMNS)
+        conn.execute(
+            f"INSERT INTO raw.nyc311_requests ({columns}) "
+            f"SELECT DISTINCT ON (unique_key) {columns} FROM {reader}('{data_path}')"
+        )
+        rows = conn.execute("SELECT COUNT(*) FROM raw.nyc311_requests").fetchone()[0]
+    finally:
+        conn.close()
+    print(f"DuckDB raw table loaded with {rows:,} rows")
+    return engine
+
+
+def time_builds(engine, repeat):
+    """
+    Run each build file `repeat` times and collect wall times.
+    
+    Args:
+        engine: SQLAlchemy engine
+        repeat: Number of runs per file
+    
+    Returns:
+        dict mapping file path to list of durations in seconds
+    """
+    timings = {path: [] for path in BUILD_FILES}
+    for _ in range(repeat):
+        for path in BUILD_FILES:
+            start = time.perf_counter()
+            run_sql_file(path, engine)
+            timings[path].append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare core/mart SQL build times on Postgres and DuckDB"
+    )
+    parser.add_argument(
+        "--data",
+        default="data/raw/311.csv",
+        help="Fetched data file used for the DuckDB run (default: data/raw/311.csv)"
+    )
+    parser.add_argument(
+        "--postgres-url",
+        default=os.getenv("DATABASE_URL"),
+        help="Postgres URL with raw data loaded (default: DATABASE_URL)"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Runs per build file (default: 3)"
+    )
+    
+    args = parser.parse_args()
+    
+    results = {}
+    
+    if os.path.exists(args.data):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            engine = prepare_duckdb(args.data, os.path.join(tmp_dir, "bench.duckdb"))
+            results["duckdb"] = time_builds(engine, args.repeat)
+            engine.dispose()
+    else:
+        print(f"Skipping DuckDB: data file not found at {args.data}")
+    
+    if args.postgres_url and not args.postgres_url.startswith("duckdb"):
+        engine = create_engine(args.postgres_url)
+        results["postgres"] = time_builds(engine, args.repeat)
+        engine.dispose()
+    else:
+        print("Skipping Postgres: no DATABASE_URL / --postgres-url given")
+    
+    if not results:
+        sys.exit(1)
+    
+    print(f"\n{'Build file':<40} {'Engine':<10} {'Median (s)':>11} {'Min (s)':>9}")
+    for path in BUILD_FILES:
+        for backend, timings in results.items():
+            runs = timings[path]
+            print(f"{path:<40} {backend:<10} {statistics.median(runs):>11.3f} {min(runs):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
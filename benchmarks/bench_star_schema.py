@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Compare the wide core table with the star schema (fact + dimensions).
+
+"Before" is the core table as it used to be built (every text column
+repeated on every row) with the marts grouping on those text columns.
+"After" is core.fact_requests plus core.dim_* with the marts in
+sql/marts/00_build_all_marts.sql. Reports storage size and mart build time.
+
+DuckDB runs on a temporary file loaded from --data; sizes are measured by
+copying each variant's tables into an empty database file. Postgres runs
+against --postgres-url (raw data already loaded) and uses
+pg_total_relation_size, indexes included.
+    
+    python benchmarks/bench_star_schema.py --data data/synthetic/311_1000000.parquet --repeat 3
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine, text
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from src.db import run_sql_file
+from bench_sql_build import prepare_duckdb
+
+CORE_FILE = "sql/schema/03_create_core_311.sql"
+MARTS_FILE = "sql/marts/00_build_all_marts.sql"
+
+STAR_TABLES = [
+    "core.fact_requests", "core.dim_agency", "core.dim_complaint_type",
+    "core.dim_descriptor", "core.dim_status", "core.dim_borough", "core.dim_city",
+]
+WIDE_TABLE = "core.bench_wide"
+
+# The pre-star-schema core table and marts, grouping on repeated text columns
+WIDE_BUILD = [
+    f"DROP TABLE IF EXISTS {WIDE_TABLE}",
+    f"CREATE TABLE {WIDE_TABLE} AS SELECT * FROM core.requests_clean",
+    f"CREATE INDEX idx_bench_wide_created_date ON {WIDE_TABLE}(created_date)",
+    f"CREATE INDEX idx_bench_wide_complaint_type ON {WIDE_TABLE}(complaint_type)",
+    f"CREATE INDEX idx_bench_wide_borough ON {WIDE_TABLE}(borough)",
+]
+WIDE_MARTS = [
+    f"""CREATE TABLE marts.bench_kpi AS
+    SELECT DATE_TRUNC('month', created_date)::DATE AS month, COUNT(*) AS total_requests,
+        COUNT(*) FILTER (WHERE closed_date IS NULL) AS open_requests,
+        COUNT(*) FILTER (WHERE closed_date IS NOT NULL) AS closed_requests,
+        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY resolution_hours)
+            FILTER (WHERE closed_date IS NOT NULL) AS median_resolution_hours,
+        PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY resolution_hours)
+            FILTER (WHERE closed_date IS NOT NULL) AS p90_resolution_hours
+    FROM {WIDE_TABLE} GROUP BY 1 ORDER BY month""",
+    f"""CREATE TABLE marts.bench_top AS
+    WITH ranked AS (
+        SELECT DATE_TRUNC('month', created_date)::DATE AS month, borough, complaint_type,
+            COUNT(*) AS requests,
+            ROW_NUMBER() OVER (PARTITION BY DATE_TRUNC('month', created_date)::DATE, borough
+                               ORDER BY COUNT(*) DESC) AS rank
+        FROM {WIDE_TABLE} GROUP BY 1, 2, 3
+    )
+    SELECT month, borough, complaint_type, requests FROM ranked WHERE rank <= 10
+    ORDER BY month, borough, requests DESC""",
+    f"""CREATE TABLE marts.bench_agency AS
+    SELECT DATE_TRUNC('month', created_date)::DATE AS month, agency, COUNT(*) AS requests,
+        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY resolution_hours)
+            FILTER (WHERE closed_date IS NOT NULL) AS median_resolution_hours,
+        PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY resolution_hours)
+            FILTER (WHERE closed_date IS NOT NULL) AS p90_resolution_hours
+    FROM {WIDE_TABLE} GROUP BY 1, 2 ORDER BY month, agency""",
+    f"""CREATE TABLE marts.bench_daily AS
+    SELECT created_date::DATE AS day, borough, agency, complaint_type, COUNT(*) AS requests,
+        COUNT(*) FILTER (WHERE closed_date IS NOT NULL) AS closed_requests,
+        SUM(resolution_hours) FILTER (WHERE closed_date IS NOT NULL) AS total_resolution_hours
+    FROM {WIDE_TABLE} GROUP BY 1, 2, 3, 4 ORDER BY day, borough, agency, complaint_type""",
+]
+WIDE_MART_TABLES = ["marts.bench_kpi", "marts.bench_top", "marts.bench_agency", "marts.bench_daily"]
+
+
+def build_wide_marts(engine):
+    with engine.begin() as conn:
+        for table in WIDE_MART_TABLES:
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {table}")
+        for statement in WIDE_MARTS:
+            conn.exec_driver_sql(statement)
+
+
+def time_marts(engine, repeat):
+    """
+    Median mart build time for the wide and the star variants.
+    """
+    wide, star = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build_wide_marts(engine)
+        wide.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        run_sql_file(MARTS_FILE, engine)
+        star.append(time.perf_counter() - start)
+    return statistics.median(wide), statistics.median(star)
+
+
+def duckdb_size_mb(db_path, tables, tmp_dir, label):
+    """
+    Size of a DuckDB file holding only the given tables (data, no indexes).
+    """
+    import duckdb
+    copy_path = os.path.join(tmp_dir, f"{label}.duckdb")
+    conn = duckdb.connect(db_path)
+    try:
+        conn.execute(f"ATTACH '{copy_path}' AS size_check")
+        for table in tables:
+            conn.execute(f"CREATE TABLE size_check.{table.replace('.', '_')} AS SELECT * FROM {table}")
+        conn.execute("DETACH size_check")
+    finally:
+        conn.close()
+    return os.path.getsize(copy_path) / 1024 / 1024
+
+
+def postgres_size_mb(engine, tables):
+    with engine.connect() as conn:
+        return sum(
+            conn.execute(text("SELECT pg_total_relation_size(CAST(:t AS regclass))"), {"t": t}).scalar()
+            for t in tables
+        ) / 1024 / 1024
+
+
+def run_backend(engine, repeat, size_fn):
+    run_sql_file(CORE_FILE, engine)
+    with engine.begin() as conn:
+        for statement in WIDE_BUILD:
+            conn.exec_driver_sql(statement)
+    wide_s, star_s = time_marts(engine, repeat)
+    result = {
+        'wide_mb': size_fn([WIDE_TABLE], 'wide'),
+        'star_mb': size_fn(STAR_TABLES, 'star'),
+        'wide_marts_s': wide_s,
+        'star_marts_s': star_s,
+    }
+    with engine.begin() as conn:
+        for table in WIDE_MART_TABLES + [WIDE_TABLE]:
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {table}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare wide core vs star schema size and mart build time"
+    )
+    parser.add_argument(
+        "--data",
+        default="data/raw/311.csv",
+        help="Fetched data file used for the DuckDB run (default: data/raw/311.csv)"
+    )
+    parser.add_argument(
+        "--postgres-url",
+        default=os.getenv("DATABASE_URL"),
+        help="Postgres URL with raw data loaded (default: DATABASE_URL)"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Mart builds per variant (default: 3)"
+    )
+    
+    args = parser.parse_args()
+    
+    results = {}
+    if os.path.exists(args.data):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "bench.duckdb")
+            engine = prepare_duckdb(args.data, db_path)
+            results["duckdb"] = run_backend(
+                engine, args.repeat,
+                lambda tables, label: duckdb_size_mb(db_path, tables, tmp_dir, label)
+            )
+            engine.dispose()
+    else:
+        print(f"Skipping DuckDB: data file not found at {args.data}")
+    
+    if args.postgres_url and not args.postgres_url.startswith("duckdb"):
+        engine = create_engine(args.postgres_url)
+        results["postgres"] = run_backend(
+            engine, args.repeat, lambda tables, label: postgres_size_mb(engine, tables)
+        )
+        engine.dispose()
+    else:
+        print("Skipping Postgres: no DATABASE_URL / --postgres-url given")
+    
+    if not results:
+        sys.exit(1)
+    
+    print(f"\n{'Engine':<10} {'Core MB (wide -> star)':>24} {'Marts s (wide -> star)':>24}")
+    for backend, r in results.items():
+        print(f"{backend:<10} {r['wide_mb']:>10.1f} -> {r['star_mb']:<10.1f} "
+              f"{r['wide_marts_s']:>10.3f} -> {r['star_marts_s']:<10.3f}")
+
+
+if __name__ == "__main__":
+    main()
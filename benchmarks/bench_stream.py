@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark the file-based refresh against the streaming one.
+
+Starts the local Socrata stand-in (see bench_fetch.py) and loads the same
+window into a temporary DuckDB file twice:
+- file:   fetch_311_data, write data/raw/311.csv, load_311_to_postgres
+- stream: stream_311 (fetchers and the database writer overlap)
+The streaming run also includes the data-quality checks, which the file
+run leaves out, so its advantage is if anything understated.
+    
+    python benchmarks/bench_stream.py --rows 200000 --page-size 10000 --workers 4 --latency 0.2
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'scripts'))
+sys.path.insert(0, os.path.dirname(__file__))
+from bench_fetch import start_server
+
+
+def run_file(base_url, days, limit):
+    """
+    Fetch to CSV, then load the CSV, timing each step.
+    """
+    from fetch_311 import fetch_311_data
+    from load_311_to_postgres import load_311_to_postgres
+    
+    timings = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        csv_path = os.path.join(work_dir, '311.csv')
+        start = time.perf_counter()
+        df = fetch_311_data(days=days, limit=limit, base_url=base_url)
+        timings['fetch_s'] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        df.to_csv(csv_path, index=False)
+        timings['write_file_s'] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        load_311_to_postgres(csv_path=csv_path)
+        timings['load_s'] = time.perf_counter() - start
+    timings['wall_s'] = sum(timings.values())
+    return timings
+
+
+def run_stream(base_url, days, limit, workers, queue_size):
+    """
+    Stream the same window straight into the database.
+    """
+    from stream_311 import stream_311
+    
+    start = time.perf_counter()
+    stream_311(days=days, limit=limit, base_url=base_url, workers=workers, queue_size=queue_size)
+    return {'wall_s': time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the file-based and streaming refresh")
+    parser.add_argument("--rows", type=int, default=200000, help="Rows served (default: 200000)")
+    parser.add_argument("--days", type=int, default=30, help="Days fetched (default: 30)")
+    parser.add_argument("--seed", type=int, default=0, help="Data and fault seed (default: 0)")
+    parser.add_argument("--port", type=int, default=8399, help="Server port (default: 8399)")
+    parser.add_argument("--page-size", type=int, default=10000, help="$limit per page (default: 10000)")
+    parser.add_argument("--workers", type=int, default=4, help="Streaming fetchers (default: 4)")
+    parser.add_argument("--queue-size", type=int, default=8, help="Streaming queue size (default: 8)")
+    parser.add_argument("--latency", type=float, default=0.2, help="Server latency in seconds (default: 0.2)")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of 429 responses (default: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 500 responses (default: 0)")
+    parser.add_argument("--output", default=None, help="Optional JSON output path")
+    
+    args = parser.parse_args()
+    
+    os.chdir(REPO_ROOT)
+    print(f"Starting stand-in server with {args.rows:,} rows...")
+    process, base_url = start_server(args)
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as db_dir:
+            os.environ['DB_BACKEND'] = 'duckdb'
+            runs = [
+                ('file', lambda: run_file(base_url, args.days, args.page_size)),
+                ('stream', lambda: run_stream(base_url, args.days, args.page_size, args.workers, args.queue_size)),
+            ]
+            for name, run in runs:
+                # A fresh database per run, so neither sees the other's rows as unchanged
+                os.environ['DUCKDB_PATH'] = os.path.join(db_dir, f'{name}.duckdb')
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results[name] = run()
+    finally:
+        process.terminate()
+        process.wait()
+    
+    print(f"\n{'Refresh':<8} {'Fetch':>8} {'Write file':>11} {'Load':>8} {'Total':>8}")
+    print("-" * 47)
+    for name, timings in results.items():
+        cells = [f"{timings[k]:>{w}.2f}" if k in timings else f"{'-':>{w}}"
+                 for k, w in (('fetch_s', 8), ('write_file_s', 11), ('load_s', 8), ('wall_s', 8))]
+        print(f"{name:<8} {' '.join(cells)}")
+    print(f"\nStreaming speedup: {results['file']['wall_s'] / results['stream']['wall_s']:.2f}x")
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+#!/bin/bash
+# Let the read replica (the postgres-replica service) stream WAL from this
+# server. Runs once, when the primary's data volume is initialized.
+set -e
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
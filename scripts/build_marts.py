@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Build the marts registered in src/marts.py, independent marts in parallel.
+    
+    python scripts/build_marts.py                      # every mart, 4 at a time
+    python scripts/build_marts.py --only kpi_monthly   # one mart (and its dependencies)
+    python scripts/build_marts.py --write-sql          # regenerate 00_build_all_marts.sql
+
+On DuckDB with DUCKDB_READ_PATH set, the database is then copied to the
+dashboard's read replica (--no-publish skips that). With RESULT_CACHE_DIR
+set, the dashboard's common chart views are pre-rendered into the result
+cache for the new data version (see src/figures.py); --no-prerender skips
+that.
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from src.config import get_db_backend
+from src.db import get_engine, publish_duckdb_replica
+from src.marts import COMBINED_SQL_FILE, DEFAULT_WORKERS, MARTS, build_marts, combined_sql
+from src.result_cache import get_result_cache
+
+
+def write_combined_sql(check=False):
+    """
+    Write the combined mart SQL file from the registry.
+    
+    Args:
+        check: Only report whether the file is up to date
+    
+    Returns:
+        bool: True if the file was (or already is) up to date
+    """
+    sql = combined_sql()
+    current = None
+    if os.path.exists(COMBINED_SQL_FILE):
+        with open(COMBINED_SQL_FILE) as f:
+            current = f.read()
+    if check:
+        if current != sql:
+            print(f"✗ {COMBINED_SQL_FILE} is out of date; run scripts/build_marts.py --write-sql")
+            return False
+        print(f"✓ {COMBINED_SQL_FILE} matches the mart registry")
+        return True
+    # The repository's SQL files use CRLF line endings
+    with open(COMBINED_SQL_FILE, 'w', newline='\r\n') as f:
+        f.write(sql)
+    print(f"✓ Wrote {COMBINED_SQL_FILE} ({len(MARTS)} marts)")
+    return True
+
+
+def run_build(names=None, workers=DEFAULT_WORKERS, prerender=True, publish=True):
+    """
+    Build the marts and print each mart's build time.
+    
+    Args:
+        names: Marts to build (default: all)
+        workers: Marts built at the same time
+        prerender: Pre-render the dashboard's charts when RESULT_CACHE_DIR is set
+        publish: Copy the database to DUCKDB_READ_PATH when it is set
+    """
+    try:
+        backend = get_db_backend()
+        engine = get_engine()
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    def report(event, mart, seconds):
+        if event == 'done':
+            print(f"  ✓ {mart.name:<30} {seconds:>7.2f}s")
+        elif event == 'fail':
+            print(f"  ✗ {mart.name:<30} failed")
+    
+    print(f"Building marts on {backend} with {workers} worker(s)...")
+    start = time.perf_counter()
+    try:
+        timings = build_marts(names, workers=workers, engine=engine, on_mart=report)
+    except (RuntimeError, ValueError) as e:
+        engine.dispose()
+        print(f"\nError: {e}")
+        sys.exit(1)
+    wall = time.perf_counter() - start
+    
+    print(f"\n✓ Built {len(timings)} marts in {wall:.2f}s "
+          f"({sum(timings.values()):.2f}s summed over marts)")
+    
+    if publish:
+        try:
+            read_path = publish_duckdb_replica()
+        except Exception as e:
+            print(f"\nError publishing the read replica: {e}")
+            sys.exit(1)
+        if read_path:
+            print(f"✓ Published the read replica at {read_path}")
+    
+    if prerender and get_result_cache() is not None:
+        from src import figures
+        start = time.perf_counter()
+        try:
+            rendered = figures.prerender(engine)
+            print(f"✓ Pre-rendered {rendered} chart views in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            # The dashboard builds them on first use instead
+            print(f"✗ Could not pre-render charts: {e}")
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the analytics marts, independent marts in parallel"
+    )
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=list(MARTS),
+        default=None,
+        metavar="MART",
+        help="Build only these marts and the marts they depend on"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Marts built at the same time, each on its own connection (default: {DEFAULT_WORKERS})"
+    )
+    parser.add_argument(
+        "--write-sql",
+        action="store_true",
+        help=f"Regenerate {COMBINED_SQL_FILE} from the registry instead of building"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help=f"Exit non-zero if {COMBINED_SQL_FILE} does not match the registry"
+    )
+    
+    parser.add_argument(
+        "--no-prerender",
+        action="store_true",
+        help="Do not pre-render the dashboard's charts into RESULT_CACHE_DIR after the build"
+    )
+    parser.add_argument(
+        "--no-publish",
+        action="store_true",
+        help="Do not copy the database to DUCKDB_READ_PATH afterwards (the pipeline publishes once at the end)"
+    )
+    
+    args = parser.parse_args()
+    
+    if args.write_sql or args.check:
+        if not write_combined_sql(check=args.check):
+            sys.exit(1)
+        return
+    run_build(args.only, workers=args.workers, prerender=not args.no_prerender, publish=not args.no_publish)
+
+
+if __name__ == "__main__":
+    main()
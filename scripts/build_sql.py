@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Run SQL build files (schema, core, marts) against the configured database.
+
+Works for both backends, so `psql` is not required:
+    python scripts/build_sql.py sql/schema/03_create_core_311.sql
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from src.config import get_db_backend
+from src.db import get_engine, run_sql_file
+
+
+def build_sql(paths):
+    """
+    Execute each SQL file in order, stopping at the first failure.
+    
+    Args:
+        paths: List of .sql file paths
+    """
+    try:
+        backend = get_db_backend()
+        engine = get_engine()
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    for path in paths:
+        if not os.path.exists(path):
+            print(f"Error: SQL file not found at {path}")
+            sys.exit(1)
+        
+        print(f"Running {path} on {backend}...", end=" ", flush=True)
+        start = time.perf_counter()
+        try:
+            run_sql_file(path, engine)
+        except Exception as e:
+            print(f"\nError running {path}: {e}")
+            sys.exit(1)
+        print(f"done in {time.perf_counter() - start:.2f}s")
+    
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run SQL build files against the configured database"
+    )
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help="SQL files to execute in order"
+    )
+    
+    args = parser.parse_args()
+    build_sql(args.paths)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Check the incremental open-backlog mart (marts.backlog_daily).
+
+Builds the mart twice in a row. The first build takes in any pending
+changes; the second sees none and must leave every snapshot unchanged.
+Then checks that the latest snapshot counts exactly the requests in the
+current load window that were open at the end of that day, so requests
+that left the window are no longer counted as open.
+"""
+import argparse
+import os
+import sys
+import pandas as pd
+from sqlalchemy import text
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from src.db import get_engine
+from src.marts import build_marts
+
+SNAPSHOTS_QUERY = """
+    SELECT *
+    FROM marts.backlog_daily
+    ORDER BY snapshot_date, agency, borough, complaint_type
+"""
+
+# Open at the end of the latest snapshot day, from the fact alone
+LATEST_OPEN_QUERY = """
+    SELECT
+        (SELECT SUM(open_requests) FROM marts.backlog_daily
+         WHERE snapshot_date = s.snapshot_date) AS snapshot_open,
+        (SELECT COUNT(*) FROM core.fact_requests f
+         WHERE f.created_date < CAST(s.snapshot_date + 1 AS TIMESTAMP)
+           AND (f.closed_date IS NULL OR f.closed_date >= CAST(s.snapshot_date + 1 AS TIMESTAMP))) AS fact_open,
+        s.snapshot_date
+    FROM (SELECT MAX(snapshot_date) AS snapshot_date FROM marts.backlog_daily) s
+"""
+
+
+def check_backlog(engine=None):
+    """
+    Rebuild the backlog mart without changes and compare the snapshots.
+    
+    Args:
+        engine: SQLAlchemy engine (default: get_engine())
+    
+    Returns:
+        bool: True when both checks pass
+    """
+    engine = engine or get_engine()
+    ok = True
+    
+    print("Building backlog_daily to take in pending changes...")
+    build_marts(['backlog_daily'], engine=engine)
+    before = pd.read_sql(text(SNAPSHOTS_QUERY), engine)
+    
+    print("Building backlog_daily again with no changes...")
+    # Not recorded: the data is unchanged, so the dashboard's caches stay valid
+    build_marts(['backlog_daily'], engine=engine, record=False)
+    after = pd.read_sql(text(SNAPSHOTS_QUERY), engine)
+    with engine.connect() as conn:
+        changes = conn.execute(text("SELECT COUNT(*) FROM ops.backlog_changes")).scalar()
+    
+    if changes:
+        print(f"✗ Second build still found {changes:,} changed requests")
+        ok = False
+    if before.equals(after):
+        print(f"✓ {len(after):,} snapshot rows unchanged by a build with no changes")
+    else:
+        merged = before.merge(after, how='outer', indicator=True)
+        differing = merged[merged['_merge'] != 'both']
+        print(f"✗ A build with no changes rewrote {len(differing):,} snapshot rows, e.g.:")
+        print(differing.head(10).to_string(index=False))
+        ok = False
+    
+    latest = pd.read_sql(text(LATEST_OPEN_QUERY), engine).iloc[0]
+    if pd.isna(latest['snapshot_date']):
+        print("✗ marts.backlog_daily is empty")
+        return False
+    snapshot_open = int(latest['snapshot_open'])
+    fact_open = int(latest['fact_open'])
+    if snapshot_open == fact_open:
+        print(f"✓ Latest snapshot ({latest['snapshot_date']}) counts the {fact_open:,} open requests in the load window")
+    else:
+        print(f"✗ Latest snapshot ({latest['snapshot_date']}) counts {snapshot_open:,} open requests, "
+              f"the load window has {fact_open:,}")
+        ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check that the open-backlog mart is stable and matches the load window"
+    )
+    parser.parse_args()
+    
+    try:
+        ok = check_backlog()
+    except Exception as e:
+        print(f"\n✗ Could not check the backlog: {e}")
+        sys.exit(1)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Check that src/transform.py produces the same rows as the core SQL build.
+
+Runs the vectorized transform over the fetched file and compares it with
+core.requests_clean as built by 03_create_core_311.sql.
+"""
+import argparse
+import os
+import sys
+import pandas as pd
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from src.db import get_engine
+from src.transform import CORE_COLUMNS, clean_requests
+
+
+def check_core_parity(csv_path="data/raw/311.csv"):
+    """
+    Compare the transform output with the core table.
+    
+    Args:
+        csv_path: Fetched data file (.csv or .parquet) that was loaded to raw
+    
+    Returns:
+        bool: True when both sides match
+    """
+    if csv_path.endswith('.parquet'):
+        df = pd.read_parquet(csv_path)
+    else:
+        df = pd.read_csv(csv_path, dtype={'incident_zip': str})
+    
+    # Same preparation as the loader: parse dates, keep the latest duplicate
+    df['created_date'] = pd.to_datetime(df['created_date'], errors='coerce')
+    df['closed_date'] = pd.to_datetime(df['closed_date'], errors='coerce')
+    df = df.drop_duplicates(subset='unique_key', keep='last')
+    
+    expected = clean_requests(df).sort_values('unique_key').reset_index(drop=True)
+    actual = pd.read_sql(
+        f"SELECT {', '.join(CORE_COLUMNS)} FROM core.requests_clean ORDER BY unique_key",
+        get_engine()
+    )
+    
+    print(f"Transform rows: {len(expected):,}  Core table rows: {len(actual):,}")
+    if len(expected) != len(actual):
+        return False
+    
+    mismatched = []
+    for column in CORE_COLUMNS:
+        left = expected[column]
+        right = actual[column]
+        if column == 'resolution_hours':
+            right = pd.to_numeric(right).astype('float64')
+            same = ((left - right).abs() < 1e-6) | (left.isna() & right.isna())
+        elif column in ('created_date', 'closed_date'):
+            # Both databases store timestamps with microsecond precision
+            left = left.dt.floor('us')
+            right = pd.to_datetime(right)
+            same = (left == right) | (left.isna() & right.isna())
+        else:
+            same = (left.astype('string') == right.astype('string')).fillna(False)
+            same = same | (left.isna() & right.isna())
+        if not same.all():
+            mismatched.append(f"{column} ({(~same).sum():,} rows)")
+    
+    if mismatched:
+        print(f"Mismatched columns: {', '.join(mismatched)}")
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the Python core transform with the SQL core table"
+    )
+    parser.add_argument(
+        "--path",
+        default="data/raw/311.csv",
+        help="Fetched data file, .csv or .parquet (default: data/raw/311.csv)"
+    )
+    
+    args = parser.parse_args()
+    
+    if check_core_parity(args.path):
+        print("\n✓ Transform output matches core.requests_clean")
+    else:
+        print("\n✗ Transform output differs from core.requests_clean")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Validate fetched NYC 311 data in one streaming pass and record the results.
+
+Results are appended to ops.data_quality. The script exits with status 1
+when any threshold fails, so the refresh stops before loading bad data.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+import pandas as pd
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from src.db import get_engine
+from src.quality import (
+    DataQualityCheck, count_file_duplicates, failed_thresholds, get_thresholds, record_results
+)
+
+
+def iter_raw_batches(path, chunksize=50000):
+    """
+    Yield the fetched file as DataFrames of at most `chunksize` rows.
+    
+    Args:
+        path: Fetched .csv or .parquet file
+        chunksize: Rows per batch
+    
+    Yields:
+        pandas DataFrame
+    """
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for record_batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield record_batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, dtype={'incident_zip': str}, chunksize=chunksize)
+
+
+def write_reports(check, results, reports_dir):
+    """
+    Write the notebook-02 style summary CSVs.
+    
+    Args:
+        check: Finished DataQualityCheck
+        results: Output of check.results()
+        reports_dir: Directory for the CSV files
+    """
+    os.makedirs(reports_dir, exist_ok=True)
+    rows = check.row_count
+    missing_summary = pd.DataFrame({
+        'Column': check.columns,
+        'Missing Count': [check.null_counts[c] for c in check.columns],
+        'Missing %': [round(check.null_counts[c] / rows * 100, 2) if rows else 0.0 for c in check.columns],
+        'Non-Null Count': [rows - check.null_counts[c] for c in check.columns],
+    }).sort_values('Missing %', ascending=False)
+    missing_summary.to_csv(os.path.join(reports_dir, "missing_values_summary.csv"), index=False)
+    
+    date_ranges = pd.DataFrame({
+        'Date Column': list(check.date_ranges),
+        'Min Date': [low for low, _ in check.date_ranges.values()],
+        'Max Date': [high for _, high in check.date_ranges.values()],
+        'Non-Null Count': [rows - check.null_counts[c] for c in check.date_ranges],
+    })
+    date_ranges.to_csv(os.path.join(reports_dir, "date_ranges_summary.csv"), index=False)
+    
+    quality_summary = pd.DataFrame({
+        'Metric': ['Total Rows', 'Unique Keys', 'Duplicate Keys', 'Duplicate %'],
+        'Value': [
+            rows,
+            rows - check.duplicate_keys,
+            check.duplicate_keys,
+            f"{(check.duplicate_keys / rows * 100 if rows else 0):.2f}%"
+        ]
+    })
+    quality_summary.to_csv(os.path.join(reports_dir, "data_quality_summary.csv"), index=False)
+
+
+def check_data_quality(csv_path="data/raw/311.csv", chunksize=50000, reports_dir=None):
+    """
+    Run the data-quality checks over the fetched file and persist the results.
+    
+    Args:
+        csv_path: Fetched data file (.csv or .parquet)
+        chunksize: Rows per streamed batch
+        reports_dir: Optional directory for summary CSVs
+    
+    Returns:
+        bool: True when every threshold passed
+    """
+    if not os.path.exists(csv_path):
+        print(f"Error: data file not found at {csv_path}")
+        print("Please run scripts/fetch_311.py first to download the data.")
+        sys.exit(1)
+    
+    print(f"Checking data quality of {csv_path}...")
+    check = DataQualityCheck()
+    for batch in iter_raw_batches(csv_path, chunksize):
+        check.update(batch)
+    check.duplicate_keys = count_file_duplicates(csv_path)
+    
+    try:
+        engine = get_engine()
+        results = record_results(check.results(get_thresholds()), engine, datetime.now())
+        engine.dispose()
+        print(f"Recorded {len(results)} metrics in ops.data_quality")
+    except Exception as e:
+        print(f"Error writing ops.data_quality: {e}")
+        sys.exit(1)
+    
+    if reports_dir:
+        write_reports(check, results, reports_dir)
+        print(f"Summary reports saved to {reports_dir}/")
+    
+    checked = results[results['passed'].notna()]
+    for _, row in checked.iterrows():
+        status = "✓" if row['passed'] else "✗"
+        column = f" [{row['column_name']}]" if pd.notna(row['column_name']) else ""
+        print(f"  {status} {row['metric']}{column}: {row['value']:,.2f} (threshold {row['threshold']:,.2f})")
+    
+    return failed_thresholds(results).empty
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Validate fetched NYC 311 data and record results in ops.data_quality"
+    )
+    parser.add_argument(
+        "--path",
+        default="data/raw/311.csv",
+        help="Fetched data file, .csv or .parquet (default: data/raw/311.csv)"
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=50000,
+        help="Rows per streamed batch (default: 50000)"
+    )
+    parser.add_argument(
+        "--reports-dir",
+        default=None,
+        help="Also write summary CSVs to this directory (e.g. notebooks/reports)"
+    )
+    
+    args = parser.parse_args()
+    
+    if check_data_quality(args.path, args.chunksize, args.reports_dir):
+        print("\n✓ All data-quality thresholds passed")
+    else:
+        print("\n✗ Data-quality thresholds failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
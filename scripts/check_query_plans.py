@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Check the plans of every dashboard and mart query for sequential-scan regressions.
+
+Each query (see src.plans) runs under EXPLAIN ANALYZE against the
+configured database. A query fails when it reads a table with a sequential
+scan of at least --min-rows rows that the baseline does not list for it,
+e.g. when an index it relied on was dropped or stopped being chosen.
+Mart builds read the whole fact table, so their scans are reported but
+only fail with --check-marts.
+
+The baseline is a JSON file of accepted sequential scans per backend and
+query. Record it once on a database with the full data and indexes:
+    
+    python scripts/check_query_plans.py --write-baseline
+    python scripts/check_query_plans.py                       # exits 1 on regressions
+
+Without a baseline every large sequential scan of a dashboard query fails.
+"""
+import argparse
+import json
+import os
+import sys
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from src.db import engine_backend, get_engine
+from src.plans import DEFAULT_MIN_ROWS, collect_queries, explain, find_regressions, seq_scanned
+
+DEFAULT_BASELINE = "sql/plan_baseline.json"
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_plans(results, plans_dir):
+    os.makedirs(plans_dir, exist_ok=True)
+    for name, result in results.items():
+        file_name = name.replace(':', '__').replace('.', '_') + '.json'
+        with open(os.path.join(plans_dir, file_name), 'w') as f:
+            json.dump(result['plan'], f, indent=2, default=str)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="EXPLAIN ANALYZE the dashboard and mart queries and flag new sequential scans"
+    )
+    parser.add_argument(
+        "--baseline",
+        default=DEFAULT_BASELINE,
+        help=f"Accepted sequential scans per backend and query (default: {DEFAULT_BASELINE})"
+    )
+    parser.add_argument(
+        "--write-baseline",
+        action="store_true",
+        help="Accept the current plans: write them to --baseline instead of checking"
+    )
+    parser.add_argument(
+        "--min-rows",
+        type=int,
+        default=DEFAULT_MIN_ROWS,
+        help=f"Ignore sequential scans reading fewer rows (default: {DEFAULT_MIN_ROWS:,})"
+    )
+    parser.add_argument(
+        "--recent-days",
+        type=int,
+        default=30,
+        help="Date range for the filtered Insights queries (default: 30)"
+    )
+    parser.add_argument(
+        "--check-marts",
+        action="store_true",
+        help="Also fail on new sequential scans in the mart builds, which read the fact table in full"
+    )
+    parser.add_argument(
+        "--plans-dir",
+        help="Also write each query's full JSON plan to this directory"
+    )
+    
+    args = parser.parse_args()
+    
+    try:
+        engine = get_engine()
+        backend = engine_backend(engine)
+        queries = collect_queries(engine, args.recent_days)
+    except Exception as e:
+        print(f"Error collecting queries: {e}")
+        print("Build the core tables and marts before checking plans.")
+        sys.exit(1)
+    
+    print(f"Explaining {len(queries)} queries on {backend}...")
+    results = {}
+    with engine.connect() as conn:
+        for name, sql, params in queries:
+            try:
+                results[name] = explain(conn, sql, params, backend)
+            except Exception as e:
+                print(f"Error explaining {name}: {e}")
+                sys.exit(1)
+    
+    baseline = load_baseline(args.baseline)
+    accepted = baseline.get(backend, {})
+    regressions = {} if args.write_baseline else find_regressions(
+        results, accepted, args.min_rows, check_marts=args.check_marts
+    )
+    
+    print(f"\n{'Query':<52} {'ms':>9} {'Buffers':>9}  Sequential scans >= {args.min_rows:,} rows")
+    for name, result in results.items():
+        buffers = [s['buffers'] for s in result['scans'] if s['buffers'] is not None]
+        scans = seq_scanned(result['scans'], args.min_rows)
+        status = "  <- NEW" if name in regressions else ""
+        print(f"{name:<52} {result['execution_ms']:>9.1f} "
+              f"{(f'{sum(buffers):,}' if buffers else '-'):>9}  {', '.join(scans) or '-'}{status}")
+    
+    if args.plans_dir:
+        write_plans(results, args.plans_dir)
+        print(f"\nPlans written to {args.plans_dir}")
+    
+    if args.write_baseline:
+        baseline[backend] = {
+            name: seq_scanned(result['scans'], args.min_rows) for name, result in results.items()
+        }
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\n✓ Wrote {backend} baseline for {len(results)} queries to {args.baseline}")
+        return
+    
+    if regressions:
+        print(f"\n✗ {len(regressions)} queries regressed to sequential scans:")
+        for name, relations in regressions.items():
+            print(f"  {name}: {', '.join(relations)}")
+        if not accepted:
+            print(f"No {backend} baseline in {args.baseline}; record one with --write-baseline.")
+        sys.exit(1)
+    
+    print("\n✓ No new sequential scans")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Export core requests to CSV or Parquet, the same way the dashboard does.
+
+Rows are streamed from the read replica in chunks and appended to the file
+(see src/export.py), so exports of any size run in constant memory. Use it
+for exports too large to download from the dashboard.
+    
+    python scripts/export_requests.py --format parquet --start 2024-01-01 --borough BROOKLYN
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from src.export import CORE_SCHEMA, FORMATS, core_rows_query, export_to_file, iter_query_chunks, write_chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream core requests to a CSV or Parquet file")
+    parser.add_argument("--format", choices=list(FORMATS), default="csv", help="Output format (default: csv)")
+    parser.add_argument("--output", default=None, help="Output path (default: a new file in EXPORT_DIR)")
+    parser.add_argument("--start", default=None, help="Inclusive first created date, e.g. 2024-01-01")
+    parser.add_argument("--end", default=None, help="Exclusive end created date")
+    parser.add_argument("--agency", default=None, help="Only this agency")
+    parser.add_argument("--borough", default=None, help="Only this borough")
+    parser.add_argument("--complaint-type", default=None, help="Only this complaint type")
+    parser.add_argument("--chunk-rows", type=int, default=None,
+                        help="Rows fetched and written per chunk (default: EXPORT_CHUNK_ROWS)")
+    
+    args = parser.parse_args()
+    
+    query, params = core_rows_query(
+        start=args.start,
+        end=args.end,
+        agency=args.agency,
+        borough=args.borough,
+        complaint_type=args.complaint_type
+    )
+    start = time.perf_counter()
+    try:
+        chunks = iter_query_chunks(query, params, chunk_rows=args.chunk_rows)
+        if args.output:
+            out_dir = os.path.dirname(args.output)
+            if out_dir:
+                os.makedirs(out_dir, exist_ok=True)
+            path, rows = args.output, write_chunks(chunks, args.output, args.format, schema=CORE_SCHEMA)
+        else:
+            path, rows = export_to_file(chunks, args.format, "requests", schema=CORE_SCHEMA)
+    except Exception as e:
+        print(f"✗ Export failed: {e}")
+        sys.exit(1)
+    
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    print(f"✓ Wrote {rows:,} rows to {path} ({size_mb:,.1f} MB, {time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
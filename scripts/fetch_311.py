@@ -3,68 +3,65 @@
 Fetch NYC 311 data from Socrata API and save to CSV.
 """
 import argparse
+import os
 import requests
 import pandas as pd
-from datetime import datetime, timedelta
 import sys
 
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from src.config import get_socrata_url
+from src.profiling import profiled
+from src.decoding import PAGE_FORMATS, concat_pages
+from src.socrata import FIELDS, get_decoded_page, window_params
 
-def fetch_311_data(days=30, limit=50000):
+
+@profiled()
+def fetch_311_data(days=30, limit=50000, base_url=None, max_retries=3, page_format="json"):
     """
     Fetch NYC 311 data from Socrata API.
     
     Args:
         days: Number of days to fetch (default 30)
         limit: Records per page (default 50000)
+        base_url: Resource URL (default: SOCRATA_URL setting, or NYC Open Data)
+        max_retries: Retries per page on 429/5xx responses (default 3)
+        page_format: API response format, 'json' or 'csv' (default json)
     
     Returns:
-        pandas DataFrame with all fetched records
+        pandas DataFrame with all fetched records, typed as in
+        raw.nyc311_requests (text columns are categoricals)
     """
-    base_url = "https://data.cityofnewyork.us/resource/erm2-nwe9.json"
-    
-    # Calculate date filter
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=days)
-    date_filter = f"created_date >= '{start_date.strftime('%Y-%m-%dT%H:%M:%S')}'"
+    base_url = base_url or get_socrata_url()
     
-    # Fields to select
-    fields = [
-        "unique_key", "created_date", "closed_date", "agency", 
-        "complaint_type", "descriptor", "status", "borough", 
-        "incident_zip", "city", "latitude", "longitude"
-    ]
-    select_fields = ",".join(fields)
+    # Date filter and fields to select
+    window, start_date, end_date = window_params(days)
     
-    all_records = []
+    pages = []
+    total = 0
     offset = 0
     page = 1
     
     print(f"Fetching NYC 311 data from last {days} days...")
+    print(f"Source: {base_url}")
     print(f"Date range: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
-    print(f"Page size: {limit:,} records\n")
+    print(f"Page size: {limit:,} records ({page_format} pages)\n")
     
     while True:
-        params = {
-            "$select": select_fields,
-            "$where": date_filter,
-            "$limit": limit,
-            "$offset": offset,
-            "$order": "unique_key"
-        }
+        params = dict(window, **{"$limit": limit, "$offset": offset})
         
         try:
             print(f"Fetching page {page} (offset {offset:,})...", end=" ", flush=True)
-            response = requests.get(base_url, params=params, timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
+            # Decoded straight into typed columns (see src/decoding.py)
+            data = get_decoded_page(base_url, params, page_format, max_retries)
             
-            if not data:
+            if data.empty:
                 print("No more records.")
                 break
             
-            all_records.extend(data)
-            print(f"Retrieved {len(data):,} records (total: {len(all_records):,})")
+            pages.append(data)
+            total += len(data)
+            print(f"Retrieved {len(data):,} records (total: {total:,})")
             
             # If we got fewer records than the limit, we've reached the end
             if len(data) < limit:
@@ -77,17 +74,12 @@ def fetch_311_data(days=30, limit=50000):
             print(f"\nError fetching data: {e}")
             sys.exit(1)
     
-    # Convert to DataFrame
-    if not all_records:
+    if not pages:
         print("\nNo records found.")
         return pd.DataFrame()
     
-    df = pd.DataFrame(all_records)
-    
     # Ensure columns are in the correct order
-    df = df[fields]
-    
-    return df
+    return concat_pages(pages)[FIELDS]
 
 
 def main():
@@ -106,20 +98,41 @@ def main():
         default=50000,
         help="Records per page (default: 50000)"
     )
+    parser.add_argument(
+        "--base-url",
+        default=None,
+        help="Socrata resource URL (default: SOCRATA_URL setting, or NYC Open Data)"
+    )
+    parser.add_argument(
+        "--format",
+        choices=["csv", "parquet"],
+        default="csv",
+        help="Output file format (default: csv)"
+    )
+    parser.add_argument(
+        "--page-format",
+        choices=PAGE_FORMATS,
+        default="json",
+        help="API response format; csv is decoded fastest (default: json)"
+    )
     
     args = parser.parse_args()
     
     # Fetch data
-    df = fetch_311_data(days=args.days, limit=args.limit)
+    df = fetch_311_data(days=args.days, limit=args.limit, base_url=args.base_url,
+                        page_format=args.page_format)
     
     if df.empty:
         print("\nNo data to save.")
         return
     
-    # Save to CSV
-    output_path = "data/raw/311.csv"
+    # Save to CSV or Parquet
+    output_path = f"data/raw/311.{args.format}"
     print(f"\nSaving to {output_path}...")
-    df.to_csv(output_path, index=False)
+    if args.format == "parquet":
+        df.to_parquet(output_path, index=False)
+    else:
+        df.to_csv(output_path, index=False)
     
     print(f"\n✓ Successfully saved {len(df):,} records to {output_path}")
 
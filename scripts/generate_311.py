@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic NYC 311 data for scale testing.
+
+Writes the same fields as fetch_311.py in batches, so 50M rows can be
+produced without holding them in memory:
+    python scripts/generate_311.py --rows 10000000 --output data/synthetic/311_10m.parquet
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from src.synthetic import SyntheticConfig, write_synthetic
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic NYC 311 data (CSV or Parquet)"
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        default=100000,
+        help="Number of rows to generate (default: 100000)"
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Output .csv or .parquet path (default: data/synthetic/311_<rows>.csv)"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Random seed (default: 0)"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=100000,
+        help="Rows generated and written per batch (default: 100000)"
+    )
+    parser.add_argument(
+        "--start",
+        default="2025-01-01",
+        help="First created_date day (default: 2025-01-01)"
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=30,
+        help="Number of days the created dates span (default: 30)"
+    )
+    
+    args = parser.parse_args()
+    
+    output_path = args.output or f"data/synthetic/311_{args.rows}.csv"
+    config = SyntheticConfig(start=args.start, days=args.days)
+    
+    print(f"Generating {args.rows:,} synthetic rows (seed {args.seed}) to {output_path}...")
+    start = time.perf_counter()
+    written = write_synthetic(output_path, args.rows, seed=args.seed, batch_size=args.batch_size, config=config)
+    elapsed = time.perf_counter() - start
+    
+    print(f"\n✓ Wrote {written:,} rows in {elapsed:.1f}s ({written / elapsed:,.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()
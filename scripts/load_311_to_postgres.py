@@ -1,30 +1,199 @@
 #!/usr/bin/env python3
 """
 Load NYC 311 CSV data into Postgres database.
+
+With DB_BACKEND=duckdb the same data is loaded into the embedded DuckDB
+file instead, and Parquet output from fetch_311.py is accepted as well.
+
+Rows that are new or changed since the previous load are also appended
+to raw.nyc311_requests_history (see src/cdc.py).
+
+On DuckDB with DUCKDB_READ_PATH set, the loaded database is then copied to
+the dashboard's read replica (--no-publish skips that).
 """
+import argparse
 import os
 import sys
+from datetime import datetime
 import pandas as pd
 from sqlalchemy import create_engine, text
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-from src.config import get_database_url
+from src.cdc import (
+    HISTORY_COLUMNS, close_superseded_sql, detect_changes, history_rows,
+    read_current_hashes, row_hashes
+)
+from src.config import get_database_url, get_db_backend, get_duckdb_path
+from src.db import get_engine, publish_duckdb_replica, run_sql_file, split_sql_statements
+from src.dimensions import encode_dimensions, sync_dimensions
+from src.profiling import profiled
+from src.transform import RAW_COLUMNS, clean_requests
+
+RAW_SCHEMA_FILES = [
+    "sql/schema/01_create_schemas.sql",
+    "sql/schema/02_create_raw_311_table.sql",
+]
+CORE_SQL_FILE = "sql/schema/03_create_core_311.sql"
+
+
+def read_raw_file(path):
+    """
+    Read a fetched CSV or Parquet file into a DataFrame.
+    
+    Args:
+        path: Path ending in .csv or .parquet
+    
+    Returns:
+        pandas DataFrame
+    """
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, dtype={'incident_zip': str})
+
+
+def capture_changes(df):
+    """
+    Find the rows of df that are new or changed since the previous load.
+    
+    Creates the raw tables (or adds the row_hash column) first if needed.
+    
+    Args:
+        df: Prepared DataFrame with the raw columns and row_hash
+    
+    Returns:
+        pandas DataFrame: Output of src.cdc.detect_changes
+    """
+    # Both schema files are idempotent
+    engine = get_engine()
+    for schema_file in RAW_SCHEMA_FILES:
+        run_sql_file(schema_file, engine)
+    current = read_current_hashes(engine)
+    engine.dispose()
+    return detect_changes(df, current)
+
+
+def load_to_duckdb(df, history, loaded_at):
+    """
+    Replace the contents of raw.nyc311_requests in the DuckDB file with df.
+    
+    The change history is appended in the same transaction.
+    
+    Args:
+        df: Prepared DataFrame with the raw columns and row_hash
+        history: New history versions (src.cdc.history_rows)
+        loaded_at: Load timestamp of the history versions
+    """
+    import duckdb
+    
+    columns = ', '.join(RAW_COLUMNS + ['row_hash'])
+    conn = duckdb.connect(get_duckdb_path())
+    try:
+        conn.register('raw_df', df[RAW_COLUMNS + ['row_hash']])
+        conn.register('history_df', history)
+        conn.execute("BEGIN TRANSACTION")
+        conn.execute("DELETE FROM raw.nyc311_requests")
+        conn.execute(f"INSERT INTO raw.nyc311_requests ({columns}) SELECT {columns} FROM raw_df")
+        conn.execute(
+            f"INSERT INTO raw.nyc311_requests_history ({', '.join(HISTORY_COLUMNS)}) "
+            f"SELECT {', '.join(HISTORY_COLUMNS)} FROM history_df"
+        )
+        conn.execute(close_superseded_sql(loaded_at))
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+def core_statements(backend, *prefixes):
+    """
+    Get the statements of the core SQL file that start with one of prefixes.
+    
+    Args:
+        backend: 'postgres' or 'duckdb'; statements for the other backend are skipped
+        *prefixes: Statement prefixes, e.g. 'CREATE INDEX'
+    
+    Returns:
+        list of str
+    """
+    with open(CORE_SQL_FILE) as f:
+        statements = split_sql_statements(f.read(), backend)
+    selected = []
+    for statement in statements:
+        code = '\n'.join(
+            line for line in statement.splitlines() if not line.strip().startswith('--')
+        ).strip().upper()
+        if code.startswith(prefixes):
+            selected.append(statement)
+    return selected
+
+
+def write_core_table(core_df, backend):
+    """
+    Replace core.fact_requests with an already-cleaned DataFrame.
+    
+    Used by --build-core so the core tables are produced in the same pass as
+    the raw load instead of by re-reading raw with 03_create_core_311.sql.
+    New dimension values are added first, then the fact is written with
+    their keys in created_date order, then the indexes, statistics and the
+    core.requests_clean view.
+    
+    Args:
+        core_df: Output of src.transform.clean_requests
+        backend: 'postgres' or 'duckdb'
+    """
+    engine = get_engine()
+    with engine.begin() as conn:
+        # Drops the old fact/view and creates missing dimension tables
+        for statement in core_statements(backend, 'DROP', 'CREATE TABLE IF NOT EXISTS'):
+            conn.exec_driver_sql(statement)
+    fact_df = encode_dimensions(core_df, sync_dimensions(core_df, engine))
+    fact_df = fact_df.sort_values('created_date', kind='stable', ignore_index=True)
+    finish_statements = core_statements(backend, 'CREATE INDEX', 'ANALYZE', 'CREATE VIEW')
+    
+    if backend == 'duckdb':
+        engine.dispose()
+        import duckdb
+        conn = duckdb.connect(get_duckdb_path())
+        try:
+            conn.register('fact_df', fact_df)
+            conn.execute("CREATE TABLE core.fact_requests AS SELECT * FROM fact_df")
+            for statement in finish_statements:
+                conn.execute(statement)
+        finally:
+            conn.close()
+        return
+    
+    fact_df.to_sql(
+        'fact_requests',
+        engine,
+        schema='core',
+        if_exists='append',
+        index=False,
+        method='multi'
+    )
+    with engine.begin() as conn:
+        for statement in finish_statements:
+            conn.exec_driver_sql(statement)
 
 
-def load_311_to_postgres():
+@profiled()
+def load_311_to_postgres(csv_path="data/raw/311.csv", build_core=False, publish=True):
     """
     Load NYC 311 data from CSV into Postgres.
+    
+    Args:
+        csv_path: Fetched data file (.csv or .parquet)
+        build_core: Also write the core star schema from the same data
+        publish: Copy the database to DUCKDB_READ_PATH when it is set
     """
     # Read DATABASE_URL from environment or Streamlit secrets
     try:
+        backend = get_db_backend()
         database_url = get_database_url()
     except RuntimeError as e:
         print(f"Error: {e}")
         sys.exit(1)
     
-    csv_path = "data/raw/311.csv"
-    
     # Check if CSV file exists
     if not os.path.exists(csv_path):
         print(f"Error: CSV file not found at {csv_path}")
@@ -35,7 +204,7 @@ def load_311_to_postgres():
     
     # Load CSV with pandas
     try:
-        df = pd.read_csv(csv_path)
+        df = read_raw_file(csv_path)
         print(f"Loaded {len(df):,} rows from CSV")
     except Exception as e:
         print(f"Error reading CSV file: {e}")
@@ -54,35 +223,126 @@ def load_311_to_postgres():
         print(f"Removed {duplicates_removed:,} duplicate rows (kept latest)")
     print(f"Prepared {len(df):,} rows for insertion")
     
+    # Compare row hashes with the previous load
+    try:
+        df['row_hash'] = row_hashes(df)
+        changes = capture_changes(df)
+    except Exception as e:
+        print(f"\nError detecting changed rows: {e}")
+        sys.exit(1)
+    loaded_at = datetime.now()
+    history = history_rows(changes, loaded_at)
+    inserted = int((changes['change_type'] == 'insert').sum())
+    print(f"Detected {inserted:,} new and {len(changes) - inserted:,} changed rows "
+          f"({len(df) - len(changes):,} unchanged)")
+    
+    if backend == 'duckdb':
+        try:
+            print(f"Loading into DuckDB at {get_duckdb_path()}...")
+            load_to_duckdb(df, history, loaded_at)
+            print(f"\n✓ Successfully inserted {len(df):,} rows into raw.nyc311_requests")
+        except Exception as e:
+            print(f"\nError loading data into DuckDB: {e}")
+            sys.exit(1)
+    else:
+        load_to_postgres(df, database_url, history, loaded_at)
+    print(f"✓ Appended {len(history):,} versions to raw.nyc311_requests_history")
+    
+    if build_core:
+        try:
+            core_df = clean_requests(df)
+            print(f"Writing {len(core_df):,} cleaned rows to core.fact_requests...")
+            write_core_table(core_df, backend)
+            print("✓ Successfully built core.fact_requests and its dimensions")
+        except Exception as e:
+            print(f"\nError building core table: {e}")
+            sys.exit(1)
+    
+    if publish:
+        try:
+            read_path = publish_duckdb_replica()
+        except Exception as e:
+            print(f"\nError publishing the read replica: {e}")
+            sys.exit(1)
+        if read_path:
+            print(f"✓ Published the read replica at {read_path}")
+
+
+def load_to_postgres(df, database_url, history, loaded_at):
+    """
+    Replace the contents of raw.nyc311_requests in Postgres with df.
+    
+    The change history is appended in the same transaction, so a failed
+    history insert leaves raw as it was.
+    
+    Args:
+        df: Prepared DataFrame with the raw columns and row_hash
+        database_url: Postgres connection URL
+        history: New history versions (src.cdc.history_rows)
+        loaded_at: Load timestamp of the history versions
+    """
     # Connect to Postgres
     try:
         print("Connecting to Postgres...")
         engine = create_engine(database_url)
         
-        # TRUNCATE table before insert
-        print("Truncating raw.nyc311_requests table...")
-        with engine.connect() as conn:
+        with engine.begin() as conn:
+            # TRUNCATE table before insert
+            print("Truncating raw.nyc311_requests table...")
             conn.execute(text("TRUNCATE TABLE raw.nyc311_requests"))
-            conn.commit()
-        
-        # Insert data using pandas to_sql
-        print("Inserting data into raw.nyc311_requests...")
-        df.to_sql(
-            'nyc311_requests',
-            engine,
-            schema='raw',
-            if_exists='append',
-            index=False,
-            method='multi'
-        )
+            
+            # Insert data using pandas to_sql
+            print("Inserting data into raw.nyc311_requests...")
+            df.to_sql(
+                'nyc311_requests',
+                conn,
+                schema='raw',
+                if_exists='append',
+                index=False,
+                method='multi'
+            )
+            
+            # Append the new versions, then close the ones they replace
+            history.to_sql(
+                'nyc311_requests_history',
+                conn,
+                schema='raw',
+                if_exists='append',
+                index=False,
+                method='multi'
+            )
+            conn.exec_driver_sql(close_superseded_sql(loaded_at))
         
         print(f"\n✓ Successfully inserted {len(df):,} rows into raw.nyc311_requests")
-        
+    
     except Exception as e:
         print(f"\nError loading data into Postgres: {e}")
         sys.exit(1)
 
 
-if __name__ == "__main__":
-    load_311_to_postgres()
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load fetched NYC 311 data into the configured database"
+    )
+    parser.add_argument(
+        "--path",
+        default="data/raw/311.csv",
+        help="Fetched data file, .csv or .parquet (default: data/raw/311.csv)"
+    )
+    parser.add_argument(
+        "--build-core",
+        action="store_true",
+        help="Also write the cleaned core table in the same pass"
+    )
+    parser.add_argument(
+        "--no-publish",
+        action="store_true",
+        help="Do not copy the database to DUCKDB_READ_PATH afterwards (the pipeline publishes once at the end)"
+    )
+    
+    args = parser.parse_args()
+    load_311_to_postgres(csv_path=args.path, build_core=args.build_core, publish=not args.no_publish)
+
 
+if __name__ == "__main__":
+    main()
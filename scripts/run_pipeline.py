@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Run the full refresh (fetch, validate, load, core, marts), skipping stages
+whose inputs have not changed and resuming after a failed run.
+
+See src/pipeline.py for how stages are fingerprinted:
+    python scripts/run_pipeline.py --days 30
+    python scripts/run_pipeline.py --resume          # rebuild after a SQL change, without fetching
+"""
+import argparse
+import os
+import sys
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from src.db import get_engine
+from src.pipeline import read_checkpoints, run_pipeline
+
+
+def report(event, stage, index, total, detail):
+    """
+    Print pipeline progress.
+    """
+    if event == 'start':
+        print(f"Step {index}/{total}: {stage.description}...", flush=True)
+    elif event == 'skip':
+        print(f"Step {index}/{total}: {stage.description}... skipped (inputs unchanged)")
+    elif event == 'done':
+        print(f"  ✓ {stage.done_message}")
+    else:
+        print(f"  ✗ {stage.error_message}\n")
+        print(detail)
+
+
+def print_status():
+    """
+    Print the last recorded run of every stage.
+    """
+    try:
+        history = read_checkpoints(get_engine())
+    except Exception as e:
+        print(f"No pipeline runs recorded yet ({e})")
+        return
+    latest = history.groupby('stage').tail(1)
+    print(latest[['stage', 'status', 'run_id', 'started_at', 'finished_at']].to_string(index=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the NYC 311 refresh pipeline with stage skipping and resume"
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=30,
+        help="Number of days to fetch (default: 30)"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Fetch, validate and load in one streaming pass (stream_311.py)"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Run every stage, even when its inputs are unchanged"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Reuse the last fetch even if the previous run finished"
+    )
+    parser.add_argument(
+        "--status",
+        action="store_true",
+        help="Print the last run of each stage and exit"
+    )
+    
+    args = parser.parse_args()
+    
+    if args.status:
+        print_status()
+        return
+    
+    if not run_pipeline(days=args.days, stream=args.stream, force=args.force,
+                        resume=True if args.resume else None, on_stage=report):
+        sys.exit(1)
+    print("\n✓ Pipeline complete")
+
+
+if __name__ == "__main__":
+    main()
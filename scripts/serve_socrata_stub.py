@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Serve synthetic NYC 311 data through a local stand-in for the Socrata API.
+
+Generated created dates end today, so fetch_311.py's default window finds them:
+    python scripts/serve_socrata_stub.py --rows 200000 --port 8311
+    SOCRATA_URL=http://127.0.0.1:8311/resource/erm2-nwe9.json python scripts/fetch_311.py
+"""
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from src.socrata_stub import FaultConfig, SocrataDataset, SocrataStubServer
+from src.synthetic import SyntheticConfig, generate_dataframe
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local Socrata API stand-in serving synthetic 311 data"
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        default=100000,
+        help="Number of rows to serve (default: 100000)"
+    )
+    parser.add_argument(
+        "--input",
+        default=None,
+        help="Serve an existing .csv or .parquet file instead of generating data"
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=30,
+        help="Number of days before today the created dates span (default: 30)"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Random seed for data and injected faults (default: 0)"
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Interface to bind (default: 127.0.0.1)"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8311,
+        help="Port to bind (default: 8311)"
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Seconds added to every response (default: 0)"
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0.0,
+        help="Extra random latency of up to this many seconds (default: 0)"
+    )
+    parser.add_argument(
+        "--throttle-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of requests answered with 429 Too Many Requests (default: 0)"
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of requests answered with 500 (default: 0)"
+    )
+    parser.add_argument(
+        "--retry-after",
+        type=int,
+        default=1,
+        help="Retry-After seconds sent with 429 responses (default: 1)"
+    )
+    
+    args = parser.parse_args()
+    
+    if args.input:
+        print(f"Loading {args.input}...")
+        if args.input.endswith(".parquet"):
+            df = pd.read_parquet(args.input)
+        else:
+            df = pd.read_csv(args.input, dtype={"incident_zip": str})
+    else:
+        start = pd.Timestamp.now().normalize() - pd.Timedelta(days=args.days)
+        print(f"Generating {args.rows:,} rows from {start:%Y-%m-%d}...")
+        df = generate_dataframe(args.rows, seed=args.seed, config=SyntheticConfig(start=start, days=args.days))
+    
+    faults = FaultConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        throttle_rate=args.throttle_rate,
+        error_rate=args.error_rate,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+    server = SocrataStubServer((args.host, args.port), SocrataDataset(df), faults)
+    
+    print(f"\n✓ Serving {len(df):,} rows at {server.base_url}")
+    print("Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        stats = server.stats
+        print(f"\nServed {stats['requests']:,} requests, {stats['rows']:,} rows "
+              f"({stats['throttled']:,} throttled, {stats['errors']:,} errors)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Fetch NYC 311 data and load it into the database in one streaming pass.
+
+Replaces fetch_311.py + check_data_quality.py + load_311_to_postgres.py
+for a refresh: pages are written to a staging table while later pages are
+still downloading (see src/streaming.py), the data-quality checks run on
+the same pages, and raw.nyc311_requests is only replaced if they pass.
+No data file is written. On DuckDB with DUCKDB_READ_PATH set, the database
+is then copied to the dashboard's read replica (--no-publish skips that).
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from src.config import get_db_backend, get_socrata_url
+from src.db import get_engine, publish_duckdb_replica, run_sql_file
+from src.decoding import PAGE_FORMATS
+from src.profiling import profiled
+from src.quality import DataQualityCheck, failed_thresholds, get_thresholds, record_results
+from src.socrata import window_params
+from src.streaming import DEFAULT_QUEUE_SIZE, DEFAULT_WORKERS, StagingTable, stream_to_staging
+
+RAW_SCHEMA_FILES = [
+    "sql/schema/01_create_schemas.sql",
+    "sql/schema/02_create_raw_311_table.sql",
+]
+
+
+@profiled()
+def stream_311(days=30, limit=50000, base_url=None, workers=DEFAULT_WORKERS,
+               queue_size=DEFAULT_QUEUE_SIZE, max_retries=3, page_format="json", publish=True):
+    """
+    Stream the last `days` days of requests into raw.nyc311_requests.
+    
+    Args:
+        days: Number of days to fetch
+        limit: Records per page
+        base_url: Resource URL (default: SOCRATA_URL setting, or NYC Open Data)
+        workers: Concurrent fetcher threads
+        queue_size: Fetched pages that may wait for the writer
+        max_retries: Retries per page on 429/5xx responses
+        page_format: API response format, 'json' or 'csv'
+        publish: Copy the database to DUCKDB_READ_PATH when it is set
+    
+    Returns:
+        bool: True when the data passed the quality checks and was loaded
+    """
+    try:
+        backend = get_db_backend()
+        engine = get_engine()
+        for schema_file in RAW_SCHEMA_FILES:
+            run_sql_file(schema_file, engine)
+        engine.dispose()
+    except Exception as e:
+        print(f"Error preparing raw tables: {e}")
+        sys.exit(1)
+    
+    base_url = base_url or get_socrata_url()
+    params, start_date, end_date = window_params(days)
+    print(f"Streaming NYC 311 data from last {days} days into {backend}...")
+    print(f"Source: {base_url}")
+    print(f"Date range: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
+    print(f"Page size: {limit:,} records ({page_format} pages), {workers} fetchers, "
+          f"queue of {queue_size} pages\n")
+    
+    check = DataQualityCheck()
+    staging = StagingTable(backend)
+    try:
+        staging.create()
+        stats = stream_to_staging(
+            staging, check, base_url, params, limit=limit, workers=workers,
+            queue_size=queue_size, max_retries=max_retries, page_format=page_format
+        )
+        print(f"\nStaged {stats['rows']:,} rows from {stats['pages']} pages in {stats['wall_s']:.1f}s "
+              f"(fetching {stats['fetch_s']:.1f}s summed over fetchers, writing {stats['write_s']:.1f}s)")
+        
+        engine = get_engine()
+        results = record_results(check.results(get_thresholds()), engine, datetime.now())
+        engine.dispose()
+        failed = failed_thresholds(results)
+        for _, row in failed.iterrows():
+            print(f"  ✗ {row['metric']}: {row['value']:,.2f} (threshold {row['threshold']:,.2f})")
+        if not failed.empty:
+            staging.drop()
+            print("\n✗ Data-quality thresholds failed; raw.nyc311_requests was left unchanged")
+            return False
+        print(f"✓ Data-quality checks passed (recorded {len(results)} metrics in ops.data_quality)")
+        
+        counts = staging.publish(datetime.now())
+    except Exception as e:
+        print(f"\nError streaming data: {e}")
+        sys.exit(1)
+    finally:
+        staging.close()
+    
+    print(f"✓ Replaced raw.nyc311_requests with {counts['rows']:,} rows "
+          f"({counts['inserted']:,} new and {counts['updated']:,} changed versions in the history)")
+    
+    if publish:
+        try:
+            read_path = publish_duckdb_replica()
+        except Exception as e:
+            print(f"\nError publishing the read replica: {e}")
+            sys.exit(1)
+        if read_path:
+            print(f"✓ Published the read replica at {read_path}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fetch NYC 311 data straight into the configured database"
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=30,
+        help="Number of days to fetch (default: 30)"
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=50000,
+        help="Records per page (default: 50000)"
+    )
+    parser.add_argument(
+        "--base-url",
+        default=None,
+        help="Socrata resource URL (default: SOCRATA_URL setting, or NYC Open Data)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Concurrent page fetchers (default: {DEFAULT_WORKERS})"
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help=f"Fetched pages that may wait for the database writer (default: {DEFAULT_QUEUE_SIZE})"
+    )
+    parser.add_argument(
+        "--page-format",
+        choices=PAGE_FORMATS,
+        default="json",
+        help="API response format; csv is decoded fastest (default: json)"
+    )
+    parser.add_argument(
+        "--no-publish",
+        action="store_true",
+        help="Do not copy the database to DUCKDB_READ_PATH afterwards (the pipeline publishes once at the end)"
+    )
+    
+    args = parser.parse_args()
+    
+    if not stream_311(days=args.days, limit=args.limit, base_url=args.base_url,
+                      workers=args.workers, queue_size=args.queue_size, page_format=args.page_format,
+                      publish=not args.no_publish):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
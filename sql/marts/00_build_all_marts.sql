@@ -1,9 +1,15 @@
 -- Build all marts in order
--- This file creates all mart tables
+-- Generated from src/marts.py by scripts/build_marts.py --write-sql,
+-- edit the mrt_*.sql files instead
+-- Marts aggregate core.fact_requests on its integer keys and join the
+-- dimensions only for the display columns of the result. Each mart has a
+-- primary key on its grain, and missing dimension values become '(missing)'
+-- so key columns are never null
 
 -- ============================================
 -- 1. KPI Monthly Mart
 -- ============================================
+-- Create KPI monthly mart
 DROP TABLE IF EXISTS marts.kpi_monthly;
 
 CREATE TABLE marts.kpi_monthly AS
@@ -16,52 +22,421 @@ SELECT
         FILTER (WHERE closed_date IS NOT NULL) AS median_resolution_hours,
     PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY resolution_hours) 
         FILTER (WHERE closed_date IS NOT NULL) AS p90_resolution_hours
-FROM core.nyc311_requests_clean
+FROM core.fact_requests
 GROUP BY DATE_TRUNC('month', created_date)::DATE
 ORDER BY month;
 
+ALTER TABLE marts.kpi_monthly ADD PRIMARY KEY (month);
+
 -- ============================================
 -- 2. Top Complaints Monthly Mart
 -- ============================================
+-- Create top complaints monthly mart
 DROP TABLE IF EXISTS marts.top_complaints_monthly;
 
 CREATE TABLE marts.top_complaints_monthly AS
 WITH ranked_complaints AS (
     SELECT 
         DATE_TRUNC('month', created_date)::DATE AS month,
-        borough,
-        complaint_type,
+        borough_id,
+        complaint_type_id,
         COUNT(*) AS requests,
         ROW_NUMBER() OVER (
-            PARTITION BY DATE_TRUNC('month', created_date)::DATE, borough 
+            PARTITION BY DATE_TRUNC('month', created_date)::DATE, borough_id 
             ORDER BY COUNT(*) DESC
         ) AS rank
-    FROM core.nyc311_requests_clean
-    GROUP BY DATE_TRUNC('month', created_date)::DATE, borough, complaint_type
+    FROM core.fact_requests
+    GROUP BY DATE_TRUNC('month', created_date)::DATE, borough_id, complaint_type_id
 )
 SELECT 
-    month,
-    borough,
-    complaint_type,
-    requests
-FROM ranked_complaints
-WHERE rank <= 10
-ORDER BY month, borough, requests DESC;
+    r.month,
+    COALESCE(b.borough, '(missing)') AS borough,
+    COALESCE(ct.complaint_type, '(missing)') AS complaint_type,
+    r.requests
+FROM ranked_complaints r
+LEFT JOIN core.dim_borough b ON b.borough_id = r.borough_id
+LEFT JOIN core.dim_complaint_type ct ON ct.complaint_type_id = r.complaint_type_id
+WHERE r.rank <= 10
+ORDER BY r.month, b.borough, r.requests DESC;
+
+ALTER TABLE marts.top_complaints_monthly ADD PRIMARY KEY (month, borough, complaint_type);
 
 -- ============================================
 -- 3. Agency Performance Monthly Mart
 -- ============================================
+-- Create agency performance monthly mart
 DROP TABLE IF EXISTS marts.agency_performance_monthly;
 
 CREATE TABLE marts.agency_performance_monthly AS
+WITH agency_months AS (
+    SELECT 
+        DATE_TRUNC('month', created_date)::DATE AS month,
+        agency_id,
+        COUNT(*) AS requests,
+        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY resolution_hours) 
+            FILTER (WHERE closed_date IS NOT NULL) AS median_resolution_hours,
+        PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY resolution_hours) 
+            FILTER (WHERE closed_date IS NOT NULL) AS p90_resolution_hours
+    FROM core.fact_requests
+    GROUP BY DATE_TRUNC('month', created_date)::DATE, agency_id
+)
 SELECT 
-    DATE_TRUNC('month', created_date)::DATE AS month,
-    agency,
-    COUNT(*) AS requests,
-    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY resolution_hours) 
-        FILTER (WHERE closed_date IS NOT NULL) AS median_resolution_hours,
-    PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY resolution_hours) 
-        FILTER (WHERE closed_date IS NOT NULL) AS p90_resolution_hours
-FROM core.nyc311_requests_clean
-GROUP BY DATE_TRUNC('month', created_date)::DATE, agency
-ORDER BY month, agency;
+    m.month,
+    COALESCE(a.agency, '(missing)') AS agency,
+    m.requests,
+    m.median_resolution_hours,
+    m.p90_resolution_hours
+FROM agency_months m
+LEFT JOIN core.dim_agency a ON a.agency_id = m.agency_id
+ORDER BY m.month, a.agency;
+
+ALTER TABLE marts.agency_performance_monthly ADD PRIMARY KEY (month, agency);
+
+-- ============================================
+-- 4. Requests Daily Cube
+-- ============================================
+-- Create daily requests cube
+DROP TABLE IF EXISTS marts.requests_daily;
+
+CREATE TABLE marts.requests_daily AS
+WITH daily AS (
+    SELECT 
+        created_date::DATE AS day,
+        borough_id,
+        agency_id,
+        complaint_type_id,
+        COUNT(*) AS requests,
+        COUNT(*) FILTER (WHERE closed_date IS NOT NULL) AS closed_requests,
+        SUM(resolution_hours) FILTER (WHERE closed_date IS NOT NULL) AS total_resolution_hours
+    FROM core.fact_requests
+    GROUP BY created_date::DATE, borough_id, agency_id, complaint_type_id
+)
+SELECT 
+    d.day,
+    COALESCE(b.borough, '(missing)') AS borough,
+    COALESCE(a.agency, '(missing)') AS agency,
+    COALESCE(ct.complaint_type, '(missing)') AS complaint_type,
+    d.requests,
+    d.closed_requests,
+    d.total_resolution_hours
+FROM daily d
+LEFT JOIN core.dim_borough b ON b.borough_id = d.borough_id
+LEFT JOIN core.dim_agency a ON a.agency_id = d.agency_id
+LEFT JOIN core.dim_complaint_type ct ON ct.complaint_type_id = d.complaint_type_id
+ORDER BY d.day, b.borough, a.agency, ct.complaint_type;
+
+-- The key's leading day column also serves the dashboard's date filters
+ALTER TABLE marts.requests_daily ADD PRIMARY KEY (day, borough, agency, complaint_type);
+
+-- ============================================
+-- 5. Requests Grid Monthly (map heatmaps)
+-- ============================================
+-- Create monthly map grid mart (requests per grid cell at several resolutions)
+DROP TABLE IF EXISTS marts.requests_grid_monthly;
+
+CREATE TABLE marts.requests_grid_monthly AS
+WITH grid_levels AS (
+    -- Quadtree levels: each cell splits into 4x4 cells at the next resolution
+    -- (1/16, 1/64 and 1/256 degree, roughly 7 km, 1.7 km and 430 m)
+    SELECT * FROM (VALUES 
+        (0, CAST(0.0625 AS DOUBLE PRECISION)),
+        (1, CAST(0.015625 AS DOUBLE PRECISION)),
+        (2, CAST(0.00390625 AS DOUBLE PRECISION))
+    ) AS levels(resolution, cell_degrees)
+),
+binned AS (
+    SELECT 
+        g.resolution,
+        DATE_TRUNC('month', f.created_date)::DATE AS month,
+        CAST(FLOOR(f.latitude / g.cell_degrees) AS INTEGER) AS cell_y,
+        CAST(FLOOR(f.longitude / g.cell_degrees) AS INTEGER) AS cell_x,
+        f.agency_id,
+        f.complaint_type_id,
+        COUNT(*) AS requests
+    FROM core.fact_requests f
+    CROSS JOIN grid_levels g
+    -- Same bounding box as the data-quality out-of-bounds check
+    WHERE f.latitude BETWEEN 40.47 AND 40.93
+      AND f.longitude BETWEEN -74.27 AND -73.68
+    GROUP BY 1, 2, 3, 4, 5, 6
+)
+SELECT 
+    c.resolution,
+    c.month,
+    c.cell_y,
+    c.cell_x,
+    COALESCE(a.agency, '(missing)') AS agency,
+    COALESCE(ct.complaint_type, '(missing)') AS complaint_type,
+    c.requests
+FROM binned c
+LEFT JOIN core.dim_agency a ON a.agency_id = c.agency_id
+LEFT JOIN core.dim_complaint_type ct ON ct.complaint_type_id = c.complaint_type_id
+ORDER BY c.resolution, c.month, c.cell_y, c.cell_x;
+
+-- Map queries filter on resolution, month and the cell ranges in view
+ALTER TABLE marts.requests_grid_monthly 
+    ADD PRIMARY KEY (resolution, month, cell_y, cell_x, agency, complaint_type);
+
+-- ============================================
+-- 6. Open Backlog Daily (incremental, never dropped)
+-- ============================================
+-- Maintain the daily open-backlog snapshots incrementally (never dropped)
+CREATE SCHEMA IF NOT EXISTS ops;
+
+-- Kept across builds: every request seen so far, with its latest dates and
+-- dimension keys (the fact only holds the current load window). dropped_date
+-- is set when the request leaves the load window: whether it was closed
+-- after that is unknown, so snapshots from that day on do not count it
+CREATE TABLE IF NOT EXISTS core.request_lifecycle (
+    unique_key BIGINT PRIMARY KEY,
+    created_date TIMESTAMP NOT NULL,
+    closed_date TIMESTAMP,
+    agency_id SMALLINT,
+    borough_id SMALLINT,
+    complaint_type_id SMALLINT,
+    dropped_date DATE
+);
+
+-- Tables created before dropped_date was tracked
+ALTER TABLE core.request_lifecycle ADD COLUMN IF NOT EXISTS dropped_date DATE;
+
+CREATE TABLE IF NOT EXISTS marts.backlog_daily (
+    snapshot_date DATE NOT NULL,
+    agency TEXT NOT NULL,
+    borough TEXT NOT NULL,
+    complaint_type TEXT NOT NULL,
+    open_requests INTEGER NOT NULL,
+    age_0_1d INTEGER NOT NULL,
+    age_1_7d INTEGER NOT NULL,
+    age_7_30d INTEGER NOT NULL,
+    age_30d_plus INTEGER NOT NULL,
+    PRIMARY KEY (snapshot_date, agency, borough, complaint_type)
+);
+
+-- How far each incremental consumer has read raw.nyc311_requests_history
+CREATE TABLE IF NOT EXISTS ops.change_feed_watermarks (
+    consumer TEXT PRIMARY KEY,
+    processed_through TIMESTAMP NOT NULL
+);
+
+-- Keys with a history version this build has not processed yet. When raw
+-- was loaded without history (e.g. by the benchmarks), every fact key is
+-- checked instead
+DROP TABLE IF EXISTS ops.backlog_feed;
+
+CREATE TABLE ops.backlog_feed AS
+SELECT DISTINCT h.unique_key
+FROM raw.nyc311_requests_history h
+WHERE h.valid_from > COALESCE(
+    (SELECT processed_through FROM ops.change_feed_watermarks WHERE consumer = 'backlog_daily'),
+    TIMESTAMP '1900-01-01'
+)
+UNION
+SELECT f.unique_key
+FROM core.fact_requests f
+WHERE NOT EXISTS (SELECT 1 FROM raw.nyc311_requests_history);
+
+-- Requests that are new in this load, whose dates or keys changed, or that
+-- are back in the load window after leaving it
+DROP TABLE IF EXISTS ops.backlog_changes;
+
+CREATE TABLE ops.backlog_changes AS
+SELECT 
+    f.unique_key,
+    f.created_date,
+    f.closed_date,
+    f.agency_id,
+    f.borough_id,
+    f.complaint_type_id,
+    -- First day whose snapshot can differ: a request that was only closed
+    -- (or reopened) changes nothing before its closed date, and one that is
+    -- back in the window nothing before it was dropped
+    LEAST(
+        CASE 
+            WHEN l.created_date = f.created_date
+             AND l.agency_id IS NOT DISTINCT FROM f.agency_id
+             AND l.borough_id IS NOT DISTINCT FROM f.borough_id
+             AND l.complaint_type_id IS NOT DISTINCT FROM f.complaint_type_id
+            THEN LEAST(l.closed_date, f.closed_date)::DATE
+            ELSE LEAST(l.created_date, f.created_date)::DATE
+        END,
+        l.dropped_date
+    ) AS changed_from
+FROM ops.backlog_feed c
+JOIN core.fact_requests f ON f.unique_key = c.unique_key
+LEFT JOIN core.request_lifecycle l ON l.unique_key = f.unique_key
+WHERE l.unique_key IS NULL
+   OR l.created_date <> f.created_date
+   OR l.closed_date IS DISTINCT FROM f.closed_date
+   OR l.agency_id IS DISTINCT FROM f.agency_id
+   OR l.borough_id IS DISTINCT FROM f.borough_id
+   OR l.complaint_type_id IS DISTINCT FROM f.complaint_type_id
+   OR l.dropped_date IS NOT NULL;
+
+DELETE FROM core.request_lifecycle 
+WHERE unique_key IN (SELECT unique_key FROM ops.backlog_changes);
+
+INSERT INTO core.request_lifecycle 
+    (unique_key, created_date, closed_date, agency_id, borough_id, complaint_type_id)
+SELECT unique_key, created_date, closed_date, agency_id, borough_id, complaint_type_id
+FROM ops.backlog_changes;
+
+-- Requests that have left the load window since the last build. They are
+-- dropped from the latest snapshot on, which is rebuilt without them
+DROP TABLE IF EXISTS ops.backlog_dropped;
+
+CREATE TABLE ops.backlog_dropped AS
+SELECT 
+    l.unique_key,
+    COALESCE(
+        (SELECT MAX(snapshot_date) FROM marts.backlog_daily),
+        CAST(l.created_date AS DATE)
+    ) AS dropped_date
+FROM core.request_lifecycle l
+WHERE l.dropped_date IS NULL
+  AND l.unique_key NOT IN (SELECT unique_key FROM core.fact_requests);
+
+UPDATE core.request_lifecycle
+SET dropped_date = (
+    SELECT d.dropped_date FROM ops.backlog_dropped d 
+    WHERE d.unique_key = core.request_lifecycle.unique_key
+)
+WHERE unique_key IN (SELECT unique_key FROM ops.backlog_dropped);
+
+DELETE FROM ops.change_feed_watermarks WHERE consumer = 'backlog_daily';
+
+INSERT INTO ops.change_feed_watermarks (consumer, processed_through)
+SELECT 'backlog_daily', MAX(valid_from)
+FROM raw.nyc311_requests_history
+HAVING MAX(valid_from) IS NOT NULL;
+
+-- Only days from the earliest changed_from or dropped_date on (plus any
+-- days after the last snapshot) are rebuilt
+DROP TABLE IF EXISTS ops.backlog_refresh;
+
+CREATE TABLE ops.backlog_refresh AS
+SELECT 
+    LEAST(
+        (SELECT MIN(changed_from) FROM ops.backlog_changes),
+        (SELECT MIN(dropped_date) FROM ops.backlog_dropped),
+        (SELECT MAX(snapshot_date) + 1 FROM marts.backlog_daily)
+    ) AS from_date,
+    (SELECT MAX(created_date)::DATE FROM core.request_lifecycle) AS to_date;
+
+DELETE FROM marts.backlog_daily 
+WHERE snapshot_date >= (SELECT from_date FROM ops.backlog_refresh);
+
+INSERT INTO marts.backlog_daily
+WITH snapshot_days AS (
+    SELECT CAST(g.day AS DATE) AS snapshot_date
+    FROM ops.backlog_refresh r,
+        generate_series(CAST(r.from_date AS TIMESTAMP), CAST(r.to_date AS TIMESTAMP), INTERVAL '1 day') AS g(day)
+),
+open_requests AS (
+    -- Open at the end of the snapshot day, with age in days at that moment
+    SELECT 
+        d.snapshot_date,
+        l.agency_id,
+        l.borough_id,
+        l.complaint_type_id,
+        EXTRACT(EPOCH FROM (CAST(d.snapshot_date + 1 AS TIMESTAMP) - l.created_date)) / 86400.0 AS age_days
+    FROM snapshot_days d
+    JOIN core.request_lifecycle l 
+        ON l.created_date < CAST(d.snapshot_date + 1 AS TIMESTAMP)
+       AND (l.closed_date IS NULL OR l.closed_date >= CAST(d.snapshot_date + 1 AS TIMESTAMP))
+       AND (l.dropped_date IS NULL OR l.dropped_date > d.snapshot_date)
+),
+backlog AS (
+    SELECT 
+        snapshot_date,
+        agency_id,
+        borough_id,
+        complaint_type_id,
+        COUNT(*) AS open_requests,
+        COUNT(*) FILTER (WHERE age_days < 1) AS age_0_1d,
+        COUNT(*) FILTER (WHERE age_days >= 1 AND age_days < 7) AS age_1_7d,
+        COUNT(*) FILTER (WHERE age_days >= 7 AND age_days < 30) AS age_7_30d,
+        COUNT(*) FILTER (WHERE age_days >= 30) AS age_30d_plus
+    FROM open_requests
+    GROUP BY snapshot_date, agency_id, borough_id, complaint_type_id
+)
+SELECT 
+    k.snapshot_date,
+    COALESCE(a.agency, '(missing)') AS agency,
+    COALESCE(b.borough, '(missing)') AS borough,
+    COALESCE(ct.complaint_type, '(missing)') AS complaint_type,
+    k.open_requests,
+    k.age_0_1d,
+    k.age_1_7d,
+    k.age_7_30d,
+    k.age_30d_plus
+FROM backlog k
+LEFT JOIN core.dim_agency a ON a.agency_id = k.agency_id
+LEFT JOIN core.dim_borough b ON b.borough_id = k.borough_id
+LEFT JOIN core.dim_complaint_type ct ON ct.complaint_type_id = k.complaint_type_id
+ORDER BY k.snapshot_date;
+
+-- ============================================
+-- 7. Resolution Histogram Monthly (distribution charts)
+-- ============================================
+-- Create monthly resolution-time histogram mart (log-spaced buckets)
+DROP TABLE IF EXISTS marts.resolution_histogram_monthly;
+
+CREATE TABLE marts.resolution_histogram_monthly AS
+WITH bucketed AS (
+    -- Log-spaced buckets, 8 per decade (see src/histograms.py): bucket 0 is
+    -- everything under 0.01 hours, bucket b covers
+    -- [10^((b - 17) / 8), 10^((b - 16) / 8)) hours and bucket 49 everything
+    -- from 10,000 hours up
+    SELECT 
+        DATE_TRUNC('month', created_date)::DATE AS month,
+        agency_id,
+        borough_id,
+        complaint_type_id,
+        CASE 
+            WHEN resolution_hours < 0.01 THEN 0
+            ELSE LEAST(CAST(FLOOR(LOG10(resolution_hours) * 8) AS INTEGER) + 17, 49)
+        END AS bucket,
+        resolution_hours
+    FROM core.fact_requests
+    WHERE closed_date IS NOT NULL
+),
+counts AS (
+    SELECT 
+        month,
+        agency_id,
+        borough_id,
+        complaint_type_id,
+        bucket,
+        COUNT(*) AS requests,
+        SUM(resolution_hours) AS total_resolution_hours
+    FROM bucketed
+    GROUP BY month, agency_id, borough_id, complaint_type_id, bucket
+)
+SELECT 
+    c.month,
+    COALESCE(a.agency, '(missing)') AS agency,
+    COALESCE(b.borough, '(missing)') AS borough,
+    COALESCE(ct.complaint_type, '(missing)') AS complaint_type,
+    CAST(c.bucket AS SMALLINT) AS bucket,
+    c.requests,
+    c.total_resolution_hours
+FROM counts c
+LEFT JOIN core.dim_agency a ON a.agency_id = c.agency_id
+LEFT JOIN core.dim_borough b ON b.borough_id = c.borough_id
+LEFT JOIN core.dim_complaint_type ct ON ct.complaint_type_id = c.complaint_type_id
+ORDER BY c.month, a.agency, b.borough, ct.complaint_type, c.bucket;
+
+ALTER TABLE marts.resolution_histogram_monthly 
+    ADD PRIMARY KEY (month, agency, borough, complaint_type, bucket);
+
+-- ============================================
+-- Record the build so readers can detect a new data version
+-- ============================================
+CREATE SCHEMA IF NOT EXISTS ops;
+
+CREATE TABLE IF NOT EXISTS ops.mart_builds (
+    built_at TIMESTAMP NOT NULL
+);
+
+INSERT INTO ops.mart_builds (built_at) VALUES (CURRENT_TIMESTAMP);
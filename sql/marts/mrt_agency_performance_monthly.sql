@@ -2,15 +2,27 @@
 DROP TABLE IF EXISTS marts.agency_performance_monthly;
 
 CREATE TABLE marts.agency_performance_monthly AS
+WITH agency_months AS (
+    SELECT 
+        DATE_TRUNC('month', created_date)::DATE AS month,
+        agency_id,
+        COUNT(*) AS requests,
+        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY resolution_hours) 
+            FILTER (WHERE closed_date IS NOT NULL) AS median_resolution_hours,
+        PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY resolution_hours) 
+            FILTER (WHERE closed_date IS NOT NULL) AS p90_resolution_hours
+    FROM core.fact_requests
+    GROUP BY DATE_TRUNC('month', created_date)::DATE, agency_id
+)
 SELECT 
-    DATE_TRUNC('month', created_date)::DATE AS month,
-    agency,
-    COUNT(*) AS requests,
-    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY resolution_hours) 
-        FILTER (WHERE closed_date IS NOT NULL) AS median_resolution_hours,
-    PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY resolution_hours) 
-        FILTER (WHERE closed_date IS NOT NULL) AS p90_resolution_hours
-FROM core.nyc311_requests_clean
-GROUP BY DATE_TRUNC('month', created_date)::DATE, agency
-ORDER BY month, agency;
+    m.month,
+    COALESCE(a.agency, '(missing)') AS agency,
+    m.requests,
+    m.median_resolution_hours,
+    m.p90_resolution_hours
+FROM agency_months m
+LEFT JOIN core.dim_agency a ON a.agency_id = m.agency_id
+ORDER BY m.month, a.agency;
+
+ALTER TABLE marts.agency_performance_monthly ADD PRIMARY KEY (month, agency);
 
@@ -0,0 +1,195 @@
+-- Maintain the daily open-backlog snapshots incrementally (never dropped)
+CREATE SCHEMA IF NOT EXISTS ops;
+
+-- Kept across builds: every request seen so far, with its latest dates and
+-- dimension keys (the fact only holds the current load window). dropped_date
+-- is set when the request leaves the load window: whether it was closed
+-- after that is unknown, so snapshots from that day on do not count it
+CREATE TABLE IF NOT EXISTS core.request_lifecycle (
+    unique_key BIGINT PRIMARY KEY,
+    created_date TIMESTAMP NOT NULL,
+    closed_date TIMESTAMP,
+    agency_id SMALLINT,
+    borough_id SMALLINT,
+    complaint_type_id SMALLINT,
+    dropped_date DATE
+);
+
+-- Tables created before dropped_date was tracked
+ALTER TABLE core.request_lifecycle ADD COLUMN IF NOT EXISTS dropped_date DATE;
+
+CREATE TABLE IF NOT EXISTS marts.backlog_daily (
+    snapshot_date DATE NOT NULL,
+    agency TEXT NOT NULL,
+    borough TEXT NOT NULL,
+    complaint_type TEXT NOT NULL,
+    open_requests INTEGER NOT NULL,
+    age_0_1d INTEGER NOT NULL,
+    age_1_7d INTEGER NOT NULL,
+    age_7_30d INTEGER NOT NULL,
+    age_30d_plus INTEGER NOT NULL,
+    PRIMARY KEY (snapshot_date, agency, borough, complaint_type)
+);
+
+-- How far each incremental consumer has read raw.nyc311_requests_history
+CREATE TABLE IF NOT EXISTS ops.change_feed_watermarks (
+    consumer TEXT PRIMARY KEY,
+    processed_through TIMESTAMP NOT NULL
+);
+
+-- Keys with a history version this build has not processed yet. When raw
+-- was loaded without history (e.g. by the benchmarks), every fact key is
+-- checked instead
+DROP TABLE IF EXISTS ops.backlog_feed;
+
+CREATE TABLE ops.backlog_feed AS
+SELECT DISTINCT h.unique_key
+FROM raw.nyc311_requests_history h
+WHERE h.valid_from > COALESCE(
+    (SELECT processed_through FROM ops.change_feed_watermarks WHERE consumer = 'backlog_daily'),
+    TIMESTAMP '1900-01-01'
+)
+UNION
+SELECT f.unique_key
+FROM core.fact_requests f
+WHERE NOT EXISTS (SELECT 1 FROM raw.nyc311_requests_history);
+
+-- Requests that are new in this load, whose dates or keys changed, or that
+-- are back in the load window after leaving it
+DROP TABLE IF EXISTS ops.backlog_changes;
+
+CREATE TABLE ops.backlog_changes AS
+SELECT 
+    f.unique_key,
+    f.created_date,
+    f.closed_date,
+    f.agency_id,
+    f.borough_id,
+    f.complaint_type_id,
+    -- First day whose snapshot can differ: a request that was only closed
+    -- (or reopened) changes nothing before its closed date, and one that is
+    -- back in the window nothing before it was dropped
+    LEAST(
+        CASE 
+            WHEN l.created_date = f.created_date
+             AND l.agency_id IS NOT DISTINCT FROM f.agency_id
+             AND l.borough_id IS NOT DISTINCT FROM f.borough_id
+             AND l.complaint_type_id IS NOT DISTINCT FROM f.complaint_type_id
+            THEN LEAST(l.closed_date, f.closed_date)::DATE
+            ELSE LEAST(l.created_date, f.created_date)::DATE
+        END,
+        l.dropped_date
+    ) AS changed_from
+FROM ops.backlog_feed c
+JOIN core.fact_requests f ON f.unique_key = c.unique_key
+LEFT JOIN core.request_lifecycle l ON l.unique_key = f.unique_key
+WHERE l.unique_key IS NULL
+   OR l.created_date <> f.created_date
+   OR l.closed_date IS DISTINCT FROM f.closed_date
+   OR l.agency_id IS DISTINCT FROM f.agency_id
+   OR l.borough_id IS DISTINCT FROM f.borough_id
+   OR l.complaint_type_id IS DISTINCT FROM f.complaint_type_id
+   OR l.dropped_date IS NOT NULL;
+
+DELETE FROM core.request_lifecycle 
+WHERE unique_key IN (SELECT unique_key FROM ops.backlog_changes);
+
+INSERT INTO core.request_lifecycle 
+    (unique_key, created_date, closed_date, agency_id, borough_id, complaint_type_id)
+SELECT unique_key, created_date, closed_date, agency_id, borough_id, complaint_type_id
+FROM ops.backlog_changes;
+
+-- Requests that have left the load window since the last build. They are
+-- dropped from the latest snapshot on, which is rebuilt without them
+DROP TABLE IF EXISTS ops.backlog_dropped;
+
+CREATE TABLE ops.backlog_dropped AS
+SELECT 
+    l.unique_key,
+    COALESCE(
+        (SELECT MAX(snapshot_date) FROM marts.backlog_daily),
+        CAST(l.created_date AS DATE)
+    ) AS dropped_date
+FROM core.request_lifecycle l
+WHERE l.dropped_date IS NULL
+  AND l.unique_key NOT IN (SELECT unique_key FROM core.fact_requests);
+
+UPDATE core.request_lifecycle
+SET dropped_date = (
+    SELECT d.dropped_date FROM ops.backlog_dropped d 
+    WHERE d.unique_key = core.request_lifecycle.unique_key
+)
+WHERE unique_key IN (SELECT unique_key FROM ops.backlog_dropped);
+
+DELETE FROM ops.change_feed_watermarks WHERE consumer = 'backlog_daily';
+
+INSERT INTO ops.change_feed_watermarks (consumer, processed_through)
+SELECT 'backlog_daily', MAX(valid_from)
+FROM raw.nyc311_requests_history
+HAVING MAX(valid_from) IS NOT NULL;
+
+-- Only days from the earliest changed_from or dropped_date on (plus any
+-- days after the last snapshot) are rebuilt
+DROP TABLE IF EXISTS ops.backlog_refresh;
+
+CREATE TABLE ops.backlog_refresh AS
+SELECT 
+    LEAST(
+        (SELECT MIN(changed_from) FROM ops.backlog_changes),
+        (SELECT MIN(dropped_date) FROM ops.backlog_dropped),
+        (SELECT MAX(snapshot_date) + 1 FROM marts.backlog_daily)
+    ) AS from_date,
+    (SELECT MAX(created_date)::DATE FROM core.request_lifecycle) AS to_date;
+
+DELETE FROM marts.backlog_daily 
+WHERE snapshot_date >= (SELECT from_date FROM ops.backlog_refresh);
+
+INSERT INTO marts.backlog_daily
+WITH snapshot_days AS (
+    SELECT CAST(g.day AS DATE) AS snapshot_date
+    FROM ops.backlog_refresh r,
+        generate_series(CAST(r.from_date AS TIMESTAMP), CAST(r.to_date AS TIMESTAMP), INTERVAL '1 day') AS g(day)
+),
+open_requests AS (
+    -- Open at the end of the snapshot day, with age in days at that moment
+    SELECT 
+        d.snapshot_date,
+        l.agency_id,
+        l.borough_id,
+        l.complaint_type_id,
+        EXTRACT(EPOCH FROM (CAST(d.snapshot_date + 1 AS TIMESTAMP) - l.created_date)) / 86400.0 AS age_days
+    FROM snapshot_days d
+    JOIN core.request_lifecycle l 
+        ON l.created_date < CAST(d.snapshot_date + 1 AS TIMESTAMP)
+       AND (l.closed_date IS NULL OR l.closed_date >= CAST(d.snapshot_date + 1 AS TIMESTAMP))
+       AND (l.dropped_date IS NULL OR l.dropped_date > d.snapshot_date)
+),
+backlog AS (
+    SELECT 
+        snapshot_date,
+        agency_id,
+        borough_id,
+        complaint_type_id,
+        COUNT(*) AS open_requests,
+        COUNT(*) FILTER (WHERE age_days < 1) AS age_0_1d,
+        COUNT(*) FILTER (WHERE age_days >= 1 AND age_days < 7) AS age_1_7d,
+        COUNT(*) FILTER (WHERE age_days >= 7 AND age_days < 30) AS age_7_30d,
+        COUNT(*) FILTER (WHERE age_days >= 30) AS age_30d_plus
+    FROM open_requests
+    GROUP BY snapshot_date, agency_id, borough_id, complaint_type_id
+)
+SELECT 
+    k.snapshot_date,
+    COALESCE(a.agency, '(missing)') AS agency,
+    COALESCE(b.borough, '(missing)') AS borough,
+    COALESCE(ct.complaint_type, '(missing)') AS complaint_type,
+    k.open_requests,
+    k.age_0_1d,
+    k.age_1_7d,
+    k.age_7_30d,
+    k.age_30d_plus
+FROM backlog k
+LEFT JOIN core.dim_agency a ON a.agency_id = k.agency_id
+LEFT JOIN core.dim_borough b ON b.borough_id = k.borough_id
+LEFT JOIN core.dim_complaint_type ct ON ct.complaint_type_id = k.complaint_type_id
+ORDER BY k.snapshot_date;
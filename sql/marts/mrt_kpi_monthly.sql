@@ -11,7 +11,9 @@ SELECT
         FILTER (WHERE closed_date IS NOT NULL) AS median_resolution_hours,
     PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY resolution_hours) 
         FILTER (WHERE closed_date IS NOT NULL) AS p90_resolution_hours
-FROM core.nyc311_requests_clean
+FROM core.fact_requests
 GROUP BY DATE_TRUNC('month', created_date)::DATE
 ORDER BY month;
 
+ALTER TABLE marts.kpi_monthly ADD PRIMARY KEY (month);
+
@@ -0,0 +1,32 @@
+-- Create daily requests cube
+DROP TABLE IF EXISTS marts.requests_daily;
+
+CREATE TABLE marts.requests_daily AS
+WITH daily AS (
+    SELECT 
+        created_date::DATE AS day,
+        borough_id,
+        agency_id,
+        complaint_type_id,
+        COUNT(*) AS requests,
+        COUNT(*) FILTER (WHERE closed_date IS NOT NULL) AS closed_requests,
+        SUM(resolution_hours) FILTER (WHERE closed_date IS NOT NULL) AS total_resolution_hours
+    FROM core.fact_requests
+    GROUP BY created_date::DATE, borough_id, agency_id, complaint_type_id
+)
+SELECT 
+    d.day,
+    COALESCE(b.borough, '(missing)') AS borough,
+    COALESCE(a.agency, '(missing)') AS agency,
+    COALESCE(ct.complaint_type, '(missing)') AS complaint_type,
+    d.requests,
+    d.closed_requests,
+    d.total_resolution_hours
+FROM daily d
+LEFT JOIN core.dim_borough b ON b.borough_id = d.borough_id
+LEFT JOIN core.dim_agency a ON a.agency_id = d.agency_id
+LEFT JOIN core.dim_complaint_type ct ON ct.complaint_type_id = d.complaint_type_id
+ORDER BY d.day, b.borough, a.agency, ct.complaint_type;
+
+-- The key's leading day column also serves the dashboard's date filters
+ALTER TABLE marts.requests_daily ADD PRIMARY KEY (day, borough, agency, complaint_type);
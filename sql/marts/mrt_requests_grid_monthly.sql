@@ -0,0 +1,45 @@
+-- Create monthly map grid mart (requests per grid cell at several resolutions)
+DROP TABLE IF EXISTS marts.requests_grid_monthly;
+
+CREATE TABLE marts.requests_grid_monthly AS
+WITH grid_levels AS (
+    -- Quadtree levels: each cell splits into 4x4 cells at the next resolution
+    -- (1/16, 1/64 and 1/256 degree, roughly 7 km, 1.7 km and 430 m)
+    SELECT * FROM (VALUES 
+        (0, CAST(0.0625 AS DOUBLE PRECISION)),
+        (1, CAST(0.015625 AS DOUBLE PRECISION)),
+        (2, CAST(0.00390625 AS DOUBLE PRECISION))
+    ) AS levels(resolution, cell_degrees)
+),
+binned AS (
+    SELECT 
+        g.resolution,
+        DATE_TRUNC('month', f.created_date)::DATE AS month,
+        CAST(FLOOR(f.latitude / g.cell_degrees) AS INTEGER) AS cell_y,
+        CAST(FLOOR(f.longitude / g.cell_degrees) AS INTEGER) AS cell_x,
+        f.agency_id,
+        f.complaint_type_id,
+        COUNT(*) AS requests
+    FROM core.fact_requests f
+    CROSS JOIN grid_levels g
+    -- Same bounding box as the data-quality out-of-bounds check
+    WHERE f.latitude BETWEEN 40.47 AND 40.93
+      AND f.longitude BETWEEN -74.27 AND -73.68
+    GROUP BY 1, 2, 3, 4, 5, 6
+)
+SELECT 
+    c.resolution,
+    c.month,
+    c.cell_y,
+    c.cell_x,
+    COALESCE(a.agency, '(missing)') AS agency,
+    COALESCE(ct.complaint_type, '(missing)') AS complaint_type,
+    c.requests
+FROM binned c
+LEFT JOIN core.dim_agency a ON a.agency_id = c.agency_id
+LEFT JOIN core.dim_complaint_type ct ON ct.complaint_type_id = c.complaint_type_id
+ORDER BY c.resolution, c.month, c.cell_y, c.cell_x;
+
+-- Map queries filter on resolution, month and the cell ranges in view
+ALTER TABLE marts.requests_grid_monthly 
+    ADD PRIMARY KEY (resolution, month, cell_y, cell_x, agency, complaint_type);
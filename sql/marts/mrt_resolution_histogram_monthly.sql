@@ -0,0 +1,50 @@
+-- Create monthly resolution-time histogram mart (log-spaced buckets)
+DROP TABLE IF EXISTS marts.resolution_histogram_monthly;
+
+CREATE TABLE marts.resolution_histogram_monthly AS
+WITH bucketed AS (
+    -- Log-spaced buckets, 8 per decade (see src/histograms.py): bucket 0 is
+    -- everything under 0.01 hours, bucket b covers
+    -- [10^((b - 17) / 8), 10^((b - 16) / 8)) hours and bucket 49 everything
+    -- from 10,000 hours up
+    SELECT 
+        DATE_TRUNC('month', created_date)::DATE AS month,
+        agency_id,
+        borough_id,
+        complaint_type_id,
+        CASE 
+            WHEN resolution_hours < 0.01 THEN 0
+            ELSE LEAST(CAST(FLOOR(LOG10(resolution_hours) * 8) AS INTEGER) + 17, 49)
+        END AS bucket,
+        resolution_hours
+    FROM core.fact_requests
+    WHERE closed_date IS NOT NULL
+),
+counts AS (
+    SELECT 
+        month,
+        agency_id,
+        borough_id,
+        complaint_type_id,
+        bucket,
+        COUNT(*) AS requests,
+        SUM(resolution_hours) AS total_resolution_hours
+    FROM bucketed
+    GROUP BY month, agency_id, borough_id, complaint_type_id, bucket
+)
+SELECT 
+    c.month,
+    COALESCE(a.agency, '(missing)') AS agency,
+    COALESCE(b.borough, '(missing)') AS borough,
+    COALESCE(ct.complaint_type, '(missing)') AS complaint_type,
+    CAST(c.bucket AS SMALLINT) AS bucket,
+    c.requests,
+    c.total_resolution_hours
+FROM counts c
+LEFT JOIN core.dim_agency a ON a.agency_id = c.agency_id
+LEFT JOIN core.dim_borough b ON b.borough_id = c.borough_id
+LEFT JOIN core.dim_complaint_type ct ON ct.complaint_type_id = c.complaint_type_id
+ORDER BY c.month, a.agency, b.borough, ct.complaint_type, c.bucket;
+
+ALTER TABLE marts.resolution_histogram_monthly 
+    ADD PRIMARY KEY (month, agency, borough, complaint_type, bucket);
@@ -5,22 +5,26 @@ CREATE TABLE marts.top_complaints_monthly AS
 WITH ranked_complaints AS (
     SELECT 
         DATE_TRUNC('month', created_date)::DATE AS month,
-        borough,
-        complaint_type,
+        borough_id,
+        complaint_type_id,
         COUNT(*) AS requests,
         ROW_NUMBER() OVER (
-            PARTITION BY DATE_TRUNC('month', created_date)::DATE, borough 
+            PARTITION BY DATE_TRUNC('month', created_date)::DATE, borough_id 
             ORDER BY COUNT(*) DESC
         ) AS rank
-    FROM core.nyc311_requests_clean
-    GROUP BY DATE_TRUNC('month', created_date)::DATE, borough, complaint_type
+    FROM core.fact_requests
+    GROUP BY DATE_TRUNC('month', created_date)::DATE, borough_id, complaint_type_id
 )
 SELECT 
-    month,
-    borough,
-    complaint_type,
-    requests
-FROM ranked_complaints
-WHERE rank <= 10
-ORDER BY month, borough, requests DESC;
+    r.month,
+    COALESCE(b.borough, '(missing)') AS borough,
+    COALESCE(ct.complaint_type, '(missing)') AS complaint_type,
+    r.requests
+FROM ranked_complaints r
+LEFT JOIN core.dim_borough b ON b.borough_id = r.borough_id
+LEFT JOIN core.dim_complaint_type ct ON ct.complaint_type_id = r.complaint_type_id
+WHERE r.rank <= 10
+ORDER BY r.month, b.borough, r.requests DESC;
+
+ALTER TABLE marts.top_complaints_monthly ADD PRIMARY KEY (month, borough, complaint_type);
 
@@ -11,6 +11,35 @@ CREATE TABLE IF NOT EXISTS raw.nyc311_requests (
     incident_zip TEXT,
     city TEXT,
     latitude DOUBLE PRECISION,
-    longitude DOUBLE PRECISION
+    longitude DOUBLE PRECISION,
+    row_hash TEXT
 );
 
+-- Tables created before change capture have no row_hash column
+ALTER TABLE raw.nyc311_requests ADD COLUMN IF NOT EXISTS row_hash TEXT;
+
+-- Change history (SCD2): one version per new or changed row per load,
+-- written by the loader (src/cdc.py). valid_to is null for the current version
+CREATE TABLE IF NOT EXISTS raw.nyc311_requests_history (
+    unique_key BIGINT NOT NULL,
+    created_date TIMESTAMP,
+    closed_date TIMESTAMP NULL,
+    agency TEXT,
+    complaint_type TEXT,
+    descriptor TEXT,
+    status TEXT,
+    borough TEXT,
+    incident_zip TEXT,
+    city TEXT,
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
+    row_hash TEXT NOT NULL,
+    change_type TEXT NOT NULL,
+    valid_from TIMESTAMP NOT NULL,
+    valid_to TIMESTAMP NULL,
+    PRIMARY KEY (unique_key, valid_from)
+);
+
+-- Incremental builds read the change feed by load time
+CREATE INDEX IF NOT EXISTS idx_nyc311_requests_history_valid_from 
+    ON raw.nyc311_requests_history(valid_from);
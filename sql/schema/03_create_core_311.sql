@@ -1,35 +1,188 @@
--- Create cleaned core table from raw NYC 311 data
+-- Build the core star schema from raw NYC 311 data
+--   core.dim_*          one row per distinct value, with a small integer key
+--   core.fact_requests  cleaned requests holding keys instead of repeated text
+--   core.requests_clean view joining the fact back to its dimensions (display only)
+
+-- The wide core table this schema replaces
 DROP TABLE IF EXISTS core.nyc311_requests_clean;
 
-CREATE TABLE core.nyc311_requests_clean AS
-SELECT 
-    unique_key,
-    created_date,
-    closed_date,
-    agency,
-    complaint_type,
-    descriptor,
-    status,
-    UPPER(borough) AS borough,
-    incident_zip,
-    city,
-    latitude,
-    longitude,
+-- ============================================
+-- Dimensions: created once, then extended with new values on every load.
+-- Existing keys never change, so marts and caches keyed on them stay valid.
+-- ============================================
+CREATE TABLE IF NOT EXISTS core.dim_agency (
+    agency_id SMALLINT PRIMARY KEY,
+    agency TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS core.dim_complaint_type (
+    complaint_type_id SMALLINT PRIMARY KEY,
+    complaint_type TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS core.dim_descriptor (
+    descriptor_id INTEGER PRIMARY KEY,
+    descriptor TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS core.dim_status (
+    status_id SMALLINT PRIMARY KEY,
+    status TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS core.dim_borough (
+    borough_id SMALLINT PRIMARY KEY,
+    borough TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS core.dim_city (
+    city_id INTEGER PRIMARY KEY,
+    city TEXT NOT NULL UNIQUE
+);
+
+INSERT INTO core.dim_agency (agency_id, agency)
+SELECT 
+    (SELECT COALESCE(MAX(agency_id), 0) FROM core.dim_agency) + ROW_NUMBER() OVER (ORDER BY agency),
+    agency
+FROM (
+    SELECT DISTINCT agency FROM raw.nyc311_requests
+    WHERE created_date IS NOT NULL AND agency IS NOT NULL
+) new_values
+WHERE agency NOT IN (SELECT agency FROM core.dim_agency);
+
+INSERT INTO core.dim_complaint_type (complaint_type_id, complaint_type)
+SELECT 
+    (SELECT COALESCE(MAX(complaint_type_id), 0) FROM core.dim_complaint_type) + ROW_NUMBER() OVER (ORDER BY complaint_type),
+    complaint_type
+FROM (
+    SELECT DISTINCT complaint_type FROM raw.nyc311_requests
+    WHERE created_date IS NOT NULL AND complaint_type IS NOT NULL
+) new_values
+WHERE complaint_type NOT IN (SELECT complaint_type FROM core.dim_complaint_type);
+
+INSERT INTO core.dim_descriptor (descriptor_id, descriptor)
+SELECT 
+    (SELECT COALESCE(MAX(descriptor_id), 0) FROM core.dim_descriptor) + ROW_NUMBER() OVER (ORDER BY descriptor),
+    descriptor
+FROM (
+    SELECT DISTINCT descriptor FROM raw.nyc311_requests
+    WHERE created_date IS NOT NULL AND descriptor IS NOT NULL
+) new_values
+WHERE descriptor NOT IN (SELECT descriptor FROM core.dim_descriptor);
+
+INSERT INTO core.dim_status (status_id, status)
+SELECT 
+    (SELECT COALESCE(MAX(status_id), 0) FROM core.dim_status) + ROW_NUMBER() OVER (ORDER BY status),
+    status
+FROM (
+    SELECT DISTINCT status FROM raw.nyc311_requests
+    WHERE created_date IS NOT NULL AND status IS NOT NULL
+) new_values
+WHERE status NOT IN (SELECT status FROM core.dim_status);
+
+INSERT INTO core.dim_borough (borough_id, borough)
+SELECT 
+    (SELECT COALESCE(MAX(borough_id), 0) FROM core.dim_borough) + ROW_NUMBER() OVER (ORDER BY borough),
+    borough
+FROM (
+    SELECT DISTINCT UPPER(borough) AS borough FROM raw.nyc311_requests
+    WHERE created_date IS NOT NULL AND borough IS NOT NULL
+) new_values
+WHERE borough NOT IN (SELECT borough FROM core.dim_borough);
+
+INSERT INTO core.dim_city (city_id, city)
+SELECT 
+    (SELECT COALESCE(MAX(city_id), 0) FROM core.dim_city) + ROW_NUMBER() OVER (ORDER BY city),
+    city
+FROM (
+    SELECT DISTINCT city FROM raw.nyc311_requests
+    WHERE created_date IS NOT NULL AND city IS NOT NULL
+) new_values
+WHERE city NOT IN (SELECT city FROM core.dim_city);
+
+-- ============================================
+-- Fact table
+-- ============================================
+DROP VIEW IF EXISTS core.requests_clean;
+
+DROP TABLE IF EXISTS core.fact_requests;
+
+CREATE TABLE core.fact_requests AS
+SELECT 
+    r.unique_key,
+    r.created_date,
+    r.closed_date,
+    a.agency_id,
+    ct.complaint_type_id,
+    d.descriptor_id,
+    s.status_id,
+    b.borough_id,
+    r.incident_zip,
+    c.city_id,
+    r.latitude,
+    r.longitude,
     CASE 
-        WHEN closed_date IS NOT NULL THEN 
-            EXTRACT(EPOCH FROM (closed_date - created_date)) / 3600.0
+        WHEN r.closed_date IS NOT NULL THEN 
+            EXTRACT(EPOCH FROM (r.closed_date - r.created_date)) / 3600.0
         ELSE NULL
     END AS resolution_hours
-FROM raw.nyc311_requests
-WHERE created_date IS NOT NULL;
+FROM raw.nyc311_requests r
+LEFT JOIN core.dim_agency a ON a.agency = r.agency
+LEFT JOIN core.dim_complaint_type ct ON ct.complaint_type = r.complaint_type
+LEFT JOIN core.dim_descriptor d ON d.descriptor = r.descriptor
+LEFT JOIN core.dim_status s ON s.status = r.status
+LEFT JOIN core.dim_borough b ON b.borough = UPPER(r.borough)
+LEFT JOIN core.dim_city c ON c.city = r.city
+WHERE r.created_date IS NOT NULL
+-- Stored in created_date order so block ranges (BRIN) and DuckDB's
+-- per-row-group min/max stats can skip everything outside a date filter
+ORDER BY r.created_date;
 
--- Add indexes for common query patterns
-CREATE INDEX IF NOT EXISTS idx_nyc311_clean_created_date 
-    ON core.nyc311_requests_clean(created_date);
+-- Indexes for the mart builds and dashboard date filters (Postgres only;
+-- DuckDB prunes date ranges with its min/max stats and scans the rest)
 
-CREATE INDEX IF NOT EXISTS idx_nyc311_clean_complaint_type 
-    ON core.nyc311_requests_clean(complaint_type);
+-- Block range index: a few pages that skip everything outside a date range
+-- backend: postgres
+CREATE INDEX IF NOT EXISTS idx_fact_requests_created_date_brin 
+    ON core.fact_requests USING BRIN (created_date);
 
-CREATE INDEX IF NOT EXISTS idx_nyc311_clean_borough 
-    ON core.nyc311_requests_clean(borough);
+-- Covers kpi_monthly and agency_performance_monthly (index-only scans)
+-- backend: postgres
+CREATE INDEX IF NOT EXISTS idx_fact_requests_created_agency 
+    ON core.fact_requests(created_date, agency_id) 
+    INCLUDE (closed_date, resolution_hours);
 
+-- Covers top_complaints_monthly, requests_daily and the borough medians
+-- backend: postgres
+CREATE INDEX IF NOT EXISTS idx_fact_requests_created_borough_complaint 
+    ON core.fact_requests(created_date, borough_id, complaint_type_id) 
+    INCLUDE (agency_id, closed_date, resolution_hours);
+
+-- Fresh statistics for the planner before the marts read the new table
+ANALYZE core.fact_requests;
+
+-- ============================================
+-- Wide view with the original core columns, for display and ad-hoc analysis
+-- ============================================
+CREATE VIEW core.requests_clean AS
+SELECT 
+    f.unique_key,
+    f.created_date,
+    f.closed_date,
+    a.agency,
+    ct.complaint_type,
+    d.descriptor,
+    s.status,
+    b.borough,
+    f.incident_zip,
+    c.city,
+    f.latitude,
+    f.longitude,
+    f.resolution_hours
+FROM core.fact_requests f
+LEFT JOIN core.dim_agency a ON a.agency_id = f.agency_id
+LEFT JOIN core.dim_complaint_type ct ON ct.complaint_type_id = f.complaint_type_id
+LEFT JOIN core.dim_descriptor d ON d.descriptor_id = f.descriptor_id
+LEFT JOIN core.dim_status s ON s.status_id = f.status_id
+LEFT JOIN core.dim_borough b ON b.borough_id = f.borough_id
+LEFT JOIN core.dim_city c ON c.city_id = f.city_id;
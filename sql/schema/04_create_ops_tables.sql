@@ -0,0 +1,28 @@
+-- Create operational tables for pipeline monitoring
+CREATE SCHEMA IF NOT EXISTS ops;
+
+-- Data-quality results, one row per metric per pipeline run
+CREATE TABLE IF NOT EXISTS ops.data_quality (
+    run_id TEXT NOT NULL,
+    checked_at TIMESTAMP NOT NULL,
+    metric TEXT NOT NULL,
+    column_name TEXT NULL,
+    value DOUBLE PRECISION NULL,
+    value_text TEXT NULL,
+    threshold DOUBLE PRECISION NULL,
+    passed BOOLEAN NULL
+);
+
+-- Refresh checkpoints, one row per stage per pipeline run (see src/pipeline.py).
+-- A stage is skipped when its last success had the same input fingerprint.
+CREATE TABLE IF NOT EXISTS ops.pipeline_stages (
+    run_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    input_hash TEXT NULL,
+    output_hash TEXT NULL,
+    started_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP NULL,
+    message TEXT NULL,
+    PRIMARY KEY (run_id, stage)
+);
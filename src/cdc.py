@@ -0,0 +1,143 @@
+"""
+Change-data capture for raw.nyc311_requests.
+
+Every load overwrites raw with the latest fetch window. Before it does,
+the loader hashes each incoming row (row_hashes) and compares the hashes
+with the ones already in raw (detect_changes). New and changed rows are
+appended to raw.nyc311_requests_history as SCD2 versions:
+- valid_from is the load time, valid_to stays null while the version is current
+- the previous current version of a changed key gets valid_to = the load time
+
+Rows that drop out of the fetch window are not deletions and are left as
+they are. Downstream incremental builds read the versions with valid_from
+after their last processed load (see the backlog mart in
+sql/marts/00_build_all_marts.sql) and touch only those keys.
+"""
+import pandas as pd
+from sqlalchemy import text
+from src.transform import RAW_COLUMNS, coerce_raw_types
+
+
+HISTORY_TABLE = "raw.nyc311_requests_history"
+HISTORY_COLUMNS = RAW_COLUMNS + ["row_hash", "change_type", "valid_from", "valid_to"]
+
+# Everything but the key goes into the hash
+HASH_COLUMNS = [c for c in RAW_COLUMNS if c != "unique_key"]
+
+
+def row_hashes(df):
+    """
+    Hash the raw columns of each row.
+    
+    Values are cast to the raw table types first, so a row hashes the same
+    whether it came from CSV or Parquet.
+    
+    Args:
+        df: DataFrame with the raw columns
+    
+    Returns:
+        pandas Series of 16-character hex strings, aligned with df
+    """
+    typed = coerce_raw_types(df)[HASH_COLUMNS]
+    for column in HASH_COLUMNS:
+        if column in ("created_date", "closed_date"):
+            typed[column] = typed[column].astype("datetime64[us]")
+        elif column not in ("latitude", "longitude"):
+            typed[column] = typed[column].astype("string")
+    hashes = pd.util.hash_pandas_object(typed, index=False)
+    return pd.Series([f"{h:016x}" for h in hashes.to_numpy()], index=df.index, dtype=object)
+
+
+def read_current_hashes(engine):
+    """
+    Read the row hashes currently stored in raw.nyc311_requests.
+    
+    Args:
+        engine: SQLAlchemy engine
+    
+    Returns:
+        pandas DataFrame with columns unique_key, row_hash (null for rows
+        loaded before hashing existed)
+    """
+    with engine.connect() as conn:
+        return pd.read_sql(text("SELECT unique_key, row_hash FROM raw.nyc311_requests"), conn)
+
+
+def detect_changes(df, current):
+    """
+    Find the rows of a new load that are not already in raw unchanged.
+    
+    Args:
+        df: Prepared load with the raw columns and row_hash
+        current: Output of read_current_hashes
+    
+    Returns:
+        pandas DataFrame: the new and changed rows of df, with change_type
+        'insert' (key not in raw) or 'update' (hash differs)
+    """
+    previous = pd.Series(
+        current["row_hash"].to_numpy(dtype=object),
+        index=pd.to_numeric(current["unique_key"]).to_numpy()
+    )
+    keys = pd.to_numeric(df["unique_key"], errors="coerce")
+    known = keys.isin(previous.index).to_numpy()
+    previous_hash = keys.map(previous).to_numpy(dtype=object)
+    changed = ~known | (previous_hash != df["row_hash"].to_numpy(dtype=object))
+    changes = df[changed].copy()
+    changes["change_type"] = ["update" if k else "insert" for k in known[changed]]
+    return changes
+
+
+def history_rows(changes, loaded_at):
+    """
+    Turn detected changes into new current versions for the history table.
+    
+    Args:
+        changes: Output of detect_changes
+        loaded_at: Load timestamp, used as valid_from
+    
+    Returns:
+        pandas DataFrame with HISTORY_COLUMNS
+    """
+    rows = changes.copy()
+    rows["valid_from"] = pd.Timestamp(loaded_at)
+    rows["valid_to"] = pd.NaT
+    return rows[HISTORY_COLUMNS]
+
+
+def sql_timestamp(value):
+    """
+    Format a timestamp as a SQL literal valid on Postgres and DuckDB.
+    
+    Args:
+        value: datetime or pandas Timestamp
+    
+    Returns:
+        str, e.g. TIMESTAMP '2025-01-31 06:00:00.123456'
+    """
+    return f"TIMESTAMP '{pd.Timestamp(value).isoformat(sep=' ')}'"
+
+
+def close_superseded_sql(loaded_at):
+    """
+    SQL that closes the versions replaced by the ones inserted at loaded_at.
+    
+    The timestamp is inlined as a literal so the statement runs unchanged
+    on a SQLAlchemy connection and on a native DuckDB connection.
+    
+    Args:
+        loaded_at: Load timestamp the new versions were inserted with
+    
+    Returns:
+        str: UPDATE statement
+    """
+    literal = sql_timestamp(loaded_at)
+    return f"""
+        UPDATE {HISTORY_TABLE}
+        SET valid_to = {literal}
+        WHERE valid_to IS NULL
+          AND valid_from < {literal}
+          AND unique_key IN (
+              SELECT unique_key FROM {HISTORY_TABLE} WHERE valid_from = {literal}
+          )
+    """
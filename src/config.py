@@ -4,6 +4,245 @@ Configuration utilities for database connection.
 import os
 
 
+SUPPORTED_BACKENDS = ('postgres', 'duckdb')
+DEFAULT_DUCKDB_PATH = 'data/nyc311.duckdb'
+DEFAULT_SOCRATA_URL = 'https://data.cityofnewyork.us/resource/erm2-nwe9.json'
+DEFAULT_RESULT_CACHE_MAX_MB = 512
+DEFAULT_TREND_MAX_POINTS = 500
+DEFAULT_INSIGHTS_CACHE_ENTRIES = 128
+DEFAULT_EXPORT_DIR = 'data/exports'
+DEFAULT_EXPORT_CHUNK_ROWS = 50_000
+DEFAULT_EXPORT_MAX_DOWNLOAD_MB = 200
+# create_engine argument -> (setting name after DB_ / DB_READ_, SQLAlchemy's default)
+POOL_SETTINGS = {
+    'pool_size': ('POOL_SIZE', 5),
+    'max_overflow': ('MAX_OVERFLOW', 10),
+    'pool_timeout': ('POOL_TIMEOUT', 30),
+}
+
+
+def get_setting(name, default=None):
+    """
+    Get a configuration value from environment variable or Streamlit secrets.
+    
+    Priority:
+    1. Environment variable (os.getenv) - for local development
+    2. Streamlit secrets (st.secrets) - for Streamlit Cloud deployment
+    3. The supplied default
+    
+    Args:
+        name: Setting name, e.g. 'DATABASE_URL'
+        default: Value returned when the setting is not found
+    
+    Returns:
+        str or the default value
+    """
+    value = os.getenv(name)
+    if value:
+        return value
+    
+    try:
+        import streamlit as st
+        if hasattr(st, 'secrets') and name in st.secrets:
+            return st.secrets[name]
+    except Exception:
+        # Streamlit not available, not in Streamlit context, or no secrets file.
+        # This is fine for standalone scripts
+        pass
+    
+    return default
+
+
+def get_db_backend():
+    """
+    Get the database backend to use ('postgres' or 'duckdb').
+    
+    Set DB_BACKEND=duckdb to run the whole pipeline on an embedded DuckDB
+    file instead of a Postgres server.
+    
+    Returns:
+        str: Backend name
+    
+    Raises:
+        RuntimeError: If DB_BACKEND is set to an unsupported value
+    """
+    backend = str(get_setting('DB_BACKEND', 'postgres')).lower()
+    if backend not in SUPPORTED_BACKENDS:
+        raise RuntimeError(
+            f"Unsupported DB_BACKEND '{backend}'. "
+            f"Choose one of: {', '.join(SUPPORTED_BACKENDS)}."
+        )
+    return backend
+
+
+def get_duckdb_path():
+    """
+    Get the path of the DuckDB database file (DUCKDB_PATH, default data/nyc311.duckdb).
+    
+    Returns:
+        str: Path to the DuckDB file
+    """
+    return get_setting('DUCKDB_PATH', DEFAULT_DUCKDB_PATH)
+
+
+def get_socrata_url():
+    """
+    Get the Socrata resource URL to fetch from (SOCRATA_URL, default NYC Open Data).
+    
+    Point this at a local stand-in (scripts/serve_socrata_stub.py) to test
+    fetching offline.
+    
+    Returns:
+        str: Resource URL ending in .json
+    """
+    return get_setting('SOCRATA_URL', DEFAULT_SOCRATA_URL)
+
+
+def get_duckdb_read_path():
+    """
+    Get the path of the DuckDB read replica (DUCKDB_READ_PATH).
+    
+    The refresh writes DUCKDB_PATH and then publishes a copy of it at this
+    path (see src.db.publish_duckdb_replica); the dashboard opens the copy
+    read-only, so a running refresh never locks it out.
+    
+    Returns:
+        str, or None when no replica is configured (the default)
+    """
+    return get_setting('DUCKDB_READ_PATH')
+
+
+def get_read_database_url():
+    """
+    Get the URL of the read replica the dashboard queries.
+    
+    DATABASE_READ_URL on Postgres (e.g. a streaming replica), or the
+    DUCKDB_READ_PATH file when DB_BACKEND=duckdb.
+    
+    Returns:
+        str, or None when no replica is configured; readers then use the
+        primary (get_database_url())
+    """
+    if get_db_backend() == 'duckdb':
+        read_path = get_duckdb_read_path()
+        return f"duckdb:///{read_path}" if read_path else None
+    return get_setting('DATABASE_READ_URL')
+
+
+def get_pool_settings(role='write'):
+    """
+    Get the connection pool settings of the write or the read engine.
+    
+    The write engine reads DB_POOL_SIZE, DB_MAX_OVERFLOW and DB_POOL_TIMEOUT.
+    The read engine reads DB_READ_POOL_SIZE, DB_READ_MAX_OVERFLOW and
+    DB_READ_POOL_TIMEOUT, falling back to the write engine's settings.
+    
+    Args:
+        role: 'write' or 'read'
+    
+    Returns:
+        dict: pool_size, max_overflow and pool_timeout for create_engine
+    """
+    settings = {}
+    for key, (name, default) in POOL_SETTINGS.items():
+        value = get_setting(f'DB_{name}', default)
+        if role == 'read':
+            value = get_setting(f'DB_READ_{name}', value)
+        settings[key] = int(value)
+    return settings
+
+
+def get_result_cache_dir():
+    """
+    Get the directory of the shared query-result cache (RESULT_CACHE_DIR).
+    
+    Point every dashboard replica at the same directory, e.g. a shared
+    volume, so a result computed by one is read from disk by the others.
+    
+    Returns:
+        str, or None when the shared cache is disabled (the default)
+    """
+    return get_setting('RESULT_CACHE_DIR')
+
+
+def get_result_cache_max_mb():
+    """
+    Get the size limit of the shared query-result cache in MB
+    (RESULT_CACHE_MAX_MB, default 512).
+    
+    Returns:
+        float: Size limit in MB
+    """
+    return float(get_setting('RESULT_CACHE_MAX_MB', DEFAULT_RESULT_CACHE_MAX_MB))
+
+
+def get_trend_max_points():
+    """
+    Get the most points a dashboard trend chart is drawn with
+    (TREND_MAX_POINTS, default 500).
+    
+    Trend queries pick the finest time bucket that fits and downsample
+    longer series to this many points; 0 turns downsampling off.
+    
+    Returns:
+        int: Point budget per series
+    """
+    return int(get_setting('TREND_MAX_POINTS', DEFAULT_TREND_MAX_POINTS))
+
+
+def get_insights_cache_entries():
+    """
+    Get the most Insights results a dashboard process keeps in memory
+    (INSIGHTS_CACHE_ENTRIES, default 128).
+    
+    The least recently used result is dropped when a new one would exceed
+    the limit.
+    
+    Returns:
+        int: Number of cached results
+    """
+    return int(get_setting('INSIGHTS_CACHE_ENTRIES', DEFAULT_INSIGHTS_CACHE_ENTRIES))
+
+
+def get_export_dir():
+    """
+    Get the directory dashboard exports are written to (EXPORT_DIR,
+    default data/exports).
+    
+    Exports too large to download through the browser stay here, so point
+    it at a volume users can reach, e.g. a shared drive.
+    
+    Returns:
+        str: Export directory
+    """
+    return get_setting('EXPORT_DIR', DEFAULT_EXPORT_DIR)
+
+
+def get_export_chunk_rows():
+    """
+    Get the rows fetched and written per chunk by exports
+    (EXPORT_CHUNK_ROWS, default 50,000).
+    
+    Returns:
+        int: Rows per chunk
+    """
+    return int(get_setting('EXPORT_CHUNK_ROWS', DEFAULT_EXPORT_CHUNK_ROWS))
+
+
+def get_export_max_download_mb():
+    """
+    Get the largest export offered as a browser download in MB
+    (EXPORT_MAX_DOWNLOAD_MB, default 200).
+    
+    Streamlit holds a download's bytes in memory while it is served;
+    larger exports are left in EXPORT_DIR instead.
+    
+    Returns:
+        float: Size limit in MB
+    """
+    return float(get_setting('EXPORT_MAX_DOWNLOAD_MB', DEFAULT_EXPORT_MAX_DOWNLOAD_MB))
+
+
 def get_database_url():
     """
     Get DATABASE_URL from environment variable or Streamlit secrets.
@@ -12,31 +251,25 @@ def get_database_url():
     1. Environment variable (os.getenv) - for local development
     2. Streamlit secrets (st.secrets) - for Streamlit Cloud deployment
     
+    When DB_BACKEND=duckdb, a duckdb:/// URL pointing at DUCKDB_PATH is
+    returned instead, so no server needs to be configured.
+    
     Returns:
         str: Database connection URL
-        
+    
     Raises:
         RuntimeError: If DATABASE_URL is not found in either location
     """
-    # First, try environment variable (local development)
-    database_url = os.getenv('DATABASE_URL')
+    if get_db_backend() == 'duckdb':
+        return f"duckdb:///{get_duckdb_path()}"
+    
+    database_url = get_setting('DATABASE_URL')
     if database_url:
         return database_url
     
-    # Second, try Streamlit secrets (Streamlit Cloud)
-    try:
-        import streamlit as st
-        if hasattr(st, 'secrets') and 'DATABASE_URL' in st.secrets:
-            return st.secrets['DATABASE_URL']
-    except (ImportError, RuntimeError):
-        # Streamlit not available or not in Streamlit context
-        # This is fine for standalone scripts
-        pass
-    
     # Neither found - raise clear error
     raise RuntimeError(
         "DATABASE_URL not found. "
         "For local development: Set DATABASE_URL in .env file or environment variables. "
         "For Streamlit Cloud: Add DATABASE_URL in Advanced settings → Secrets (TOML format)."
     )
-
@@ -1,17 +1,173 @@
 """
 Database connection utilities.
+
+Writes and reads use separate engines:
+- get_engine(): the primary, for the refresh pipeline and the scripts
+- get_read_engine(): the read replica (DATABASE_READ_URL, or the
+  DUCKDB_READ_PATH copy), for the dashboard; the primary when none is set
+Each has its own pool settings (see src.config.get_pool_settings), so a
+refresh cannot take the connections the dashboard needs.
 """
+import os
+import re
+import shutil
+import threading
 from sqlalchemy import create_engine
-from src.config import get_database_url
+from sqlalchemy.pool import NullPool
+from src.config import (
+    get_database_url, get_db_backend, get_duckdb_path, get_duckdb_read_path,
+    get_pool_settings, get_read_database_url,
+)
+from src.profiling import profile_run
+
+# A "-- backend: postgres" comment limits the statement after it to one backend
+_BACKEND_TAG = re.compile(r"^\s*--\s*backend:\s*(\w+)", re.MULTILINE)
+
+_read_engines = {}
+_read_engines_lock = threading.Lock()
 
 
 def get_engine():
     """
-    Get SQLAlchemy engine from DATABASE_URL.
+    Get SQLAlchemy engine for the primary database (DATABASE_URL).
+    
+    This is the write engine: the pipeline, the SQL builds and the scripts
+    use it. Its pool is sized by DB_POOL_SIZE, DB_MAX_OVERFLOW and
+    DB_POOL_TIMEOUT.
+    
+    With DB_BACKEND=duckdb the engine points at the embedded DuckDB file.
+    Connections are not pooled in that case: DuckDB allows a single writer
+    process per file, and a pooled connection held by the dashboard would
+    block the refresh scripts.
     
     Returns:
         sqlalchemy.engine.Engine
     """
     database_url = get_database_url()
-    return create_engine(database_url)
+    if get_db_backend() == 'duckdb':
+        db_dir = os.path.dirname(get_duckdb_path())
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        return create_engine(database_url, poolclass=NullPool)
+    return create_engine(database_url, **get_pool_settings('write'))
+
+
+def get_read_engine():
+    """
+    Get SQLAlchemy engine for dashboard reads.
+    
+    Connects to the read replica when one is configured (DATABASE_READ_URL,
+    or DUCKDB_READ_PATH once the pipeline has published it) and to the
+    primary otherwise. The engine is shared by the whole process, so its
+    pool (DB_READ_POOL_SIZE, DB_READ_MAX_OVERFLOW, DB_READ_POOL_TIMEOUT)
+    outlives a Streamlit rerun.
+    
+    Returns:
+        sqlalchemy.engine.Engine
+    """
+    read_url = get_read_database_url()
+    backend = get_db_backend()
+    if backend == 'duckdb' and read_url and not os.path.exists(get_duckdb_read_path()):
+        # Not published yet
+        read_url = None
+    settings = get_pool_settings('read')
+    key = (read_url or get_database_url(), tuple(sorted(settings.items())))
+    with _read_engines_lock:
+        if key not in _read_engines:
+            if read_url is None:
+                engine = get_engine() if backend == 'duckdb' else create_engine(key[0], **settings)
+            elif backend == 'duckdb':
+                # Read-only, so any number of dashboard processes can open the copy
+                engine = create_engine(read_url, poolclass=NullPool, connect_args={'read_only': True})
+            else:
+                engine = create_engine(read_url, pool_pre_ping=True, **settings)
+            _read_engines[key] = engine
+        return _read_engines[key]
+
+
+def publish_duckdb_replica():
+    """
+    Copy the DuckDB primary to DUCKDB_READ_PATH for the dashboard to read.
+    
+    The copy is written next to the replica and renamed into place, so
+    readers switch to the new data on their next connection. Run when no
+    other process is writing the primary.
+    
+    Returns:
+        str: Replica path, or None when no DuckDB replica is configured
+    """
+    read_path = get_duckdb_read_path()
+    if get_db_backend() != 'duckdb' or not read_path:
+        return None
+    engine = get_engine()
+    with engine.connect() as conn:
+        # Fold the WAL into the database file so the copy is complete
+        conn.exec_driver_sql("CHECKPOINT")
+    engine.dispose()
+    read_dir = os.path.dirname(read_path)
+    if read_dir:
+        os.makedirs(read_dir, exist_ok=True)
+    temp_path = f"{read_path}.{os.getpid()}.tmp"
+    shutil.copyfile(get_duckdb_path(), temp_path)
+    os.replace(temp_path, read_path)
+    return read_path
+
+
+def split_sql_statements(sql, backend=None):
+    """
+    Split the contents of a SQL file into individual statements.
+    
+    The project's SQL files keep semicolons out of string literals, so a
+    plain split is sufficient. Comment-only fragments are dropped.
+    
+    Statements preceded by a "-- backend: <name>" comment (e.g. BRIN
+    indexes, which only Postgres has) are dropped when backend is given
+    and differs.
+    
+    Args:
+        sql: SQL script text
+        backend: 'postgres' or 'duckdb' (default: keep every statement)
+    
+    Returns:
+        list of str: Statements without trailing semicolons
+    """
+    statements = []
+    for chunk in sql.split(';'):
+        code_lines = [
+            line for line in chunk.splitlines()
+            if line.strip() and not line.strip().startswith('--')
+        ]
+        if not code_lines:
+            continue
+        tags = _BACKEND_TAG.findall(chunk)
+        if backend is not None and tags and backend not in tags:
+            continue
+        statements.append(chunk.strip())
+    return statements
 
+
+def engine_backend(engine):
+    """
+    Get the backend name ('postgres' or 'duckdb') of a SQLAlchemy engine.
+    """
+    return 'duckdb' if engine.dialect.name == 'duckdb' else 'postgres'
+
+
+def run_sql_file(path, engine=None):
+    """
+    Execute a SQL file statement by statement in a single transaction.
+    
+    This replaces `psql -f` so the schema and mart builds run the same way
+    on Postgres and DuckDB. Each file is a profiled run (see src.profiling).
+    
+    Args:
+        path: Path to the .sql file
+        engine: SQLAlchemy engine (default: get_engine())
+    """
+    engine = engine or get_engine()
+    with open(path) as f:
+        statements = split_sql_statements(f.read(), engine_backend(engine))
+    name = os.path.splitext(os.path.basename(path))[0]
+    with profile_run(f"sql-{name}"), engine.begin() as conn:
+        for statement in statements:
+            conn.exec_driver_sql(statement)
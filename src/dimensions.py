@@ -0,0 +1,104 @@
+"""
+Dimension tables of the core star schema.
+
+core.fact_requests stores small integer keys instead of repeating the
+agency, complaint_type, descriptor, status, borough and city text on every
+row. Dimensions only grow: values not seen before get the next keys in
+sorted order and existing keys never change, the same way
+sql/schema/03_create_core_311.sql maintains them from raw.
+"""
+import pandas as pd
+from sqlalchemy import text
+
+
+DIMENSIONS = ["agency", "complaint_type", "descriptor", "status", "borough", "city"]
+
+# Nullable pandas dtypes matching the key columns (SMALLINT / INTEGER)
+KEY_DTYPES = {
+    "agency": "Int16",
+    "complaint_type": "Int16",
+    "descriptor": "Int32",
+    "status": "Int16",
+    "borough": "Int16",
+    "city": "Int32",
+}
+
+FACT_COLUMNS = [
+    "unique_key", "created_date", "closed_date", "agency_id",
+    "complaint_type_id", "descriptor_id", "status_id", "borough_id",
+    "incident_zip", "city_id", "latitude", "longitude", "resolution_hours"
+]
+
+
+def dimension_table(column):
+    return f"core.dim_{column}"
+
+
+def dimension_key(column):
+    return f"{column}_id"
+
+
+def new_members(values, existing, column):
+    """
+    Assign keys to values a dimension has not seen yet.
+    
+    Args:
+        values: Series of column values (nulls are ignored)
+        existing: DataFrame with the dimension's key and value columns
+        column: Dimension name, e.g. 'agency'
+    
+    Returns:
+        pandas DataFrame with the same columns as existing, one row per new value
+    """
+    key = dimension_key(column)
+    new_values = sorted(set(values.dropna()) - set(existing[column]))
+    start = int(existing[key].max()) if not existing.empty else 0
+    return pd.DataFrame({
+        key: range(start + 1, start + 1 + len(new_values)),
+        column: new_values,
+    })
+
+
+def sync_dimensions(core_df, engine):
+    """
+    Add the values of a cleaned batch to the dimension tables.
+    
+    Args:
+        core_df: Output of src.transform.clean_requests
+        engine: SQLAlchemy engine; the dimension tables must exist
+    
+    Returns:
+        dict mapping each dimension name to its full DataFrame (key, value)
+    """
+    dims = {}
+    with engine.begin() as conn:
+        for column in DIMENSIONS:
+            key = dimension_key(column)
+            existing = pd.read_sql(text(f"SELECT {key}, {column} FROM {dimension_table(column)}"), conn)
+            added = new_members(core_df[column], existing, column)
+            if not added.empty:
+                conn.execute(
+                    text(f"INSERT INTO {dimension_table(column)} ({key}, {column}) VALUES (:key, :value)"),
+                    [{"key": int(k), "value": str(v)} for k, v in zip(added[key], added[column])]
+                )
+            dims[column] = pd.concat([existing, added], ignore_index=True)
+    return dims
+
+
+def encode_dimensions(core_df, dims):
+    """
+    Replace the dimension text columns of a cleaned batch with their keys.
+    
+    Args:
+        core_df: Output of src.transform.clean_requests
+        dims: Output of sync_dimensions
+    
+    Returns:
+        pandas DataFrame with FACT_COLUMNS
+    """
+    fact = core_df.drop(columns=DIMENSIONS)
+    for column in DIMENSIONS:
+        key = dimension_key(column)
+        mapping = pd.Series(dims[column][key].to_numpy(), index=dims[column][column].to_numpy())
+        fact[key] = core_df[column].map(mapping).astype(KEY_DTYPES[column])
+    return fact[FACT_COLUMNS]
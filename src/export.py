@@ -0,0 +1,349 @@
+"""
+Streaming exports of dashboard data to CSV or Parquet.
+
+Every page can export what it shows (the filtered result behind its table
+and charts) or the core rows behind it (core.fact_requests joined to its
+dimensions, with the page's filters). The core rows can run to millions, so
+they are never read into one DataFrame:
+- the query runs with stream_results and yield_per, i.e. a server-side
+  cursor on Postgres; DuckDB has no server-side cursors, but runs the query
+  as a stream that SQLAlchemy fetches from with fetchmany(), as long as it
+  has no ORDER BY (a sort buffers the whole result)
+- each chunk of EXPORT_CHUNK_ROWS rows is appended to the file (a CSV
+  append, or one Parquet row group) and dropped before the next is fetched
+- the file is written to EXPORT_DIR under a temporary name and renamed
+  into place when complete
+
+Dashboard exports are named with DASHBOARD_PREFIX and are the only files
+remove_stale_exports() deletes, so exports written to EXPORT_DIR by
+scripts/export_requests.py are kept.
+
+Streamlit holds a download button's bytes in memory while it is served, so
+only exports up to EXPORT_MAX_DOWNLOAD_MB are offered as downloads, and
+their bytes are read from disk when the user clicks. Larger exports stay
+in EXPORT_DIR, and scripts/export_requests.py writes the same files from
+the command line.
+"""
+import os
+import time
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+from src.config import get_export_chunk_rows, get_export_dir, get_export_max_download_mb
+from src.db import get_read_engine
+from src.result_cache import get_data_version
+
+
+# Format -> (MIME type, file extension)
+FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+}
+
+# Fixed schema of the core rows, so a chunk where a column happens to be
+# all-null still matches the Parquet file's schema
+CORE_SCHEMA = pa.schema([
+    ('unique_key', pa.int64()),
+    ('created_date', pa.timestamp('us')),
+    ('closed_date', pa.timestamp('us')),
+    ('agency', pa.string()),
+    ('complaint_type', pa.string()),
+    ('descriptor', pa.string()),
+    ('status', pa.string()),
+    ('borough', pa.string()),
+    ('incident_zip', pa.string()),
+    ('city', pa.string()),
+    ('latitude', pa.float64()),
+    ('longitude', pa.float64()),
+    ('resolution_hours', pa.float64()),
+])
+
+# Dashboard exports older than this are deleted when the next one is written
+MAX_EXPORT_AGE_S = 24 * 3600
+# File name prefix of dashboard exports, e.g. dashboard-overview-requests-...
+DASHBOARD_PREFIX = "dashboard-"
+
+
+def core_rows_query(start=None, end=None, agency=None, borough=None, complaint_type=None, bounds=None):
+    """
+    Build the query for the core rows behind a page's filters.
+    
+    Dimension values are matched the way the marts label them, so a null
+    borough matches '(missing)'. The query has no ORDER BY, so DuckDB can
+    stream it.
+    
+    Args:
+        start: Inclusive first created_date (default: all data)
+        end: Exclusive end of created_date (default: all data)
+        agency: Only this agency (default: all)
+        borough: Only this borough (default: all)
+        complaint_type: Only this complaint type (default: all)
+        bounds: Only requests inside (lat_min, lat_max, lon_min, lon_max)
+    
+    Returns:
+        tuple: (sqlalchemy text() query, params dict)
+    """
+    clauses = ["TRUE"]
+    params = {}
+    if start is not None:
+        clauses.append("f.created_date >= :start")
+        params['start'] = pd.Timestamp(start).to_pydatetime()
+    if end is not None:
+        clauses.append("f.created_date < :end")
+        params['end'] = pd.Timestamp(end).to_pydatetime()
+    if agency is not None:
+        clauses.append("COALESCE(a.agency, '(missing)') = :agency")
+        params['agency'] = agency
+    if borough is not None:
+        clauses.append("COALESCE(b.borough, '(missing)') = :borough")
+        params['borough'] = borough
+    if complaint_type is not None:
+        clauses.append("COALESCE(ct.complaint_type, '(missing)') = :complaint_type")
+        params['complaint_type'] = complaint_type
+    if bounds is not None:
+        clauses.append("f.latitude BETWEEN :lat_min AND :lat_max")
+        clauses.append("f.longitude BETWEEN :lon_min AND :lon_max")
+        params.update(zip(['lat_min', 'lat_max', 'lon_min', 'lon_max'], bounds))
+    
+    query = text(f"""
+        SELECT
+            f.unique_key,
+            f.created_date,
+            f.closed_date,
+            a.agency,
+            ct.complaint_type,
+            d.descriptor,
+            s.status,
+            b.borough,
+            f.incident_zip,
+            c.city,
+            f.latitude,
+            f.longitude,
+            CAST(f.resolution_hours AS DOUBLE PRECISION) AS resolution_hours
+        FROM core.fact_requests f
+        LEFT JOIN core.dim_agency a ON a.agency_id = f.agency_id
+        LEFT JOIN core.dim_complaint_type ct ON ct.complaint_type_id = f.complaint_type_id
+        LEFT JOIN core.dim_descriptor d ON d.descriptor_id = f.descriptor_id
+        LEFT JOIN core.dim_status s ON s.status_id = f.status_id
+        LEFT JOIN core.dim_borough b ON b.borough_id = f.borough_id
+        LEFT JOIN core.dim_city c ON c.city_id = f.city_id
+        WHERE {' AND '.join(clauses)}
+    """)
+    return query, params
+
+
+def iter_query_chunks(query, params=None, engine=None, chunk_rows=None):
+    """
+    Run a query and yield its result a chunk at a time.
+    
+    Args:
+        query: SQLAlchemy text() query
+        params: Query parameters
+        engine: SQLAlchemy engine (default: get_read_engine())
+        chunk_rows: Rows per chunk (default: EXPORT_CHUNK_ROWS)
+    
+    Yields:
+        pandas DataFrame of up to chunk_rows rows; a query without rows
+        yields one empty DataFrame with the result's columns
+    """
+    engine = engine or get_read_engine()
+    chunk_rows = chunk_rows or get_export_chunk_rows()
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(query, params or {})
+        columns = list(result.keys())
+        empty = True
+        for rows in result.partitions(chunk_rows):
+            empty = False
+            yield pd.DataFrame.from_records(rows, columns=columns)
+        if empty:
+            yield pd.DataFrame(columns=columns)
+
+
+def iter_frame_chunks(df, chunk_rows=None):
+    """
+    Yield a DataFrame that is already in memory as export chunks.
+    """
+    chunk_rows = chunk_rows or get_export_chunk_rows()
+    for offset in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[offset:offset + chunk_rows]
+
+
+def write_chunks(chunks, path, fmt, schema=None):
+    """
+    Append chunks to a CSV or Parquet file, one chunk in memory at a time.
+    
+    Args:
+        chunks: Iterable of DataFrames with the same columns
+        path: Output path
+        fmt: 'csv' or 'parquet'
+        schema: pyarrow schema of the Parquet file (default: the first
+            chunk's, with all-null columns as strings)
+    
+    Returns:
+        int: Rows written
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt} (expected one of {', '.join(FORMATS)})")
+    written = 0
+    if fmt == 'csv':
+        with open(path, 'w', newline='') as f:
+            for i, chunk in enumerate(chunks):
+                chunk.to_csv(f, header=i == 0, index=False)
+                written += len(chunk)
+        return written
+    
+    writer = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                if schema is None:
+                    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                    schema = pa.schema([
+                        field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                        for field in schema
+                    ])
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            written += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
+
+
+def remove_stale_exports(max_age_s=MAX_EXPORT_AGE_S):
+    """
+    Delete dashboard exports in EXPORT_DIR older than max_age_s seconds.
+    
+    Files without DASHBOARD_PREFIX, e.g. from scripts/export_requests.py,
+    are left alone.
+    """
+    export_dir = get_export_dir()
+    if not os.path.isdir(export_dir):
+        return
+    cutoff = time.time() - max_age_s
+    for entry in os.scandir(export_dir):
+        try:
+            if (entry.is_file() and entry.name.startswith(DASHBOARD_PREFIX)
+                    and entry.stat().st_mtime < cutoff):
+                os.remove(entry.path)
+        except OSError:
+            # Removed by another process
+            pass
+
+
+def export_to_file(chunks, fmt, name, schema=None):
+    """
+    Write an export to a new file in EXPORT_DIR.
+    
+    Args:
+        chunks: Iterable of DataFrames (see iter_query_chunks)
+        fmt: 'csv' or 'parquet'
+        name: File name prefix, e.g. 'complaints-requests'
+        schema: pyarrow schema for Parquet (see write_chunks)
+    
+    Returns:
+        tuple: (path, rows written)
+    """
+    export_dir = get_export_dir()
+    os.makedirs(export_dir, exist_ok=True)
+    remove_stale_exports()
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(export_dir, f"{name}-{stamp}-{uuid.uuid4().hex[:8]}{FORMATS[fmt][1]}")
+    temp_path = f"{path}.tmp"
+    try:
+        rows = write_chunks(chunks, temp_path, fmt, schema=schema)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return path, rows
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _format_size(n_bytes):
+    for unit in ('B', 'KB', 'MB'):
+        if n_bytes < 1024:
+            return f"{n_bytes:,.0f} {unit}"
+        n_bytes /= 1024
+    return f"{n_bytes:,.1f} GB"
+
+
+def render_export(name, result=None, core_filters=None, engine=None):
+    """
+    Show the page's export controls in a collapsed section.
+    
+    The export is written when the user asks for it and kept in the
+    session until the filters or the data version change.
+    
+    Args:
+        name: Page name used for widget keys and file names, e.g. 'complaints'
+        result: The page's current filtered result (DataFrame), if any
+        core_filters: Keyword arguments of core_rows_query() matching the
+            page's filters; None to not offer the core rows
+        engine: SQLAlchemy engine (default: get_read_engine())
+    """
+    import streamlit as st
+    
+    sources = {}
+    if result is not None:
+        sources["Current view"] = 'result'
+    if core_filters is not None:
+        sources["Underlying requests"] = 'core'
+    
+    with st.expander("Export data"):
+        col1, col2 = st.columns(2)
+        with col1:
+            source = sources[st.radio("Rows", list(sources), key=f"export_source_{name}")]
+        with col2:
+            fmt = st.radio("Format", list(FORMATS), format_func=str.upper, horizontal=True,
+                           key=f"export_format_{name}")
+        
+        # An export is shown until the source, format, filters or data change;
+        # its file stays in EXPORT_DIR until remove_stale_exports() deletes it
+        request = (source, fmt, repr(sorted((core_filters or {}).items())), get_data_version(engine))
+        state_key = f"export_{name}"
+        export = st.session_state.get(state_key)
+        if export is not None and (export['request'] != request or not os.path.exists(export['path'])):
+            del st.session_state[state_key]
+            export = None
+        
+        if st.button("Prepare export", key=f"export_prepare_{name}"):
+            with st.spinner("Writing export..."):
+                if source == 'core':
+                    chunks = iter_query_chunks(*core_rows_query(**core_filters), engine=engine)
+                    path, rows = export_to_file(chunks, fmt, f"{DASHBOARD_PREFIX}{name}-requests",
+                                                schema=CORE_SCHEMA)
+                else:
+                    path, rows = export_to_file(iter_frame_chunks(result), fmt, f"{DASHBOARD_PREFIX}{name}")
+            export = {'request': request, 'path': path, 'rows': rows}
+            st.session_state[state_key] = export
+        
+        if export is None:
+            st.caption(f"Exports over {get_export_max_download_mb():,.0f} MB are kept on the server "
+                       f"instead of downloaded.")
+            return
+        
+        size = os.path.getsize(export['path'])
+        file_name = os.path.basename(export['path'])
+        if size <= get_export_max_download_mb() * 1024 * 1024:
+            path = export['path']
+            st.download_button(
+                f"Download {file_name} ({export['rows']:,} rows, {_format_size(size)})",
+                lambda: _read_file(path),
+                file_name=file_name,
+                mime=FORMATS[fmt][0],
+                use_container_width=True
+            )
+        else:
+            st.info(
+                f"{export['rows']:,} rows ({_format_size(size)}) is too large to download through the "
+                f"browser. The file was written to `{os.path.abspath(export['path'])}`."
+            )
@@ -0,0 +1,553 @@
+"""
+Plotly figures of the Overview, Complaints and Agency Performance pages,
+memoized per (chart, filters, data version).
+
+Every chart is registered here with the page query it is drawn from and a
+function that builds it from that query's DataFrame. figure() returns the
+chart as a Plotly figure and only builds it on a miss:
+- specs (the figure's JSON) are kept in memory per data version
+- with RESULT_CACHE_DIR set they are also shared between processes as
+  .json files in the result cache (see src.result_cache)
+- a hit turns the spec back into a figure without re-validating it, which
+  costs a small fraction of building it from the DataFrame
+
+scripts/build_marts.py calls prerender() after a build when RESULT_CACHE_DIR
+is set, so the default view of every chart (and each borough's and
+agency's) is in the cache before the first rerun asks for it.
+
+Charts drawn from an analysis instead of a page query (query None) get a
+DataFrame that is already filtered in the database; pass the filters that
+selected it, so they are part of the key. These are not pre-rendered.
+
+Builders import Plotly when they run, so pages without Plotly still fall
+back to their matplotlib and st.*_chart versions on ImportError.
+"""
+import json
+import threading
+from sqlalchemy import text
+from src import timeseries
+from src.config import get_trend_max_points
+from src.queries import (
+    AGENCY_PERFORMANCE_QUERY, BACKLOG_BY_AGENCY_QUERY, BACKLOG_TREND_QUERY,
+    KPI_MONTHLY_QUERY, TOP_COMPLAINTS_QUERY,
+)
+from src.result_cache import cache_key, cached_read_sql, get_data_version, get_result_cache
+
+
+ALL_BOROUGHS = 'All Boroughs'
+ALL_MONTHS = 'All Months'
+ALL_AGENCIES = 'All Agencies'
+
+AGING_BUCKETS = {
+    'age_0_1d': ('Under 1 day', '#10b981'),
+    'age_1_7d': ('1-7 days', '#2563eb'),
+    'age_7_30d': ('7-30 days', '#f59e0b'),
+    'age_30d_plus': ('30+ days', '#ef4444'),
+}
+
+_HORIZONTAL_LEGEND = dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class Chart:
+    """
+    One dashboard chart and how to build it.
+    
+    Args:
+        name: Chart name, part of the cache key
+        query: Page query whose DataFrame the chart is built from, or None
+        build: Function(df, **filters) -> plotly Figure
+        views: Function(df) -> list of filter dicts to pre-render
+    """
+    
+    def __init__(self, name, query, build, views=None):
+        self.name = name
+        self.query = query
+        self.build = build
+        self.views = views or (lambda df: [{}])
+    
+    def __repr__(self):
+        return f"Chart({self.name!r})"
+
+
+CHARTS = {}
+
+
+def chart(name, query, views=None):
+    """
+    Register the decorated function as the builder of a chart.
+    
+    Args:
+        name: Chart name
+        query: Page query the chart is drawn from, or None
+        views: Function(df) -> filter dicts that prerender() builds
+    """
+    def register(build):
+        if name in CHARTS:
+            raise ValueError(f"Chart already registered: {name}")
+        CHARTS[name] = Chart(name, query, build, views)
+        return build
+    return register
+
+
+def clear_cache():
+    """
+    Drop all memoized figure specs.
+    """
+    with _cache_lock:
+        _cache.clear()
+
+
+def figure_spec(name, df, version, **filters):
+    """
+    Get a chart's figure as JSON, building it only on a miss.
+    
+    The key is (name, filters, version), not the DataFrame: df must be the
+    chart's query result for that data version.
+    
+    Args:
+        name: Registered chart name
+        df: Result of the chart's query
+        version: Data version (see src.result_cache.get_data_version)
+        **filters: The chart's filter values
+    
+    Returns:
+        str: Plotly figure JSON
+    """
+    key = (name, tuple(sorted(filters.items())), str(version))
+    with _cache_lock:
+        if key in _cache:
+            return _cache[key]
+    
+    cache = get_result_cache()
+    disk_key = cache_key(f"figure:{name}", filters, version)
+    spec = cache.get_text(disk_key) if cache is not None else None
+    if spec is None:
+        spec = CHARTS[name].build(df, **filters).to_json()
+        if cache is not None:
+            cache.put_text(disk_key, spec)
+    with _cache_lock:
+        # Specs for older data versions can never be hit again
+        for stale in [k for k in _cache if k[0] == name and k[2] != key[2]]:
+            del _cache[stale]
+        _cache[key] = spec
+    return spec
+
+
+def figure(name, df, version, **filters):
+    """
+    Get a chart as a Plotly figure, from the cache when possible.
+    
+    Args:
+        name: Registered chart name
+        df: Result of the chart's query
+        version: Data version
+        **filters: The chart's filter values
+    
+    Returns:
+        plotly.graph_objects.Figure
+    """
+    import plotly.graph_objects as go
+    
+    spec = figure_spec(name, df, version, **filters)
+    # The spec was validated when it was built; validating it again would
+    # cost about as much as building it
+    return go.Figure(json.loads(spec), _validate=False)
+
+
+def prerender(engine=None):
+    """
+    Build the registered views of every chart into the shared result cache.
+    
+    Also caches the page queries the charts are drawn from. Does nothing
+    when RESULT_CACHE_DIR is not set.
+    
+    Args:
+        engine: SQLAlchemy engine to read the marts from (default: get_read_engine())
+    
+    Returns:
+        int: Number of figures built or already cached
+    """
+    if get_result_cache() is None:
+        return 0
+    # Just after a build: the version must not be one looked up before it
+    version = get_data_version(engine, max_age_s=0)
+    frames = {}
+    rendered = 0
+    for item in CHARTS.values():
+        if item.query is None:
+            continue
+        if item.query not in frames:
+            frames[item.query] = cached_read_sql(text(item.query), engine, version=version)
+        df = frames[item.query]
+        if df.empty:
+            continue
+        for filters in item.views(df):
+            figure_spec(item.name, df, version, **filters)
+            rendered += 1
+    return rendered
+
+
+def _each_borough(df):
+    return [{'borough': ALL_BOROUGHS, 'month': ALL_MONTHS}] + [
+        {'borough': borough, 'month': ALL_MONTHS} for borough in sorted(df['borough'].dropna().unique())
+    ]
+
+
+def _each_agency(df):
+    return [{'agency': ALL_AGENCIES}] + [
+        {'agency': agency} for agency in sorted(df['agency'].dropna().unique())
+    ]
+
+
+def _trend(df, column, name, color, fillcolor, yaxis_title):
+    import plotly.graph_objects as go
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=df['month'],
+        y=df[column],
+        mode='lines+markers',
+        name=name,
+        line=dict(color=color, width=3),
+        marker=dict(size=8),
+        fill='tozeroy',
+        fillcolor=fillcolor
+    ))
+    fig.update_layout(
+        xaxis_title="Month",
+        yaxis_title=yaxis_title,
+        hovermode='x unified',
+        height=400,
+        showlegend=False,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
+
+
+@chart("overview_total_requests", KPI_MONTHLY_QUERY)
+def _overview_total_requests(df):
+    return _trend(df, 'total_requests', 'Total Requests', '#2563eb', 'rgba(37, 99, 235, 0.1)',
+                  "Number of Requests")
+
+
+@chart("overview_median_resolution", KPI_MONTHLY_QUERY)
+def _overview_median_resolution(df):
+    return _trend(df, 'median_resolution_hours', 'Median Resolution Hours', '#f59e0b',
+                  'rgba(245, 158, 11, 0.1)', "Resolution Time (Hours)")
+
+
+@chart("overview_resolution_comparison", KPI_MONTHLY_QUERY)
+def _overview_resolution_comparison(df):
+    import plotly.graph_objects as go
+    
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=df['month'],
+        y=df['median_resolution_hours'],
+        name='Median Resolution Time',
+        marker_color='#2563eb',
+        text=df['median_resolution_hours'].round(1),
+        textposition='outside'
+    ))
+    fig.add_trace(go.Bar(
+        x=df['month'],
+        y=df['p90_resolution_hours'],
+        name='90th Percentile Resolution Time',
+        marker_color='#f59e0b',
+        text=df['p90_resolution_hours'].round(1),
+        textposition='outside'
+    ))
+    fig.update_layout(
+        barmode='group',
+        xaxis_title="Month",
+        yaxis_title="Resolution Time (Hours)",
+        height=400,
+        hovermode='x unified',
+        legend=_HORIZONTAL_LEGEND
+    )
+    return fig
+
+
+@chart("overview_request_status", KPI_MONTHLY_QUERY)
+def _overview_request_status(df):
+    import plotly.graph_objects as go
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=df['month'],
+        y=df['open_requests'],
+        mode='lines+markers',
+        name='Open Requests',
+        line=dict(color='#ef4444', width=2),
+        fill='tonexty',
+        fillcolor='rgba(239, 68, 68, 0.15)'
+    ))
+    fig.add_trace(go.Scatter(
+        x=df['month'],
+        y=df['closed_requests'],
+        mode='lines+markers',
+        name='Closed Requests',
+        line=dict(color='#10b981', width=2),
+        fill='tozeroy',
+        fillcolor='rgba(16, 185, 129, 0.15)'
+    ))
+    fig.update_layout(
+        xaxis_title="Month",
+        yaxis_title="Number of Requests",
+        height=400,
+        hovermode='x unified',
+        legend=_HORIZONTAL_LEGEND
+    )
+    return fig
+
+
+@chart("overview_backlog_by_age", BACKLOG_TREND_QUERY,
+       views=lambda df: [{'max_points': get_trend_max_points()}])
+def _overview_backlog_by_age(df, max_points=None):
+    import plotly.graph_objects as go
+    
+    # One snapshot per day, kept forever, so the series keeps growing
+    df = timeseries.downsample(df, 'snapshot_date', 'open_requests', max_points)
+    fig = go.Figure()
+    for bucket, (label, color) in AGING_BUCKETS.items():
+        fig.add_trace(go.Scatter(
+            x=df['snapshot_date'],
+            y=df[bucket],
+            mode='lines',
+            name=label,
+            stackgroup='backlog',
+            line=dict(color=color, width=1)
+        ))
+    fig.update_layout(
+        xaxis_title="Date",
+        yaxis_title="Open Requests",
+        height=400,
+        hovermode='x unified',
+        legend=_HORIZONTAL_LEGEND
+    )
+    return fig
+
+
+@chart("overview_backlog_by_agency", BACKLOG_BY_AGENCY_QUERY)
+def _overview_backlog_by_agency(df):
+    import plotly.graph_objects as go
+    
+    top_agencies = df.head(15)
+    fig = go.Figure()
+    for bucket, (label, color) in AGING_BUCKETS.items():
+        fig.add_trace(go.Bar(
+            x=top_agencies[bucket],
+            y=top_agencies['agency'],
+            orientation='h',
+            name=label,
+            marker_color=color
+        ))
+    fig.update_layout(
+        barmode='stack',
+        xaxis_title="Open Requests",
+        yaxis_title="Agency",
+        height=400,
+        yaxis={'categoryorder': 'total ascending'},
+        legend=_HORIZONTAL_LEGEND
+    )
+    return fig
+
+
+@chart("requests_trend", None)
+def _requests_trend(df, agency=None, max_points=None):
+    import plotly.graph_objects as go
+    
+    # agency and max_points selected df in the database; they only key the spec
+    bucket = df.attrs.get('bucket', 'day')
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=df['period'],
+        y=df['requests'],
+        mode='lines',
+        name='Requests',
+        line=dict(color='#2563eb', width=2),
+        fill='tozeroy',
+        fillcolor='rgba(37, 99, 235, 0.1)'
+    ))
+    fig.update_layout(
+        xaxis_title=bucket.capitalize(),
+        yaxis_title=f"Requests per {bucket}",
+        hovermode='x unified',
+        height=350,
+        showlegend=False,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
+
+
+def filter_complaints(df, borough=ALL_BOROUGHS, month=ALL_MONTHS):
+    """
+    Filter the Complaints page data to one borough and/or month.
+    """
+    if borough != ALL_BOROUGHS:
+        df = df[df['borough'] == borough]
+    if month != ALL_MONTHS:
+        df = df[df['month'] == month]
+    return df
+
+
+def _horizontal_bars(x, y, text, color, texttemplate, xaxis_title, yaxis_title, height=500):
+    import plotly.graph_objects as go
+    
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=x,
+        y=y,
+        orientation='h',
+        marker_color=color,
+        text=text,
+        textposition='outside',
+        texttemplate=texttemplate
+    ))
+    fig.update_layout(
+        xaxis_title=xaxis_title,
+        yaxis_title=yaxis_title,
+        height=height,
+        showlegend=False,
+        yaxis={'categoryorder': 'total ascending'}
+    )
+    return fig
+
+
+@chart("complaints_top_types", TOP_COMPLAINTS_QUERY, views=_each_borough)
+def _complaints_top_types(df, borough=ALL_BOROUGHS, month=ALL_MONTHS):
+    chart_df = filter_complaints(df, borough, month)
+    if month == ALL_MONTHS:
+        # Aggregate by complaint_type if month is 'All'
+        chart_df = chart_df.groupby('complaint_type')['requests'].sum().reset_index()
+    chart_df = chart_df.sort_values('requests', ascending=False).head(15)
+    return _horizontal_bars(chart_df['requests'], chart_df['complaint_type'], chart_df['requests'], '#10b981',
+                            '%{text:,.0f}', "Number of Requests", "Complaint Type")
+
+
+@chart("complaints_by_borough", TOP_COMPLAINTS_QUERY, views=lambda df: [{'month': ALL_MONTHS}])
+def _complaints_by_borough(df, month=ALL_MONTHS):
+    import plotly.graph_objects as go
+    
+    borough_summary = filter_complaints(df, month=month).groupby('borough')['requests'].sum()
+    borough_summary = borough_summary.sort_values(ascending=False).reset_index()
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=borough_summary['borough'],
+        y=borough_summary['requests'],
+        marker_color='#2563eb',
+        text=borough_summary['requests'],
+        textposition='outside',
+        texttemplate='%{text:,.0f}'
+    ))
+    fig.update_layout(
+        xaxis_title="Borough",
+        yaxis_title="Total Complaints",
+        height=400,
+        showlegend=False
+    )
+    return fig
+
+
+@chart("agency_trends", AGENCY_PERFORMANCE_QUERY, views=_each_agency)
+def _agency_trends(df, agency=ALL_AGENCIES):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    
+    if agency != ALL_AGENCIES:
+        df = df[df['agency'] == agency]
+    fig = make_subplots(
+        rows=2, cols=1,
+        subplot_titles=('Request Volume Over Time', 'Resolution Time Performance'),
+        vertical_spacing=0.15,
+        row_heights=[0.5, 0.5]
+    )
+    
+    # Requests chart
+    fig.add_trace(
+        go.Scatter(
+            x=df['month'],
+            y=df['requests'],
+            mode='lines+markers',
+            name='Request Volume',
+            line=dict(color='#2563eb', width=3),
+            marker=dict(size=8),
+            fill='tozeroy',
+            fillcolor='rgba(37, 99, 235, 0.15)'
+        ),
+        row=1, col=1
+    )
+    
+    # Resolution hours chart
+    fig.add_trace(
+        go.Scatter(
+            x=df['month'],
+            y=df['median_resolution_hours'],
+            mode='lines+markers',
+            name='Median Resolution',
+            line=dict(color='#f59e0b', width=3),
+            marker=dict(size=8)
+        ),
+        row=2, col=1
+    )
+    
+    fig.add_trace(
+        go.Scatter(
+            x=df['month'],
+            y=df['p90_resolution_hours'],
+            mode='lines+markers',
+            name='90th Percentile',
+            line=dict(color='#ef4444', width=2, dash='dash'),
+            marker=dict(size=6)
+        ),
+        row=2, col=1
+    )
+    
+    fig.update_xaxes(title_text="Month", row=1, col=1)
+    fig.update_xaxes(title_text="Month", row=2, col=1)
+    fig.update_yaxes(title_text="Number of Requests", row=1, col=1)
+    fig.update_yaxes(title_text="Resolution Time (Hours)", row=2, col=1)
+    fig.update_layout(
+        height=600,
+        hovermode='x unified',
+        showlegend=True,
+        legend=_HORIZONTAL_LEGEND
+    )
+    return fig
+
+
+def agency_volume_summary(df):
+    """
+    Top 15 agencies by total requests, with their mean median resolution time.
+    """
+    return df.groupby('agency').agg({
+        'requests': 'sum',
+        'median_resolution_hours': 'mean'
+    }).sort_values('requests', ascending=False).head(15).reset_index()
+
+
+def agency_resolution_summary(df):
+    """
+    The 15 agencies with the lowest mean median resolution time.
+    """
+    return df.groupby('agency')['median_resolution_hours'].mean().sort_values().head(15).reset_index()
+
+
+@chart("agency_volume", AGENCY_PERFORMANCE_QUERY)
+def _agency_volume(df):
+    summary = agency_volume_summary(df)
+    return _horizontal_bars(summary['requests'], summary['agency'], summary['requests'], '#2563eb',
+                            '%{text:,.0f}', "Total Requests", "Agency")
+
+
+@chart("agency_resolution", AGENCY_PERFORMANCE_QUERY)
+def _agency_resolution(df):
+    summary = agency_resolution_summary(df)
+    hours = summary['median_resolution_hours']
+    return _horizontal_bars(hours, summary['agency'], hours.round(1), '#f59e0b', '%{text:.1f} hrs',
+                            "Average Resolution Time (Hours)", "Agency")
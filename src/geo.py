@@ -0,0 +1,149 @@
+"""
+Map heatmaps from the grid mart (marts.requests_grid_monthly).
+
+The mart counts requests per month, agency and complaint type in square
+grid cells at three resolutions. A cell at resolution r covers
+GRID_RESOLUTIONS[r] degrees; cell_y = FLOOR(latitude / size) and
+cell_x = FLOOR(longitude / size). Each step splits a cell into 4x4.
+
+grid_cells() reads only the cells inside the requested bounds, at the
+finest resolution that keeps the cell count under max_cells, so a map
+never needs more than a few thousand rows.
+"""
+import math
+import pandas as pd
+from sqlalchemy import text
+from src.db import get_read_engine
+from src.quality import NYC_BOUNDS
+from src.result_cache import cached_read_sql
+
+
+# Resolution -> cell size in degrees (roughly 7 km, 1.7 km and 430 m)
+GRID_RESOLUTIONS = {0: 1 / 16, 1: 1 / 64, 2: 1 / 256}
+DEFAULT_MAX_CELLS = 5000
+
+# Map views -> (lat_min, lat_max, lon_min, lon_max)
+VIEWS = {
+    'Citywide': (NYC_BOUNDS['lat_min'], NYC_BOUNDS['lat_max'], NYC_BOUNDS['lon_min'], NYC_BOUNDS['lon_max']),
+    'MANHATTAN': (40.68, 40.88, -74.03, -73.91),
+    'BROOKLYN': (40.57, 40.74, -74.05, -73.83),
+    'QUEENS': (40.54, 40.80, -73.96, -73.70),
+    'BRONX': (40.78, 40.92, -73.94, -73.75),
+    'STATEN ISLAND': (40.49, 40.65, -74.26, -74.05),
+}
+
+
+def cell_range(bounds, resolution):
+    """
+    Get the cell index ranges covering a bounding box.
+    
+    Args:
+        bounds: (lat_min, lat_max, lon_min, lon_max)
+        resolution: Key of GRID_RESOLUTIONS
+    
+    Returns:
+        tuple: (y_min, y_max, x_min, x_max), inclusive
+    """
+    size = GRID_RESOLUTIONS[resolution]
+    lat_min, lat_max, lon_min, lon_max = bounds
+    return (
+        math.floor(lat_min / size), math.floor(lat_max / size),
+        math.floor(lon_min / size), math.floor(lon_max / size),
+    )
+
+
+def choose_resolution(bounds, max_cells=DEFAULT_MAX_CELLS):
+    """
+    Pick the finest resolution whose grid over bounds has at most max_cells cells.
+    
+    Args:
+        bounds: (lat_min, lat_max, lon_min, lon_max)
+        max_cells: Upper bound on the cells in view
+    
+    Returns:
+        int: Key of GRID_RESOLUTIONS (the coarsest one if none fits)
+    """
+    for resolution in sorted(GRID_RESOLUTIONS, reverse=True):
+        y_min, y_max, x_min, x_max = cell_range(bounds, resolution)
+        if (y_max - y_min + 1) * (x_max - x_min + 1) <= max_cells:
+            return resolution
+    return min(GRID_RESOLUTIONS)
+
+
+def grid_filters(engine=None):
+    """
+    Get the months, agencies and complaint types present in the grid mart.
+    
+    Read from the coarsest resolution, which has every combination.
+    
+    Args:
+        engine: SQLAlchemy engine (default: get_read_engine())
+    
+    Returns:
+        pandas DataFrame with columns month, agency, complaint_type, requests
+    """
+    engine = engine or get_read_engine()
+    query = text("""
+        SELECT month, agency, complaint_type, SUM(requests) AS requests
+        FROM marts.requests_grid_monthly
+        WHERE resolution = :resolution
+        GROUP BY month, agency, complaint_type
+    """)
+    return cached_read_sql(query, engine, params={'resolution': min(GRID_RESOLUTIONS)})
+
+
+def grid_cells(bounds, start=None, end=None, agency=None, complaint_type=None,
+               resolution=None, max_cells=DEFAULT_MAX_CELLS, engine=None):
+    """
+    Request counts per grid cell inside a bounding box.
+    
+    Args:
+        bounds: (lat_min, lat_max, lon_min, lon_max)
+        start: Inclusive first month (default: all data)
+        end: Exclusive end month (default: all data)
+        agency: Only this agency (default: all)
+        complaint_type: Only this complaint type (default: all)
+        resolution: Grid resolution (default: choose_resolution(bounds, max_cells))
+        max_cells: Upper bound on the cells in view when choosing the resolution
+        engine: SQLAlchemy engine (default: get_read_engine())
+    
+    Returns:
+        pandas DataFrame with columns cell_y, cell_x, requests, latitude,
+        longitude (cell centers); the resolution is in attrs['resolution']
+    """
+    engine = engine or get_read_engine()
+    if resolution is None:
+        resolution = choose_resolution(bounds, max_cells)
+    y_min, y_max, x_min, x_max = cell_range(bounds, resolution)
+    
+    clauses = [
+        "resolution = :resolution",
+        "cell_y BETWEEN :y_min AND :y_max",
+        "cell_x BETWEEN :x_min AND :x_max",
+    ]
+    params = {'resolution': resolution, 'y_min': y_min, 'y_max': y_max, 'x_min': x_min, 'x_max': x_max}
+    if start is not None:
+        clauses.append("month >= :start")
+        params['start'] = pd.Timestamp(start).date()
+    if end is not None:
+        clauses.append("month < :end")
+        params['end'] = pd.Timestamp(end).date()
+    if agency is not None:
+        clauses.append("agency = :agency")
+        params['agency'] = agency
+    if complaint_type is not None:
+        clauses.append("complaint_type = :complaint_type")
+        params['complaint_type'] = complaint_type
+    
+    query = text(f"""
+        SELECT cell_y, cell_x, SUM(requests) AS requests
+        FROM marts.requests_grid_monthly
+        WHERE {' AND '.join(clauses)}
+        GROUP BY cell_y, cell_x
+    """)
+    cells = cached_read_sql(query, engine, params=params)
+    size = GRID_RESOLUTIONS[resolution]
+    cells['latitude'] = (cells['cell_y'] + 0.5) * size
+    cells['longitude'] = (cells['cell_x'] + 0.5) * size
+    cells.attrs['resolution'] = resolution
+    return cells
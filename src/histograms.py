@@ -0,0 +1,138 @@
+"""
+Resolution-time distributions from the histogram mart
+(marts.resolution_histogram_monthly).
+
+The mart counts closed requests per month, agency, borough and complaint
+type in NUM_BUCKETS log-spaced buckets of resolution hours,
+BUCKETS_PER_DECADE per decade:
+- bucket 0 holds everything under MIN_HOURS (including negative durations)
+- bucket b covers [MIN_HOURS * 10^((b - 1) / 8), MIN_HOURS * 10^(b / 8)) hours
+- the last bucket is open-ended, from MAX_HOURS up
+
+Any filtered selection sums to at most NUM_BUCKETS rows, so CDFs and
+percentiles are computed here with NumPy instead of in the database.
+Percentiles interpolate log-linearly inside the bucket that holds them, so
+they are exact to within one bucket (a factor of 10^(1/8), about 1.33).
+"""
+import numpy as np
+import pandas as pd
+
+
+BUCKETS_PER_DECADE = 8
+MIN_HOURS = 0.01
+MAX_HOURS = 10000.0
+# Bucket 0, one bucket per step from MIN_HOURS to MAX_HOURS, and the overflow
+NUM_BUCKETS = int(round(np.log10(MAX_HOURS / MIN_HOURS) * BUCKETS_PER_DECADE)) + 2
+
+
+def bucket_edges():
+    """
+    Get the lower and upper bound of every bucket in hours.
+    
+    Returns:
+        tuple of two float arrays of length NUM_BUCKETS; the last upper bound is inf
+    """
+    steps = np.arange(NUM_BUCKETS)
+    lower = MIN_HOURS * 10 ** ((steps - 1) / BUCKETS_PER_DECADE)
+    upper = MIN_HOURS * 10 ** (steps / BUCKETS_PER_DECADE)
+    lower[0] = 0.0
+    upper[-1] = np.inf
+    return lower, upper
+
+
+def complete(counts):
+    """
+    Expand per-bucket counts to one row per bucket, with the bucket bounds.
+    
+    Args:
+        counts: DataFrame with columns bucket, requests, total_resolution_hours
+            (buckets without requests may be missing)
+    
+    Returns:
+        pandas DataFrame with columns bucket, bucket_start, bucket_end,
+        requests, total_resolution_hours
+    """
+    lower, upper = bucket_edges()
+    histogram = pd.DataFrame({
+        'bucket': np.arange(NUM_BUCKETS),
+        'bucket_start': lower,
+        'bucket_end': upper,
+        'requests': np.zeros(NUM_BUCKETS, dtype=np.int64),
+        'total_resolution_hours': np.zeros(NUM_BUCKETS),
+    })
+    if len(counts):
+        buckets = counts['bucket'].astype(int).to_numpy()
+        histogram.loc[buckets, 'requests'] = counts['requests'].astype(np.int64).to_numpy()
+        histogram.loc[buckets, 'total_resolution_hours'] = (
+            counts['total_resolution_hours'].astype(float).fillna(0.0).to_numpy()
+        )
+    return histogram
+
+
+def cdf(histogram):
+    """
+    Share of requests resolved within each bucket's upper bound.
+    
+    Args:
+        histogram: Output of complete()
+    
+    Returns:
+        float array of length NUM_BUCKETS (all NaN when there are no requests)
+    """
+    counts = histogram['requests'].to_numpy(dtype=float)
+    total = counts.sum()
+    if not total:
+        return np.full(len(counts), np.nan)
+    return np.cumsum(counts) / total
+
+
+def percentiles(histogram, quantiles):
+    """
+    Estimate resolution-hour quantiles from bucket counts.
+    
+    Within a bucket, requests are assumed spread evenly in log(hours)
+    (linearly in bucket 0). Quantiles in the open-ended last bucket return
+    its lower bound.
+    
+    Args:
+        histogram: Output of complete()
+        quantiles: Quantile or array of quantiles in [0, 1]
+    
+    Returns:
+        float array of hours, one per quantile (NaN when there are no requests)
+    """
+    q = np.atleast_1d(np.asarray(quantiles, dtype=float))
+    counts = histogram['requests'].to_numpy(dtype=float)
+    total = counts.sum()
+    if not total:
+        return np.full(len(q), np.nan)
+    
+    cumulative = np.cumsum(counts)
+    target = q * total
+    # First bucket whose cumulative count reaches the target, skipping
+    # leading empty buckets for q = 0
+    index = np.maximum(np.searchsorted(cumulative, target, side='left'), np.argmax(counts > 0))
+    index = np.minimum(index, len(counts) - 1)
+    before = cumulative[index] - counts[index]
+    fraction = np.clip((target - before) / counts[index], 0.0, 1.0)
+    
+    lower = histogram['bucket_start'].to_numpy(dtype=float)[index]
+    upper = histogram['bucket_end'].to_numpy(dtype=float)[index]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_linear = lower * (upper / lower) ** fraction
+    return np.select(
+        [index == 0, index == len(counts) - 1],
+        [upper * fraction, lower],
+        default=log_linear
+    )
+
+
+def mean_hours(histogram):
+    """
+    Exact mean resolution hours of the requests in a histogram.
+    
+    Returns:
+        float (NaN when there are no requests)
+    """
+    total = histogram['requests'].sum()
+    return float(histogram['total_resolution_hours'].sum() / total) if total else float('nan')
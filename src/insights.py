@@ -0,0 +1,410 @@
+"""
+Reusable analyses behind notebook 03 and the Insights dashboard page.
+
+Each analysis reads the smallest source that can answer it exactly:
+- marts.requests_daily (the daily cube) for counts and average resolution
+- core.fact_requests, filtered on created_date, for medians and
+  resolution-time distributions (joined to core.dim_borough for display)
+- marts.resolution_histogram_monthly for filtered resolution-time
+  distributions by month (see src/histograms.py)
+- for trends, the daily cube grouped by a bucket that fits the date range,
+  or core.fact_requests for hourly buckets (see src/timeseries.py)
+
+Results are memoized per data version (the latest ops.mart_builds row), so
+repeated calls are free until the marts are rebuilt. With RESULT_CACHE_DIR
+set, they are also shared between processes (see src.result_cache).
+"""
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from src import histograms, timeseries
+from src.config import get_insights_cache_entries, get_trend_max_points
+from src.db import get_read_engine
+from src.instrumentation import read_sql
+from src.result_cache import cached_result, get_data_version
+
+
+# (name, params, data version) -> result, least recently used first
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def clear_cache():
+    """
+    Drop all memoized results.
+    """
+    with _cache_lock:
+        _cache.clear()
+
+
+def _memoized(name, compute, engine, **params):
+    """
+    Return a cached result for (name, params, data version), reading it from
+    the shared result cache or computing it on a miss.
+    
+    At most INSIGHTS_CACHE_ENTRIES results are kept; the least recently
+    used is dropped first.
+    """
+    engine = engine or get_read_engine()
+    key = (name, tuple(sorted(params.items())), get_data_version(engine))
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key].copy()
+    result = cached_result(name, params, key[2], lambda: compute(engine, **params))
+    max_entries = get_insights_cache_entries()
+    with _cache_lock:
+        # Results for older data versions can never be hit again
+        for stale in [k for k in _cache if k[0] == name and k[2] != key[2]]:
+            del _cache[stale]
+        _cache[key] = result
+        while len(_cache) > max(max_entries, 1):
+            _cache.popitem(last=False)
+    return result.copy()
+
+
+def _date_filter(column, start, end):
+    """
+    Build a WHERE clause on a date column plus its bind parameters.
+    
+    Bounded ranges let Postgres use the created_date indexes (and DuckDB its
+    min/max stats) instead of scanning the whole core table.
+    """
+    clauses = []
+    params = {}
+    if start is not None:
+        clauses.append(f"{column} >= :start")
+        params['start'] = pd.Timestamp(start).to_pydatetime()
+    if end is not None:
+        clauses.append(f"{column} < :end")
+        params['end'] = pd.Timestamp(end).to_pydatetime()
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+def _daily_requests(engine, start=None, end=None):
+    where, params = _date_filter('day', start, end)
+    query = text(f"""
+        SELECT day, SUM(requests) AS requests
+        FROM marts.requests_daily
+        {where}
+        GROUP BY day
+        ORDER BY day
+    """)
+    return read_sql(query, engine, params=params)
+
+
+def daily_requests(start=None, end=None, engine=None):
+    """
+    Total requests per day.
+    
+    Args:
+        start: Inclusive start date (default: all data)
+        end: Exclusive end date (default: all data)
+        engine: SQLAlchemy engine (default: get_read_engine())
+    
+    Returns:
+        pandas DataFrame with columns day, requests
+    """
+    return _memoized('daily_requests', _daily_requests, engine, start=start, end=end)
+
+
+def _top_complaint_types(engine, n=10, start=None, end=None):
+    where, params = _date_filter('day', start, end)
+    params['n'] = int(n)
+    query = text(f"""
+        SELECT complaint_type, SUM(requests) AS requests
+        FROM marts.requests_daily
+        {where}
+        GROUP BY complaint_type
+        ORDER BY requests DESC
+        LIMIT :n
+    """)
+    return read_sql(query, engine, params=params)
+
+
+def top_complaint_types(n=10, start=None, end=None, engine=None):
+    """
+    Most frequent complaint types.
+    
+    Args:
+        n: Number of complaint types to return
+        start: Inclusive start date (default: all data)
+        end: Exclusive end date (default: all data)
+        engine: SQLAlchemy engine (default: get_read_engine())
+    
+    Returns:
+        pandas DataFrame with columns complaint_type, requests
+    """
+    return _memoized('top_complaint_types', _top_complaint_types, engine, n=n, start=start, end=end)
+
+
+def _borough_stats(engine, start=None, end=None):
+    where, params = _date_filter('day', start, end)
+    totals = read_sql(text(f"""
+        SELECT
+            borough,
+            SUM(requests) AS total_requests,
+            SUM(total_resolution_hours) / NULLIF(SUM(closed_requests), 0) AS avg_resolution_hours
+        FROM marts.requests_daily
+        {where}
+        GROUP BY borough
+    """), engine, params=params)
+    
+    # Medians are not additive, so they come from core over the same range
+    where, params = _date_filter('created_date', start, end)
+    closed_filter = "WHERE closed_date IS NOT NULL" if not where else f"{where} AND closed_date IS NOT NULL"
+    medians = read_sql(text(f"""
+        WITH borough_medians AS (
+            SELECT
+                borough_id,
+                PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY resolution_hours) AS median_resolution_hours
+            FROM core.fact_requests
+            {closed_filter}
+            GROUP BY borough_id
+        )
+        SELECT COALESCE(b.borough, '(missing)') AS borough, m.median_resolution_hours
+        FROM borough_medians m
+        LEFT JOIN core.dim_borough b ON b.borough_id = m.borough_id
+    """), engine, params=params)
+    
+    stats = totals.merge(medians, on='borough', how='left')
+    return stats.sort_values('total_requests', ascending=False).reset_index(drop=True)
+
+
+def borough_stats(start=None, end=None, engine=None):
+    """
+    Request volume and resolution times per borough.
+    
+    Args:
+        start: Inclusive start date (default: all data)
+        end: Exclusive end date (default: all data)
+        engine: SQLAlchemy engine (default: get_read_engine())
+    
+    Returns:
+        pandas DataFrame with columns borough, total_requests,
+        avg_resolution_hours, median_resolution_hours
+    """
+    return _memoized('borough_stats', _borough_stats, engine, start=start, end=end)
+
+
+def _resolution_distribution(engine, bins=50, max_quantile=0.95, start=None, end=None):
+    where, params = _date_filter('created_date', start, end)
+    closed_filter = "WHERE closed_date IS NOT NULL" if not where else f"{where} AND closed_date IS NOT NULL"
+    params['q'] = float(max_quantile)
+    summary = read_sql(text(f"""
+        SELECT
+            COUNT(*) AS closed_requests,
+            AVG(resolution_hours) AS mean_hours,
+            PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY resolution_hours) AS median_hours,
+            PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY resolution_hours) AS p90_hours,
+            PERCENTILE_CONT(:q) WITHIN GROUP (ORDER BY resolution_hours) AS cutoff_hours,
+            MIN(resolution_hours) AS min_hours
+        FROM core.fact_requests
+        {closed_filter}
+    """), engine, params=params).iloc[0]
+    
+    if not summary['closed_requests'] or pd.isna(summary['cutoff_hours']):
+        return pd.DataFrame(columns=['bin_start', 'bin_end', 'requests'])
+    
+    low = float(summary['min_hours'])
+    high = float(summary['cutoff_hours'])
+    width = (high - low) / bins if high > low else 1.0
+    params.update({'low': low, 'high': high, 'width': width, 'bins': int(bins)})
+    counts = read_sql(text(f"""
+        SELECT
+            LEAST(CAST(FLOOR((resolution_hours - :low) / :width) AS INTEGER), :bins - 1) AS bin,
+            COUNT(*) AS requests
+        FROM core.fact_requests
+        {closed_filter} AND resolution_hours <= :high
+        GROUP BY 1
+    """), engine, params=params)
+    
+    edges = low + width * np.arange(bins + 1)
+    histogram = pd.DataFrame({'bin_start': edges[:-1], 'bin_end': edges[1:], 'requests': 0})
+    histogram.loc[counts['bin'].astype(int).to_numpy(), 'requests'] = counts['requests'].to_numpy()
+    for column in ('closed_requests', 'mean_hours', 'median_hours', 'p90_hours'):
+        histogram.attrs[column] = float(summary[column])
+    return histogram
+
+
+def resolution_distribution(bins=50, max_quantile=0.95, start=None, end=None, engine=None):
+    """
+    Histogram of resolution hours for closed requests, up to a quantile cutoff.
+    
+    Summary statistics (closed_requests, mean_hours, median_hours,
+    p90_hours) are attached as DataFrame.attrs.
+    
+    Args:
+        bins: Number of equal-width bins
+        max_quantile: Requests above this quantile are left out of the histogram
+        start: Inclusive start date (default: all data)
+        end: Exclusive end date (default: all data)
+        engine: SQLAlchemy engine (default: get_read_engine())
+    
+    Returns:
+        pandas DataFrame with columns bin_start, bin_end, requests
+    """
+    return _memoized(
+        'resolution_distribution', _resolution_distribution, engine,
+        bins=bins, max_quantile=max_quantile, start=start, end=end
+    )
+
+
+def _resolution_histogram(engine, start=None, end=None, agency=None, borough=None, complaint_type=None):
+    where, params = _date_filter('month', start, end)
+    filters = []
+    for column, value in (('agency', agency), ('borough', borough), ('complaint_type', complaint_type)):
+        if value is not None:
+            filters.append(f"{column} = :{column}")
+            params[column] = value
+    if filters:
+        where = f"{where} AND {' AND '.join(filters)}" if where else f"WHERE {' AND '.join(filters)}"
+    counts = read_sql(text(f"""
+        SELECT 
+            bucket,
+            SUM(requests) AS requests,
+            SUM(total_resolution_hours) AS total_resolution_hours
+        FROM marts.resolution_histogram_monthly
+        {where}
+        GROUP BY bucket
+    """), engine, params=params)
+    return histograms.complete(counts)
+
+
+def resolution_histogram(start=None, end=None, agency=None, borough=None, complaint_type=None, engine=None):
+    """
+    Log-bucketed resolution hours of closed requests, from the histogram mart.
+    
+    Pass the result to histograms.cdf() or histograms.percentiles().
+    
+    Args:
+        start: Inclusive first month (default: all data)
+        end: Exclusive end month (default: all data)
+        agency: Only this agency (default: all)
+        borough: Only this borough (default: all)
+        complaint_type: Only this complaint type (default: all)
+        engine: SQLAlchemy engine (default: get_read_engine())
+    
+    Returns:
+        pandas DataFrame with one row per bucket (see histograms.complete)
+    """
+    return _memoized(
+        'resolution_histogram', _resolution_histogram, engine,
+        start=start, end=end, agency=agency, borough=borough, complaint_type=complaint_type
+    )
+
+
+def _resolution_filters(engine):
+    return read_sql(text("""
+        SELECT month, agency, borough, complaint_type, SUM(requests) AS requests
+        FROM marts.resolution_histogram_monthly
+        GROUP BY month, agency, borough, complaint_type
+    """), engine)
+
+
+def resolution_filters(engine=None):
+    """
+    Months, agencies, boroughs and complaint types in the histogram mart.
+    
+    Args:
+        engine: SQLAlchemy engine (default: get_read_engine())
+    
+    Returns:
+        pandas DataFrame with columns month, agency, borough, complaint_type,
+        requests (closed requests)
+    """
+    return _memoized('resolution_filters', _resolution_filters, engine)
+
+
+def _trend_range(engine):
+    return read_sql(text("SELECT MIN(day) AS first_day, MAX(day) AS last_day FROM marts.requests_daily"), engine)
+
+
+def _requests_trend(engine, start=None, end=None, bucket='day', agency=None, max_points=None):
+    if bucket == 'hour':
+        # The cube is daily, so hours come from core
+        where, params = _date_filter('f.created_date', start, end)
+        if agency is not None:
+            where = f"{where} AND" if where else "WHERE"
+            where += " COALESCE(a.agency, '(missing)') = :agency"
+            params['agency'] = agency
+        trend = read_sql(text(f"""
+            SELECT
+                date_trunc('hour', f.created_date) AS period,
+                COUNT(*) AS requests,
+                COUNT(*) FILTER (WHERE f.closed_date IS NOT NULL) AS closed_requests,
+                AVG(f.resolution_hours) FILTER (WHERE f.closed_date IS NOT NULL) AS avg_resolution_hours
+            FROM core.fact_requests f
+            LEFT JOIN core.dim_agency a ON a.agency_id = f.agency_id
+            {where}
+            GROUP BY 1
+            ORDER BY 1
+        """), engine, params=params)
+    else:
+        where, params = _date_filter('day', start, end)
+        if agency is not None:
+            where = f"{where} AND agency = :agency" if where else "WHERE agency = :agency"
+            params['agency'] = agency
+        # bucket is one of timeseries.BUCKETS, never user input
+        trend = read_sql(text(f"""
+            SELECT
+                CAST(date_trunc('{bucket}', day) AS TIMESTAMP) AS period,
+                SUM(requests) AS requests,
+                SUM(closed_requests) AS closed_requests,
+                SUM(total_resolution_hours) / NULLIF(SUM(closed_requests), 0) AS avg_resolution_hours
+            FROM marts.requests_daily
+            {where}
+            GROUP BY 1
+            ORDER BY 1
+        """), engine, params=params)
+    
+    buckets = len(trend)
+    trend = timeseries.downsample(trend, 'period', 'requests', max_points)
+    trend.attrs['bucket'] = bucket
+    trend.attrs['buckets'] = buckets
+    return trend
+
+
+def requests_trend(start=None, end=None, agency=None, bucket=None, max_points=None, engine=None):
+    """
+    Request volume and average resolution time over time, at a resolution
+    that fits the date range.
+    
+    Without a bucket, the finest of hour, day, week and month that splits
+    the range into at most max_points buckets is used. A series still longer
+    than max_points is reduced to max_points rows with LTTB (see
+    src.timeseries). The bucket and the number of buckets before
+    downsampling are attached as DataFrame.attrs.
+    
+    Args:
+        start: Inclusive start date (default: first day of data)
+        end: Exclusive end date (default: the day after the last day of data)
+        agency: Only this agency (default: all)
+        bucket: 'hour', 'day', 'week' or 'month' (default: chosen from the range)
+        max_points: Point budget (default: TREND_MAX_POINTS; 0 keeps every daily bucket)
+        engine: SQLAlchemy engine (default: get_read_engine())
+    
+    Returns:
+        pandas DataFrame with columns period, requests, closed_requests,
+        avg_resolution_hours
+    """
+    if bucket is not None and bucket not in timeseries.BUCKETS:
+        raise ValueError(f"Unknown bucket: {bucket}")
+    max_points = get_trend_max_points() if max_points is None else max_points
+    if start is None or end is None:
+        bounds = _memoized('trend_range', _trend_range, engine).iloc[0]
+        if start is None and pd.notna(bounds['first_day']):
+            start = pd.Timestamp(bounds['first_day'])
+        if end is None and pd.notna(bounds['last_day']):
+            end = pd.Timestamp(bounds['last_day']) + pd.Timedelta(days=1)
+    if bucket is None:
+        # Without a budget (or a known range) draw the cube's own daily grain
+        known = max_points and start is not None and end is not None
+        bucket = timeseries.choose_bucket(start, end, max_points) if known else 'day'
+    return _memoized(
+        'requests_trend', _requests_trend, engine,
+        start=start, end=end, bucket=bucket, agency=agency, max_points=max_points
+    )
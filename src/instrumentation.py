@@ -0,0 +1,346 @@
+"""
+Per-rerun timing for the dashboard: database queries and render blocks.
+
+Every query run through SQLAlchemy is timed by engine event listeners and
+attributed to the current run (one Streamlit rerun of one page). Pages mark
+the end of each major block with checkpoint(), so a run breaks down into
+query time and pandas/Plotly time per block:
+    
+    trace = start_run("1_Overview")
+    df = read_sql(query, engine)       # adds rows and bytes to the query record
+    checkpoint("load data")
+    ...
+    render_debug_panel()               # sidebar panel, structured log, export
+
+Finished runs are logged as one JSON line through the "nyc311.perf" logger
+and, when PERF_LOG_PATH is set, appended to that file for offline analysis.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.config import get_setting
+from src.profiling import start_profile
+
+
+logger = logging.getLogger("nyc311.perf")
+
+_local = threading.local()
+_listeners_lock = threading.Lock()
+_listeners_installed = False
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_COMMENT = re.compile(r"--[^\n]*")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """
+    Normalize a SQL statement so runs of the same query group together.
+    
+    Comments are removed, literals become '?', and whitespace is collapsed.
+    
+    Args:
+        sql: SQL statement text
+    
+    Returns:
+        tuple: (8-character hash, normalized SQL)
+    """
+    normalized = _COMMENT.sub(" ", str(sql))
+    normalized = _STRING_LITERAL.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    return hashlib.sha1(normalized.encode()).hexdigest()[:8], normalized
+
+
+class RunTrace:
+    """
+    Queries and render blocks recorded during one page run.
+    """
+    
+    def __init__(self, page):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.page = page
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.queries = []
+        self.blocks = []
+        self.finished = False
+        self.profile = None
+        self._start = time.perf_counter()
+        self._mark = self._start
+        self._block_first_query = 0
+    
+    def _offset_ms(self, now=None):
+        return ((now or time.perf_counter()) - self._start) * 1000
+    
+    def record_query(self, statement, duration_s, rows=None):
+        query_hash, normalized = fingerprint(statement)
+        self.queries.append({
+            'fingerprint': query_hash,
+            'sql': normalized[:300],
+            'rows': rows,
+            'bytes': None,
+            'duration_ms': duration_s * 1000,
+            'offset_ms': self._offset_ms() - duration_s * 1000,
+            'block': None,
+        })
+    
+    def checkpoint(self, name):
+        """
+        Close the block that started at the previous checkpoint (or run start).
+        """
+        now = time.perf_counter()
+        block_queries = self.queries[self._block_first_query:]
+        for query in block_queries:
+            query['block'] = name
+        query_ms = sum(q['duration_ms'] for q in block_queries)
+        duration_ms = (now - self._mark) * 1000
+        self.blocks.append({
+            'block': name,
+            'duration_ms': duration_ms,
+            'query_ms': query_ms,
+            'other_ms': max(duration_ms - query_ms, 0.0),
+            'queries': len(block_queries),
+            'offset_ms': (self._mark - self._start) * 1000,
+        })
+        self._mark = now
+        self._block_first_query = len(self.queries)
+    
+    def total_ms(self):
+        return self._offset_ms(self._mark)
+    
+    def summary(self):
+        """
+        One-line summary of the run (what goes into the structured log).
+        """
+        return {
+            'run_id': self.run_id,
+            'page': self.page,
+            'started_at': self.started_at,
+            'total_ms': round(self.total_ms(), 2),
+            'query_ms': round(sum(q['duration_ms'] for q in self.queries), 2),
+            'queries': len(self.queries),
+            'rows': sum(q['rows'] or 0 for q in self.queries),
+            'bytes': sum(q['bytes'] or 0 for q in self.queries),
+            'blocks': {b['block']: round(b['duration_ms'], 2) for b in self.blocks},
+        }
+    
+    def to_frame(self):
+        """
+        All blocks and queries of the run as one long DataFrame (for export).
+        """
+        rows = [dict(kind='block', name=b['block'], **b) for b in self.blocks]
+        rows += [dict(kind='query', name=q['fingerprint'], **q) for q in self.queries]
+        df = pd.DataFrame(rows)
+        if not df.empty:
+            df.insert(0, 'page', self.page)
+            df.insert(0, 'run_id', self.run_id)
+            df = df.sort_values('offset_ms').reset_index(drop=True)
+        return df
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('perf_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('perf_query_start')
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    trace = current_trace()
+    if trace is not None:
+        rowcount = getattr(cursor, 'rowcount', -1)
+        trace.record_query(statement, duration, rowcount if rowcount is not None and rowcount >= 0 else None)
+
+
+def install_query_listeners():
+    """
+    Time every statement on every engine (idempotent).
+    
+    Listeners are attached to the Engine class, so engines created later by
+    get_engine() are covered too. Outside a run nothing is recorded.
+    """
+    global _listeners_installed
+    with _listeners_lock:
+        if _listeners_installed:
+            return
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _listeners_installed = True
+
+
+def current_trace():
+    """
+    The run being recorded on this thread, or None.
+    """
+    return getattr(_local, 'trace', None)
+
+
+def start_run(page):
+    """
+    Start recording a page run on this thread.
+    
+    Streamlit runs each session's script on its own thread, so concurrent
+    sessions get separate traces. A previous run on the thread that ended
+    early (st.stop) is finished and logged first. When PROFILE_DIR is set,
+    the run is also profiled (see src.profiling).
+    
+    Args:
+        page: Page name, e.g. '1_Overview'
+    
+    Returns:
+        RunTrace
+    """
+    install_query_listeners()
+    finish_run()
+    _local.trace = RunTrace(page)
+    # Sampled reruns are profiled too when PROFILE_DIR is set
+    _local.trace.profile = start_profile(f"page-{page}", use_cprofile=False)
+    return _local.trace
+
+
+def checkpoint(name):
+    """
+    Mark the end of a render block in the current run (no-op outside a run).
+    """
+    trace = current_trace()
+    if trace is not None:
+        trace.checkpoint(name)
+
+
+def read_sql(sql, con, **kwargs):
+    """
+    pandas.read_sql that also records result rows and bytes on the query.
+    
+    Args:
+        sql: Query string or SQLAlchemy text()
+        con: SQLAlchemy engine or connection
+        **kwargs: Passed to pandas.read_sql
+    
+    Returns:
+        pandas DataFrame
+    """
+    trace = current_trace()
+    first_query = len(trace.queries) if trace is not None else 0
+    df = pd.read_sql(sql, con, **kwargs)
+    if trace is not None and len(trace.queries) > first_query:
+        query = trace.queries[-1]
+        query['rows'] = len(df)
+        query['bytes'] = int(df.memory_usage(deep=True).sum())
+    return df
+
+
+def _write_log(trace):
+    summary = trace.summary()
+    logger.info(json.dumps(summary))
+    log_path = get_setting('PERF_LOG_PATH')
+    if not log_path:
+        return
+    log_dir = os.path.dirname(log_path)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+    events = trace.to_frame()
+    # Blocks and queries have different fields; missing ones become null, not NaN
+    events = events.astype(object).where(events.notna(), None)
+    record = dict(summary, events=events.to_dict(orient='records'))
+    with open(log_path, 'a') as f:
+        f.write(json.dumps(record, default=str) + "\n")
+
+
+def finish_run():
+    """
+    Finish the current run on this thread and write it to the structured log.
+    
+    Returns:
+        RunTrace or None: The finished run
+    """
+    trace = current_trace()
+    if trace is None or trace.finished:
+        return trace
+    if time.perf_counter() - trace._mark > 0.001:
+        trace.checkpoint('rest of page')
+    trace.finished = True
+    if trace.profile is not None:
+        trace.profile.stop()
+    try:
+        _write_log(trace)
+    except OSError as e:
+        logger.warning(f"Could not write PERF_LOG_PATH: {e}")
+    return trace
+
+
+def render_debug_panel(history=20):
+    """
+    Finish the run and show its breakdown in a toggleable sidebar panel.
+    
+    The panel starts open when PERF_DEBUG is set. The last `history` runs of
+    the session can be downloaded as CSV.
+    
+    Args:
+        history: Number of runs kept per session for export
+    """
+    import streamlit as st
+    
+    trace = finish_run()
+    if trace is None:
+        return
+    
+    runs = st.session_state.setdefault('perf_runs', [])
+    runs.append(trace.to_frame())
+    del runs[:-history]
+    
+    default = str(get_setting('PERF_DEBUG', '')).lower() in ('1', 'true', 'yes')
+    with st.sidebar:
+        st.divider()
+        if not st.toggle("Performance debug panel", value=default, key='perf_debug_panel'):
+            return
+        
+        summary = trace.summary()
+        st.caption(f"Run {summary['run_id']} · {summary['page']}")
+        col1, col2 = st.columns(2)
+        col1.metric("Rerun", f"{summary['total_ms']:,.0f} ms")
+        col2.metric("Queries", f"{summary['query_ms']:,.0f} ms", f"{summary['queries']} queries", delta_color="off")
+        
+        st.markdown("**Blocks**")
+        blocks = pd.DataFrame(trace.blocks)
+        if not blocks.empty:
+            st.dataframe(
+                blocks[['block', 'duration_ms', 'query_ms', 'other_ms', 'queries']].style.format({
+                    'duration_ms': '{:,.1f}', 'query_ms': '{:,.1f}', 'other_ms': '{:,.1f}'
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+        
+        st.markdown("**Queries**")
+        queries = pd.DataFrame(trace.queries)
+        if queries.empty:
+            st.caption("No queries this run.")
+        else:
+            st.dataframe(
+                queries[['fingerprint', 'block', 'duration_ms', 'rows', 'bytes', 'sql']].style.format({
+                    'duration_ms': '{:,.1f}'
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+        
+        export = pd.concat(runs, ignore_index=True)
+        st.download_button(
+            f"Export last {len(runs)} runs (CSV)",
+            export.to_csv(index=False),
+            file_name="perf_runs.csv",
+            mime="text/csv",
+            use_container_width=True
+        )
@@ -0,0 +1,223 @@
+"""
+Mart registry and parallel mart builder.
+
+Every mart is one SQL file in sql/marts/ and is declared here with the
+marts it reads from. build_marts() runs the marts whose dependencies are
+built concurrently, each in its own transaction on its own connection,
+and records the build in ops.mart_builds once all of them succeeded.
+A new mart slots in with one more register() call below; the combined
+00_build_all_marts.sql (for psql) is generated from the registry by
+scripts/build_marts.py --write-sql.
+"""
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from src.db import get_engine, run_sql_file
+
+
+MARTS_DIR = "sql/marts"
+COMBINED_SQL_FILE = "sql/marts/00_build_all_marts.sql"
+DEFAULT_WORKERS = 4
+
+# Run after every mart succeeded, so readers only see complete data versions
+RECORD_BUILD_SQL = """CREATE SCHEMA IF NOT EXISTS ops;
+
+CREATE TABLE IF NOT EXISTS ops.mart_builds (
+    built_at TIMESTAMP NOT NULL
+);
+
+INSERT INTO ops.mart_builds (built_at) VALUES (CURRENT_TIMESTAMP);
+"""
+
+
+class Mart:
+    """
+    One mart table and how to build it.
+    
+    Args:
+        name: Table name in the marts schema, e.g. 'kpi_monthly'
+        sql_file: SQL file that rebuilds the table
+        depends_on: Names of the marts its SQL reads from
+        title: Section title in the combined SQL file
+    """
+    
+    def __init__(self, name, sql_file, depends_on=(), title=None):
+        self.name = name
+        self.sql_file = sql_file
+        self.depends_on = tuple(depends_on)
+        self.title = title or name
+    
+    def __repr__(self):
+        return f"Mart({self.name!r})"
+
+
+MARTS = {}
+
+
+def register(name, sql_file, depends_on=(), title=None):
+    """
+    Add a mart to the registry. Marts are built (and listed in the combined
+    SQL file) in registration order when they are not run concurrently.
+    
+    Args:
+        name: Table name in the marts schema
+        sql_file: File name in sql/marts/, or a path
+        depends_on: Names of registered marts that must be built first
+        title: Section title in the combined SQL file
+    
+    Returns:
+        Mart
+    """
+    if name in MARTS:
+        raise ValueError(f"Mart already registered: {name}")
+    for dependency in depends_on:
+        if dependency not in MARTS:
+            raise ValueError(f"Mart {name} depends on unregistered mart {dependency}")
+    path = sql_file if os.path.dirname(sql_file) else os.path.join(MARTS_DIR, sql_file)
+    MARTS[name] = Mart(name, path, depends_on, title)
+    return MARTS[name]
+
+
+register("kpi_monthly", "mrt_kpi_monthly.sql", title="KPI Monthly Mart")
+register("top_complaints_monthly", "mrt_top_complaints.sql", title="Top Complaints Monthly Mart")
+register("agency_performance_monthly", "mrt_agency_performance_monthly.sql",
+         title="Agency Performance Monthly Mart")
+register("requests_daily", "mrt_requests_daily.sql", title="Requests Daily Cube")
+register("requests_grid_monthly", "mrt_requests_grid_monthly.sql",
+         title="Requests Grid Monthly (map heatmaps)")
+register("backlog_daily", "mrt_backlog_daily.sql", title="Open Backlog Daily (incremental, never dropped)")
+register("resolution_histogram_monthly", "mrt_resolution_histogram_monthly.sql",
+         title="Resolution Histogram Monthly (distribution charts)")
+
+
+def select_marts(names=None):
+    """
+    Get marts to build, with the marts they depend on.
+    
+    Args:
+        names: Mart names (default: every registered mart)
+    
+    Returns:
+        list of Mart, in registration order
+    """
+    if names is None:
+        return list(MARTS.values())
+    unknown = [name for name in names if name not in MARTS]
+    if unknown:
+        raise ValueError(f"Unknown mart(s): {', '.join(unknown)}")
+    wanted = set()
+    todo = list(names)
+    while todo:
+        name = todo.pop()
+        if name not in wanted:
+            wanted.add(name)
+            todo.extend(MARTS[name].depends_on)
+    return [mart for mart in MARTS.values() if mart.name in wanted]
+
+
+def sql_files(names=None):
+    """
+    Get the SQL files of the selected marts, in registration order.
+    """
+    return [mart.sql_file for mart in select_marts(names)]
+
+
+def combined_sql():
+    """
+    Render every registered mart, then the build record, as one SQL script
+    that runs the marts in sequence (e.g. with psql -f).
+    """
+    parts = [
+        "-- Build all marts in order\n"
+        "-- Generated from src/marts.py by scripts/build_marts.py --write-sql,\n"
+        "-- edit the mrt_*.sql files instead\n"
+        "-- Marts aggregate core.fact_requests on its integer keys and join the\n"
+        "-- dimensions only for the display columns of the result. Each mart has a\n"
+        "-- primary key on its grain, and missing dimension values become '(missing)'\n"
+        "-- so key columns are never null\n"
+    ]
+    sections = [(mart.title, mart.sql_file) for mart in MARTS.values()]
+    for number, (title, path) in enumerate(sections, start=1):
+        with open(path) as f:
+            body = f.read().strip()
+        parts.append(_section(f"{number}. {title}") + body + "\n")
+    parts.append(_section("Record the build so readers can detect a new data version") + RECORD_BUILD_SQL)
+    return "\n".join(parts)
+
+
+def _section(title):
+    rule = "-- ============================================\n"
+    return f"{rule}-- {title}\n{rule}"
+
+
+def _build_one(mart, engine, on_mart):
+    on_mart('start', mart, None)
+    start = time.perf_counter()
+    run_sql_file(mart.sql_file, engine)
+    elapsed = time.perf_counter() - start
+    on_mart('done', mart, elapsed)
+    return elapsed
+
+
+def build_marts(names=None, workers=DEFAULT_WORKERS, engine=None, on_mart=None, record=True):
+    """
+    Build marts concurrently, in dependency order.
+    
+    A mart is started as soon as every mart it depends on is built, on up to
+    `workers` connections at a time. After a failure no further marts are
+    started; the ones already running finish, and the build is not recorded.
+    
+    Args:
+        names: Marts to build, plus their dependencies (default: all)
+        workers: Marts built at the same time (1 builds them in sequence)
+        engine: SQLAlchemy engine (default: get_engine())
+        on_mart: Optional callback(event, mart, seconds), with event 'start',
+            'done' or 'fail' and seconds the mart's build time when done
+        record: Insert a row into ops.mart_builds after a successful build
+    
+    Returns:
+        dict: Mart name -> build seconds, in registration order
+    """
+    engine = engine or get_engine()
+    on_mart = on_mart or (lambda *args: None)
+    plan = select_marts(names)
+    planned = {mart.name for mart in plan}
+    timings = {}
+    errors = []
+    
+    # DuckDB shares one open database between a process's connections only
+    # while one of them is open. Holding one keeps each mart from reopening
+    # the file, and concurrent opens of the same file can fail
+    with engine.connect(), ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        running = {}
+        waiting = list(plan)
+        while waiting or running:
+            if not errors:
+                ready = [
+                    mart for mart in waiting
+                    if all(d in timings or d not in planned for d in mart.depends_on)
+                ]
+                for mart in ready[:max(1, workers) - len(running)]:
+                    waiting.remove(mart)
+                    running[pool.submit(_build_one, mart, engine, on_mart)] = mart
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                mart = running.pop(future)
+                try:
+                    timings[mart.name] = future.result()
+                except Exception as e:
+                    on_mart('fail', mart, None)
+                    errors.append((mart, e))
+    
+    if errors:
+        mart, error = errors[0]
+        raise RuntimeError(f"Error building mart {mart.name} ({mart.sql_file}): {error}") from error
+    if record:
+        with engine.begin() as conn:
+            for statement in RECORD_BUILD_SQL.split(';'):
+                if statement.strip():
+                    conn.exec_driver_sql(statement)
+    return {mart.name: timings[mart.name] for mart in plan}
@@ -0,0 +1,370 @@
+"""
+Resumable refresh pipeline with content-hash stage skipping.
+
+The Refresh button (app/app.py) and scripts/run_pipeline.py run the same
+stages, each as a subprocess of its script:
+- file mode:   fetch -> validate -> load -> core -> marts
+- stream mode: stream -> core -> marts
+
+Before a stage runs, a fingerprint of its inputs is computed:
+- validate, load: hash of the fetched data file
+- core: raw row count and checksum, hash of 03_create_core_311.sql
+- marts: the same, plus the hash of every registered mart's SQL file
+- fetch, stream: the requested window; the API itself cannot be hashed
+
+Every stage appends a row to ops.pipeline_stages. A stage is skipped when
+its last successful (or skipped) row has the same input fingerprint and
+its output is still in place, e.g. the data file or the raw table it
+produced is unchanged. fetch and stream are only skipped when resuming:
+when the previous run stopped before the end, or when asked to. So a
+marts failure after a long fetch and load resumes at marts on the next
+Refresh, and after a complete run a fresh fetch is followed only by the
+stages whose inputs it changed.
+
+On DuckDB with DUCKDB_READ_PATH set, a successful run ends by publishing a
+copy of the database for the dashboard (see src.db.publish_duckdb_replica).
+The stages run with --no-publish, so the copy is made once, after the
+marts, and the dashboard never sees new raw data with old marts.
+"""
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import text
+from src.db import engine_backend, get_engine, publish_duckdb_replica, run_sql_file
+from src.marts import sql_files as mart_sql_files
+from src.quality import OPS_SCHEMA_FILES
+
+
+CHECKPOINT_TABLE = "ops.pipeline_stages"
+DONE_STATUSES = ("succeeded", "skipped")
+
+DATA_FILE = "data/raw/311.csv"
+CORE_SQL_FILE = "sql/schema/03_create_core_311.sql"
+
+# 64-bit hash of a raw row: the first 16 hex digits of the md5 of its CDC row hash
+_ROW_HASH64 = {
+    'postgres': "('x' || substr(md5(COALESCE(row_hash, CAST(unique_key AS TEXT))), 1, 16))::bit(64)::bigint",
+    'duckdb': "CAST('0x' || substr(md5(COALESCE(row_hash, CAST(unique_key AS TEXT))), 1, 16) AS UBIGINT)",
+}
+
+# Order-independent sums, so neither the load order nor a sort of the whole
+# table matters. The sums are NUMERIC on Postgres and HUGEINT on DuckDB, so
+# they do not overflow.
+RAW_CHECKSUM_SQL = {
+    backend: f"""
+    SELECT COUNT(*), COALESCE(SUM({row_hash64}), 0)
+    FROM raw.nyc311_requests
+    """
+    for backend, row_hash64 in _ROW_HASH64.items()
+}
+
+
+def file_hash(path):
+    """
+    SHA-256 of a file's contents.
+    
+    Returns:
+        str: Hex digest, or None if the file does not exist
+    """
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def raw_fingerprint(engine):
+    """
+    Row count and checksum of raw.nyc311_requests, from the CDC row hashes.
+    
+    Returns:
+        str: '<rows>:<sum of 64-bit row hashes>', or None if the table
+        cannot be read
+    """
+    try:
+        with engine.connect() as conn:
+            rows, checksum = conn.execute(text(RAW_CHECKSUM_SQL[engine_backend(engine)])).one()
+    except Exception:
+        return None
+    return f"{rows}:{checksum}"
+
+
+def _scalar(engine, sql):
+    try:
+        with engine.connect() as conn:
+            value = conn.execute(text(sql)).scalar()
+    except Exception:
+        return None
+    return None if value is None else str(value)
+
+
+class Fingerprints:
+    """
+    Fingerprints of the pipeline's data, cached until a stage runs.
+    """
+    
+    def __init__(self, engine):
+        self.engine = engine
+        self._cache = {}
+    
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+    
+    def file(self, path):
+        return self._cached(('file', path), lambda: file_hash(path))
+    
+    def raw(self):
+        return self._cached('raw', lambda: raw_fingerprint(self.engine))
+    
+    def core(self):
+        return self._cached('core', lambda: _scalar(self.engine, "SELECT COUNT(*) FROM core.fact_requests"))
+    
+    def marts(self):
+        return self._cached('marts', lambda: _scalar(self.engine, "SELECT MAX(built_at) FROM ops.mart_builds"))
+    
+    def clear(self):
+        self._cache.clear()
+
+
+class Stage:
+    """
+    One pipeline step: the script it runs and how its inputs and output
+    are fingerprinted.
+    
+    Args:
+        name: Name recorded in ops.pipeline_stages
+        command: Script path and arguments, run with the current interpreter
+        inputs: Function(Fingerprints) -> dict of input fingerprint parts
+        output: Function(Fingerprints) -> fingerprint of what the stage
+            produced, checked before skipping it (None: nothing to check)
+        source: True for stages that read the API; these only skip when resuming
+        description: Progress message, e.g. "Fetching data from NYC Open Data API"
+        done_message: Message shown when the stage succeeds
+        error_message: Message shown when the stage fails
+    """
+    
+    def __init__(self, name, command, inputs, output=None, source=False,
+                 description="", done_message="", error_message=""):
+        self.name = name
+        self.command = command
+        self.inputs = inputs
+        self.output = output
+        self.source = source
+        self.description = description
+        self.done_message = done_message
+        self.error_message = error_message
+
+
+def stages(days=30, stream=False):
+    """
+    Build the stages of a refresh.
+    
+    Args:
+        days: Number of days to fetch
+        stream: Fetch, validate and load in one streaming pass (stream_311.py)
+    
+    Returns:
+        list of Stage, in run order
+    """
+    window = {"days": days}
+    if stream:
+        head = [
+            Stage(
+                "stream", ["scripts/stream_311.py", "--days", str(days), "--no-publish"],
+                inputs=lambda fp: dict(window),
+                output=lambda fp: fp.raw(),
+                source=True,
+                description="Streaming data from NYC Open Data API into the database",
+                done_message="Data fetched, validated and loaded into raw schema",
+                error_message="Streaming refresh failed; the raw data was left unchanged.",
+            ),
+        ]
+    else:
+        head = [
+            Stage(
+                "fetch", ["scripts/fetch_311.py", "--days", str(days)],
+                inputs=lambda fp: dict(window),
+                output=lambda fp: fp.file(DATA_FILE),
+                source=True,
+                description="Fetching data from NYC Open Data API",
+                done_message="Data fetched successfully from API",
+                error_message="Error fetching data",
+            ),
+            Stage(
+                "validate", ["scripts/check_data_quality.py"],
+                inputs=lambda fp: {"file": fp.file(DATA_FILE)},
+                description="Validating data quality",
+                done_message="Data-quality checks passed",
+                error_message="Data-quality checks failed; refresh stopped before loading.",
+            ),
+            Stage(
+                "load", ["scripts/load_311_to_postgres.py", "--no-publish"],
+                inputs=lambda fp: {"file": fp.file(DATA_FILE)},
+                output=lambda fp: fp.raw(),
+                description="Loading data into the database",
+                done_message="Data loaded into raw schema",
+                error_message="Error loading data",
+            ),
+        ]
+    return head + [
+        Stage(
+            "core", ["scripts/build_sql.py", CORE_SQL_FILE],
+            inputs=lambda fp: {"raw": fp.raw(), "sql": fp.file(CORE_SQL_FILE)},
+            output=lambda fp: fp.core(),
+            description="Rebuilding cleaned core data table",
+            done_message="Core table rebuilt with cleaned data",
+            error_message="Error rebuilding core table",
+        ),
+        Stage(
+            "marts", ["scripts/build_marts.py", "--no-publish"],
+            inputs=lambda fp: {
+                "raw": fp.raw(), "core_sql": fp.file(CORE_SQL_FILE),
+                **{path: fp.file(path) for path in mart_sql_files()},
+            },
+            output=lambda fp: fp.marts(),
+            description="Building analytics mart tables",
+            done_message="Analytics marts built successfully",
+            error_message="Error building marts",
+        ),
+    ]
+
+
+def input_hash(parts):
+    """
+    Combine input fingerprint parts into one hash.
+    
+    Returns:
+        str, or None if any part is unknown (the stage then always runs)
+    """
+    if any(value is None for value in parts.values()):
+        return None
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def read_checkpoints(engine):
+    """
+    Read every recorded stage run, oldest first.
+    
+    Returns:
+        pandas DataFrame with the ops.pipeline_stages columns
+    """
+    with engine.connect() as conn:
+        return pd.read_sql(text(f"SELECT * FROM {CHECKPOINT_TABLE} ORDER BY started_at, run_id"), conn)
+
+
+def _record(engine, run_id, stage, status, started_at, input_digest=None, output_digest=None,
+            finished_at=None, message=None):
+    params = {
+        'run_id': run_id, 'stage': stage, 'status': status, 'input_hash': input_digest,
+        'output_hash': output_digest, 'started_at': started_at, 'finished_at': finished_at,
+        'message': message,
+    }
+    with engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM {CHECKPOINT_TABLE} WHERE run_id = :run_id AND stage = :stage"), params)
+        conn.execute(text(
+            f"INSERT INTO {CHECKPOINT_TABLE} "
+            "(run_id, stage, status, input_hash, output_hash, started_at, finished_at, message) "
+            "VALUES (:run_id, :stage, :status, :input_hash, :output_hash, :started_at, :finished_at, :message)"
+        ), params)
+
+
+def is_resuming(history, plan):
+    """
+    Whether the previous run of the same stages stopped before the end.
+    """
+    if history.empty:
+        return False
+    last_run = history[history['run_id'] == history['run_id'].iloc[-1]]
+    if plan[0].name not in set(last_run['stage']):
+        # Previous run used the other mode; its data file or raw table is not ours to resume
+        return False
+    final = last_run[last_run['stage'] == plan[-1].name]
+    return final.empty or final['status'].iloc[-1] not in DONE_STATUSES
+
+
+def run_pipeline(days=30, stream=False, force=False, resume=None, env=None, on_stage=None, cwd=None):
+    """
+    Run the refresh, skipping stages whose inputs have not changed.
+    
+    Args:
+        days: Number of days to fetch
+        stream: Use the streaming fetch-and-load stage
+        force: Run every stage, even when its inputs are unchanged
+        resume: Reuse the last fetch when it is still in place. None (default)
+            resumes only when the previous run stopped before the end
+        env: Environment for the stage subprocesses (default: os.environ)
+        on_stage: Optional callback(event, stage, index, total, detail), with
+            event 'start', 'skip', 'done' or 'fail' and detail the stage's
+            output on failure
+        cwd: Working directory of the stages (default: current directory)
+    
+    Returns:
+        bool: True if every stage succeeded or was skipped
+    """
+    on_stage = on_stage or (lambda *args: None)
+    engine = get_engine()
+    for schema_file in OPS_SCHEMA_FILES:
+        run_sql_file(schema_file, engine)
+    
+    plan = stages(days=days, stream=stream)
+    history = read_checkpoints(engine)
+    latest = history.groupby('stage').tail(1).set_index('stage')
+    if resume is None:
+        resume = is_resuming(history, plan)
+    run_id = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    fingerprints = Fingerprints(engine)
+    
+    for index, stage in enumerate(plan, start=1):
+        digest = input_hash(stage.inputs(fingerprints))
+        previous = latest.loc[stage.name] if stage.name in latest.index else None
+        output = stage.output(fingerprints) if stage.output and previous is not None else None
+        unchanged = (
+            not force
+            and digest is not None
+            and previous is not None
+            and previous['status'] in DONE_STATUSES
+            and previous['input_hash'] == digest
+            and (stage.output is None or (output is not None and output == previous['output_hash']))
+            and (resume or not stage.source)
+        )
+        started_at = datetime.now()
+        if unchanged:
+            _record(engine, run_id, stage.name, 'skipped', started_at, digest, previous['output_hash'],
+                    started_at, 'inputs unchanged')
+            on_stage('skip', stage, index, len(plan), None)
+            continue
+        
+        _record(engine, run_id, stage.name, 'running', started_at, digest)
+        on_stage('start', stage, index, len(plan), None)
+        result = subprocess.run(
+            [sys.executable] + stage.command,
+            capture_output=True,
+            text=True,
+            cwd=cwd or os.getcwd(),
+            env=env or os.environ.copy()
+        )
+        fingerprints.clear()
+        if result.returncode != 0:
+            detail = (result.stdout or '') + (result.stderr or '')
+            _record(engine, run_id, stage.name, 'failed', started_at, digest, None, datetime.now(),
+                    detail[-2000:])
+            on_stage('fail', stage, index, len(plan), detail)
+            engine.dispose()
+            return False
+        
+        output = stage.output(fingerprints) if stage.output else None
+        _record(engine, run_id, stage.name, 'succeeded', started_at, digest, output, datetime.now())
+        on_stage('done', stage, index, len(plan), None)
+    
+    engine.dispose()
+    publish_duckdb_replica()
+    return True
@@ -0,0 +1,278 @@
+"""
+Query plans of the dashboard and mart queries.
+
+collect_queries() gathers every query the dashboard runs (src.queries, and
+the src.insights analyses and src.geo map queries, captured from the driver
+with their bind parameters) plus the SELECT behind each mart registered in
+src.marts.
+explain() runs one of them under EXPLAIN ANALYZE and reduces the plan to
+the tables it read and how:
+- Postgres: EXPLAIN (ANALYZE, BUFFERS, VERBOSE, FORMAT JSON)
+- DuckDB: EXPLAIN (ANALYZE, FORMAT JSON); there are no buffer counts
+
+A sequential scan that reads at least min_rows rows and is not in the
+baseline for that query counts as a regression (see find_regressions).
+Mart builds aggregate the whole fact table, so a full scan is their
+expected plan; they are only checked when asked to.
+"""
+import json
+import re
+from datetime import timedelta
+
+from sqlalchemy import event, text
+from src import geo, insights, result_cache
+from src.db import engine_backend, split_sql_statements
+from src.marts import sql_files as mart_sql_files
+from src.queries import PAGE_QUERIES
+
+
+DEFAULT_MIN_ROWS = 100000
+# Queries with this name prefix read whole tables by design (see mart_queries)
+MART_PREFIX = "mart:"
+
+_CREATE_TABLE_AS = re.compile(r"^CREATE\s+TABLE\s+([\w.]+)\s+AS\s+", re.IGNORECASE)
+# Statements on the project's tables, as opposed to pandas' catalog lookups
+_PROJECT_TABLE = re.compile(r"\b(core|marts|ops)\.\w+", re.IGNORECASE)
+
+
+def mart_queries(paths=None, backend=None):
+    """
+    Get the SELECT of every CREATE TABLE ... AS statement in the mart files.
+    
+    Args:
+        paths: Mart SQL files (default: every registered mart's file)
+        backend: 'postgres' or 'duckdb' (see split_sql_statements)
+    
+    Returns:
+        list of (name, sql, params) tuples named 'mart:<table>'
+    """
+    statements = []
+    for path in paths or mart_sql_files():
+        with open(path) as f:
+            statements.extend(split_sql_statements(f.read(), backend))
+    queries = []
+    for statement in statements:
+        code = '\n'.join(
+            line for line in statement.splitlines() if not line.strip().startswith('--')
+        ).strip()
+        match = _CREATE_TABLE_AS.match(code)
+        if match:
+            queries.append((f"{MART_PREFIX}{match.group(1)}", code[match.end():], None))
+    return queries
+
+
+def page_queries():
+    """
+    Get the queries each dashboard page runs on every rerun.
+    
+    Returns:
+        list of (name, sql, params) tuples named 'page:<page>[:<n>]'
+    """
+    queries = []
+    for page, page_sql in PAGE_QUERIES.items():
+        for i, sql in enumerate(page_sql):
+            name = f"page:{page}" if len(page_sql) == 1 else f"page:{page}:{i + 1}"
+            queries.append((name, sql, None))
+    return queries
+
+
+def captured_queries(engine, analyses, prefix):
+    """
+    Capture the statements a set of analyses send to the database.
+    
+    Each analysis is run once with the insights memo cache cleared and the
+    shared result cache bypassed, and each
+    statement is recorded as the driver received it, parameters included.
+    
+    Args:
+        engine: SQLAlchemy engine
+        analyses: dict mapping analysis name to a function of no arguments
+        prefix: Name prefix, e.g. 'insights'
+    
+    Returns:
+        list of (name, sql, params) tuples named '<prefix>:<analysis>:<n>'
+    """
+    captured = []
+    
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if _PROJECT_TABLE.search(statement):
+            captured.append((statement, parameters))
+    
+    queries = []
+    seen = set()
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        with result_cache.disabled():
+            for analysis, run in analyses.items():
+                insights.clear_cache()
+                captured.clear()
+                run()
+                # The data-version lookup runs before every analysis; keep it once
+                statements = [(s, p) for s, p in captured if (s, repr(p)) not in seen]
+                for i, (statement, parameters) in enumerate(statements):
+                    seen.add((statement, repr(parameters)))
+                    queries.append((f"{prefix}:{analysis}:{i + 1}", statement, parameters))
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+        insights.clear_cache()
+    return queries
+
+
+def insights_queries(engine, start=None, end=None, label='all'):
+    """
+    Capture the statements the Insights analyses run over a date range.
+    
+    Args:
+        engine: SQLAlchemy engine
+        start: Inclusive start date passed to the analyses
+        end: Exclusive end date passed to the analyses
+        label: Name part identifying the date range
+    
+    Returns:
+        list of (name, sql, params) tuples named 'insights:<analysis>:<label>:<n>'
+    """
+    return captured_queries(engine, {
+        f'daily_requests:{label}': lambda: insights.daily_requests(start, end, engine=engine),
+        f'top_complaint_types:{label}': lambda: insights.top_complaint_types(10, start, end, engine=engine),
+        f'borough_stats:{label}': lambda: insights.borough_stats(start, end, engine=engine),
+        f'resolution_filters:{label}': lambda: insights.resolution_filters(engine=engine),
+        f'resolution_histogram:{label}': lambda: insights.resolution_histogram(start, end, engine=engine),
+        f'requests_trend:{label}': lambda: insights.requests_trend(start, end, engine=engine),
+    }, 'insights')
+
+
+def map_queries(engine):
+    """
+    Capture the Map page's statements for the citywide view and one borough.
+    
+    Returns:
+        list of (name, sql, params) tuples named 'map:<view>:<n>'
+    """
+    return captured_queries(engine, {
+        'filters': lambda: geo.grid_filters(engine=engine),
+        'citywide': lambda: geo.grid_cells(geo.VIEWS['Citywide'], engine=engine),
+        'manhattan': lambda: geo.grid_cells(geo.VIEWS['MANHATTAN'], engine=engine),
+    }, 'map')
+
+
+def collect_queries(engine, recent_days=30):
+    """
+    Get every dashboard and mart query to explain.
+    
+    The Insights analyses are captured twice: over all data and over the
+    last `recent_days` days, which is where the date indexes matter.
+    
+    Args:
+        engine: SQLAlchemy engine
+        recent_days: Length of the recent date range
+    
+    Returns:
+        list of (name, sql, params) tuples
+    """
+    queries = page_queries() + insights_queries(engine) + map_queries(engine)
+    with engine.connect() as conn:
+        last_day = conn.execute(text("SELECT MAX(day) FROM marts.requests_daily")).scalar()
+    if last_day is not None:
+        end = last_day + timedelta(days=1)
+        queries += insights_queries(engine, end - timedelta(days=recent_days), end, f"last{recent_days}d")
+    return queries + mart_queries(backend=engine_backend(engine))
+
+
+def _postgres_scans(node, scans):
+    if 'Relation Name' in node:
+        loops = node.get('Actual Loops', 1)
+        scans.append({
+            'relation': f"{node.get('Schema', 'public')}.{node['Relation Name']}",
+            'node': node['Node Type'],
+            'rows_read': (node.get('Actual Rows', 0) + node.get('Rows Removed by Filter', 0)) * loops,
+            'buffers': node.get('Shared Hit Blocks', 0) + node.get('Shared Read Blocks', 0),
+        })
+    for child in node.get('Plans', []):
+        _postgres_scans(child, scans)
+    return scans
+
+
+def _duckdb_scans(node, scans):
+    extra = node.get('extra_info') or {}
+    if node.get('operator_type') == 'TABLE_SCAN' and 'Table' in extra:
+        scans.append({
+            # Table names are catalog-qualified: nyc311.marts.requests_daily
+            'relation': '.'.join(extra['Table'].split('.')[-2:]),
+            'node': 'Seq Scan' if extra.get('Type') == 'Sequential Scan' else extra.get('Type', 'Scan'),
+            'rows_read': node.get('operator_rows_scanned', 0),
+            'buffers': None,
+        })
+    for child in node.get('children', []):
+        _duckdb_scans(child, scans)
+    return scans
+
+
+def explain(conn, sql, params=None, backend='postgres'):
+    """
+    Run a query under EXPLAIN ANALYZE.
+    
+    Args:
+        conn: SQLAlchemy connection
+        sql: Query text as sent to the driver
+        params: Driver-level bind parameters captured with the query
+        backend: 'postgres' or 'duckdb'
+    
+    Returns:
+        dict with plan (the raw JSON plan), execution_ms and scans (one
+        dict per table read: relation, node, rows_read, buffers)
+    """
+    if backend == 'duckdb':
+        row = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", params or ()).fetchone()
+        plan = json.loads(row[1])
+        return {
+            'plan': plan,
+            'execution_ms': plan.get('latency', 0.0) * 1000,
+            'scans': _duckdb_scans(plan, []),
+        }
+    
+    result = conn.exec_driver_sql(
+        f"EXPLAIN (ANALYZE, BUFFERS, VERBOSE, FORMAT JSON) {sql}", params or {}
+    ).scalar()
+    plan = (json.loads(result) if isinstance(result, str) else result)[0]
+    return {
+        'plan': plan,
+        'execution_ms': plan.get('Execution Time', 0.0),
+        'scans': _postgres_scans(plan['Plan'], []),
+    }
+
+
+def seq_scanned(scans, min_rows=DEFAULT_MIN_ROWS):
+    """
+    Get the tables read by a sequential scan of at least min_rows rows.
+    
+    Returns:
+        sorted list of relation names
+    """
+    return sorted({
+        scan['relation'] for scan in scans
+        if scan['node'] == 'Seq Scan' and scan['rows_read'] >= min_rows
+    })
+
+
+def find_regressions(results, baseline, min_rows=DEFAULT_MIN_ROWS, check_marts=False):
+    """
+    Compare large sequential scans against the accepted ones.
+    
+    Args:
+        results: dict mapping query name to the output of explain()
+        baseline: dict mapping query name to the relations it may seq-scan
+        min_rows: Smaller sequential scans are ignored
+        check_marts: Also check the mart builds, which scan the fact table
+            in full by design
+    
+    Returns:
+        dict mapping query name to the relations newly seq-scanned
+    """
+    regressions = {}
+    for name, result in results.items():
+        if name.startswith(MART_PREFIX) and not check_marts:
+            continue
+        new = set(seq_scanned(result['scans'], min_rows)) - set(baseline.get(name, []))
+        if new:
+            regressions[name] = sorted(new)
+    return regressions
@@ -0,0 +1,206 @@
+"""
+Opt-in profiling of pipeline steps and dashboard reruns.
+
+Profiling is off unless PROFILE_DIR is set. When it is, each profiled run
+(fetch_311_data, load_311_to_postgres, every run_sql_file and every page
+rerun) is sampled with probability PROFILE_SAMPLE_RATE and writes to
+PROFILE_DIR:
+- <name>-<timestamp>-<pid>-<id>.collapsed: wall-clock stack samples in the
+  collapsed format read by flamegraph.pl, speedscope and inferno
+- <name>-<timestamp>-<pid>-<id>.prof: cProfile stats for pstats/snakeviz,
+  when PROFILE_MODE is 'cprofile' or 'both' (scripts only)
+
+The sampler reads the profiled thread's stack from another thread every
+PROFILE_INTERVAL_MS (default 10 ms), so the cost stays low enough to leave
+on for a sample of production sessions.
+"""
+import cProfile
+import functools
+import os
+import random
+import sys
+import threading
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from src.config import get_setting
+
+
+PROFILE_MODES = ('sample', 'cprofile', 'both')
+
+# cProfile replaces any profiler already running on the thread, so nested
+# runs (a SQL file inside load_311_to_postgres) only get stack samples
+_cprofile_active = threading.local()
+
+
+def get_profile_settings():
+    """
+    Read the profiling settings.
+    
+    Returns:
+        dict with directory (None when profiling is off), sample_rate,
+        interval_ms and mode
+    
+    Raises:
+        RuntimeError: If PROFILE_MODE is not one of PROFILE_MODES
+    """
+    mode = str(get_setting('PROFILE_MODE', 'sample')).lower()
+    if mode not in PROFILE_MODES:
+        raise RuntimeError(
+            f"Unsupported PROFILE_MODE '{mode}'. Choose one of: {', '.join(PROFILE_MODES)}."
+        )
+    return {
+        'directory': get_setting('PROFILE_DIR'),
+        'sample_rate': float(get_setting('PROFILE_SAMPLE_RATE', 1.0)),
+        'interval_ms': float(get_setting('PROFILE_INTERVAL_MS', 10)),
+        'mode': mode,
+    }
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples one thread's call stack at a fixed interval from a background thread.
+    """
+    
+    def __init__(self, thread_id, interval_ms=10, on_thread_exit=None):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000
+        self.samples = Counter()
+        self._on_thread_exit = on_thread_exit
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+    
+    def start(self):
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        return self.samples
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                # The profiled thread is gone (e.g. a Streamlit rerun ended with st.stop)
+                if self._on_thread_exit is not None:
+                    self._on_thread_exit()
+                return
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+    
+    def write_collapsed(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profile:
+    """
+    One profiled run. Created by start_profile(); call stop() to write the output.
+    """
+    
+    def __init__(self, name, settings, use_cprofile):
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+        self.path_prefix = os.path.join(
+            settings['directory'], f"{name}-{stamp}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        )
+        self.paths = []
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._profiler = None
+        if (use_cprofile and settings['mode'] in ('cprofile', 'both')
+                and not getattr(_cprofile_active, 'value', False)):
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+                _cprofile_active.value = True
+            except ValueError:
+                # Another profiler is already active in this process
+                self._profiler = None
+        self._sampler = None
+        if settings['mode'] in ('sample', 'both') or self._profiler is None:
+            self._sampler = StackSampler(
+                threading.get_ident(), settings['interval_ms'], on_thread_exit=self.stop
+            ).start()
+    
+    def stop(self):
+        """
+        Stop profiling and write the output files (safe to call more than once).
+        
+        Returns:
+            list of str: Paths written
+        """
+        with self._lock:
+            if self._stopped:
+                return self.paths
+            self._stopped = True
+        os.makedirs(os.path.dirname(self.path_prefix) or '.', exist_ok=True)
+        if self._profiler is not None:
+            self._profiler.disable()
+            _cprofile_active.value = False
+            self._profiler.dump_stats(self.path_prefix + '.prof')
+            self.paths.append(self.path_prefix + '.prof')
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._sampler.write_collapsed(self.path_prefix + '.collapsed')
+            self.paths.append(self.path_prefix + '.collapsed')
+        return self.paths
+
+
+def start_profile(name, use_cprofile=True):
+    """
+    Start profiling the current thread if profiling is enabled and this run is sampled.
+    
+    Args:
+        name: Run name used in the output file names
+        use_cprofile: Allow cProfile (PROFILE_MODE permitting); page reruns
+            pass False because cProfile cannot be stopped from another thread
+    
+    Returns:
+        Profile or None
+    """
+    settings = get_profile_settings()
+    if not settings['directory'] or random.random() >= settings['sample_rate']:
+        return None
+    return Profile(name, settings, use_cprofile)
+
+
+@contextmanager
+def profile_run(name):
+    """
+    Profile the body of a with-block (no-op unless enabled).
+    """
+    profile = start_profile(name)
+    try:
+        yield profile
+    finally:
+        if profile is not None:
+            profile.stop()
+
+
+def profiled(name=None):
+    """
+    Decorator that runs a function under profile_run().
+    
+    Args:
+        name: Run name (default: the function name)
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile_run(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
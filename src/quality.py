@@ -0,0 +1,232 @@
+"""
+Streaming data-quality checks for fetched NYC 311 batches.
+
+DataQualityCheck accumulates the statistics from notebook 02 (null counts,
+duplicate keys, date ranges) plus closed-before-created and out-of-bounds
+coordinate counts, one batch at a time, in constant memory.
+
+Duplicate keys cannot be counted that way without keeping every key seen,
+so they are counted once over the whole data with DUPLICATE_KEYS_SQL: on the
+fetched file (count_file_duplicates) or on the streamed staging table (see
+src.streaming). The caller sets the result as duplicate_keys.
+"""
+import pandas as pd
+from src.config import get_setting
+from src.db import run_sql_file
+from src.transform import RAW_COLUMNS
+
+
+# Rough bounding box around the five boroughs
+NYC_BOUNDS = {
+    'lat_min': 40.47, 'lat_max': 40.93,
+    'lon_min': -74.27, 'lon_max': -73.68,
+}
+
+OPS_SCHEMA_FILES = [
+    "sql/schema/01_create_schemas.sql",
+    "sql/schema/04_create_ops_tables.sql",
+]
+
+# Non-null keys minus distinct keys of a table, file scan or subquery
+DUPLICATE_KEYS_SQL = "SELECT COUNT(unique_key) - COUNT(DISTINCT unique_key) FROM {source}"
+
+# Threshold name -> default. Override with DQ_<NAME> (e.g. DQ_MAX_DUPLICATE_PCT=0.5)
+DEFAULT_THRESHOLDS = {
+    'min_row_count': 1,
+    'max_duplicate_pct': 1.0,
+    'max_created_date_null_pct': 0.1,
+    'max_closed_before_created_pct': 1.0,
+    'max_out_of_bounds_pct': 5.0,
+}
+
+
+def get_thresholds():
+    """
+    Get data-quality thresholds, applying DQ_* overrides from the environment or secrets.
+    
+    Returns:
+        dict mapping threshold name to float
+    """
+    return {
+        name: float(get_setting(f"DQ_{name.upper()}", default))
+        for name, default in DEFAULT_THRESHOLDS.items()
+    }
+
+
+class DataQualityCheck:
+    """
+    Accumulate data-quality statistics over a stream of raw batches.
+    
+    Usage:
+        check = DataQualityCheck()
+        for batch in batches:
+            check.update(batch)
+        check.duplicate_keys = count_file_duplicates(path)
+        results = check.results()
+    """
+    
+    def __init__(self, columns=None):
+        self.columns = list(columns or RAW_COLUMNS)
+        self.row_count = 0
+        self.null_counts = {column: 0 for column in self.columns}
+        # Set by the caller from DUPLICATE_KEYS_SQL over the whole data
+        self.duplicate_keys = 0
+        self.closed_before_created = 0
+        self.out_of_bounds = 0
+        self.date_ranges = {'created_date': [None, None], 'closed_date': [None, None]}
+    
+    def update(self, batch):
+        """
+        Add one batch (a DataFrame with the raw columns) to the statistics.
+        
+        Args:
+            batch: pandas DataFrame, typed or as fetched
+        """
+        if batch.empty:
+            return
+        self.row_count += len(batch)
+        
+        nulls = batch.reindex(columns=self.columns).isna().sum()
+        for column in self.columns:
+            self.null_counts[column] += int(nulls[column])
+        
+        created = pd.to_datetime(batch['created_date'], errors='coerce')
+        closed = pd.to_datetime(batch['closed_date'], errors='coerce')
+        for column, values in (('created_date', created), ('closed_date', closed)):
+            low, high = values.min(), values.max()
+            current = self.date_ranges[column]
+            if pd.notna(low) and (current[0] is None or low < current[0]):
+                current[0] = low
+            if pd.notna(high) and (current[1] is None or high > current[1]):
+                current[1] = high
+        self.closed_before_created += int((closed < created).sum())
+        
+        lat = pd.to_numeric(batch['latitude'], errors='coerce')
+        lon = pd.to_numeric(batch['longitude'], errors='coerce')
+        has_coords = lat.notna() & lon.notna()
+        inside = (
+            lat.between(NYC_BOUNDS['lat_min'], NYC_BOUNDS['lat_max'])
+            & lon.between(NYC_BOUNDS['lon_min'], NYC_BOUNDS['lon_max'])
+        )
+        self.out_of_bounds += int((has_coords & ~inside).sum())
+    
+    def results(self, thresholds=None):
+        """
+        Build the metric rows and evaluate thresholds.
+        
+        Args:
+            thresholds: dict of threshold values (default: get_thresholds())
+        
+        Returns:
+            pandas DataFrame with columns metric, column_name, value,
+            value_text, threshold, passed
+        """
+        thresholds = thresholds or get_thresholds()
+        rows = []
+        
+        def add(metric, value=None, column_name=None, value_text=None, threshold=None, passed=None):
+            rows.append({
+                'metric': metric,
+                'column_name': column_name,
+                'value': value,
+                'value_text': value_text,
+                'threshold': threshold,
+                'passed': passed,
+            })
+        
+        def pct(count):
+            return count / self.row_count * 100 if self.row_count else 0.0
+        
+        min_rows = thresholds['min_row_count']
+        add('row_count', self.row_count, threshold=min_rows, passed=self.row_count >= min_rows)
+        
+        for column in self.columns:
+            add('null_count', self.null_counts[column], column_name=column)
+            null_pct = pct(self.null_counts[column])
+            if column == 'created_date':
+                limit = thresholds['max_created_date_null_pct']
+                add('null_pct', null_pct, column_name=column, threshold=limit, passed=null_pct <= limit)
+            else:
+                add('null_pct', null_pct, column_name=column)
+        
+        add('duplicate_keys', self.duplicate_keys, column_name='unique_key')
+        limit = thresholds['max_duplicate_pct']
+        add('duplicate_pct', pct(self.duplicate_keys), column_name='unique_key',
+            threshold=limit, passed=pct(self.duplicate_keys) <= limit)
+        
+        for column, (low, high) in self.date_ranges.items():
+            add('min_date', column_name=column, value_text=None if low is None else str(low))
+            add('max_date', column_name=column, value_text=None if high is None else str(high))
+        
+        add('closed_before_created', self.closed_before_created, column_name='closed_date')
+        limit = thresholds['max_closed_before_created_pct']
+        add('closed_before_created_pct', pct(self.closed_before_created), column_name='closed_date',
+            threshold=limit, passed=pct(self.closed_before_created) <= limit)
+        
+        add('out_of_bounds_coords', self.out_of_bounds, column_name='latitude,longitude')
+        limit = thresholds['max_out_of_bounds_pct']
+        add('out_of_bounds_pct', pct(self.out_of_bounds), column_name='latitude,longitude',
+            threshold=limit, passed=pct(self.out_of_bounds) <= limit)
+        
+        return pd.DataFrame(rows)
+
+
+def count_file_duplicates(path):
+    """
+    Count rows of a fetched file that repeat an earlier row's unique_key.
+    
+    The file is scanned by an in-memory DuckDB connection, which spills the
+    distinct keys to disk when they do not fit in memory.
+    
+    Args:
+        path: Fetched .csv or .parquet file
+    
+    Returns:
+        int: Non-null keys minus distinct keys
+    """
+    import duckdb
+    
+    reader = 'read_parquet' if path.endswith('.parquet') else 'read_csv'
+    options = '' if reader == 'read_parquet' else ', all_varchar = true'
+    # Keys that are not integers count as nulls, as in the batch checks
+    source = f"(SELECT TRY_CAST(unique_key AS BIGINT) AS unique_key FROM {reader}(?{options}))"
+    conn = duckdb.connect()
+    try:
+        return conn.execute(DUPLICATE_KEYS_SQL.format(source=source), [path]).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def record_results(results, engine, checked_at):
+    """
+    Append check results to ops.data_quality, creating the table if needed.
+    
+    Args:
+        results: Output of DataQualityCheck.results()
+        engine: SQLAlchemy engine
+        checked_at: Time of the check; also gives the run_id
+    
+    Returns:
+        pandas DataFrame: results with run_id and checked_at added
+    """
+    results = results.copy()
+    results.insert(0, 'checked_at', checked_at)
+    results.insert(0, 'run_id', checked_at.strftime('%Y%m%dT%H%M%S'))
+    for schema_file in OPS_SCHEMA_FILES:
+        run_sql_file(schema_file, engine)
+    results.to_sql('data_quality', engine, schema='ops', if_exists='append', index=False)
+    return results
+
+
+def failed_thresholds(results):
+    """
+    Get the result rows whose threshold failed.
+    
+    Args:
+        results: Output of DataQualityCheck.results()
+    
+    Returns:
+        pandas DataFrame (empty when every threshold passed)
+    """
+    checked = results[results['passed'].notna()]
+    return checked[~checked['passed'].astype(bool)]
@@ -0,0 +1,85 @@
+"""
+SQL queries behind the dashboard pages.
+
+Kept in one place so benchmarks and tooling run exactly what the pages run.
+"""
+
+
+KPI_SUMMARY_QUERY = """
+    SELECT 
+        SUM(total_requests) as total,
+        SUM(open_requests) as open,
+        SUM(closed_requests) as closed,
+        AVG(median_resolution_hours) as avg_resolution,
+        MIN(month) as first_month,
+        MAX(month) as last_month
+    FROM marts.kpi_monthly
+"""
+
+KPI_MONTHLY_QUERY = """
+    SELECT 
+        month,
+        total_requests,
+        open_requests,
+        closed_requests,
+        median_resolution_hours,
+        p90_resolution_hours
+    FROM marts.kpi_monthly
+    ORDER BY month
+"""
+
+TOP_COMPLAINTS_QUERY = """
+    SELECT 
+        month,
+        borough,
+        complaint_type,
+        requests
+    FROM marts.top_complaints_monthly
+    ORDER BY month DESC, borough, requests DESC
+"""
+
+AGENCY_PERFORMANCE_QUERY = """
+    SELECT 
+        month,
+        agency,
+        requests,
+        median_resolution_hours,
+        p90_resolution_hours
+    FROM marts.agency_performance_monthly
+    ORDER BY month DESC, agency
+"""
+
+BACKLOG_TREND_QUERY = """
+    SELECT 
+        snapshot_date,
+        SUM(open_requests) AS open_requests,
+        SUM(age_0_1d) AS age_0_1d,
+        SUM(age_1_7d) AS age_1_7d,
+        SUM(age_7_30d) AS age_7_30d,
+        SUM(age_30d_plus) AS age_30d_plus
+    FROM marts.backlog_daily
+    GROUP BY snapshot_date
+    ORDER BY snapshot_date
+"""
+
+BACKLOG_BY_AGENCY_QUERY = """
+    SELECT 
+        agency,
+        SUM(open_requests) AS open_requests,
+        SUM(age_0_1d) AS age_0_1d,
+        SUM(age_1_7d) AS age_1_7d,
+        SUM(age_7_30d) AS age_7_30d,
+        SUM(age_30d_plus) AS age_30d_plus
+    FROM marts.backlog_daily
+    WHERE snapshot_date = (SELECT MAX(snapshot_date) FROM marts.backlog_daily)
+    GROUP BY agency
+    ORDER BY open_requests DESC
+"""
+
+# Page script -> queries it runs on every rerun
+PAGE_QUERIES = {
+    'app': [KPI_SUMMARY_QUERY],
+    '1_Overview': [KPI_MONTHLY_QUERY, BACKLOG_TREND_QUERY, BACKLOG_BY_AGENCY_QUERY],
+    '2_Complaints': [TOP_COMPLAINTS_QUERY],
+    '3_Agency_Performance': [AGENCY_PERFORMANCE_QUERY],
+}
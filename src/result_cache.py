@@ -0,0 +1,358 @@
+"""
+Query-result cache shared by every dashboard process on a machine or volume.
+
+Each Streamlit replica memoizes results in its own memory (see
+src.insights), so behind a load balancer every replica would still run each
+mart query once per data version. With RESULT_CACHE_DIR set, results are
+also written to that directory as uncompressed Arrow IPC files, one per
+(query, parameters, data version), and any replica reads them from there:
+- reads memory-map the file, so the Arrow buffers are not copied off disk
+  and columns without nulls convert to pandas without a copy
+- files are written to a temporary name and renamed into place, so readers
+  never see a partial result
+- a hit touches the file's mtime; when the directory grows past
+  RESULT_CACHE_MAX_MB, the least recently used files are deleted
+
+The data version (the latest ops.mart_builds row) is part of the key, so a
+mart rebuild makes every cached result unreachable; those files are evicted
+as the cache fills up. The version is looked up at most once every
+DATA_VERSION_TTL_S seconds per database, and a page that already has it
+passes it to cached_read_sql, so a rerun does not query ops.mart_builds
+once per result. DataFrame.attrs are stored with the result.
+
+Text results (the dashboard's Plotly figure specs, see src.figures) are
+stored next to them as .json files and share the same size limit.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+import pyarrow as pa
+from sqlalchemy import text
+from src.config import get_result_cache_dir, get_result_cache_max_mb
+from src.db import get_read_engine
+from src.instrumentation import read_sql
+
+
+SUFFIX = ".arrow"
+TEXT_SUFFIX = ".json"
+_ATTRS_KEY = b"nyc311.attrs"
+
+# A rebuild reaches the dashboard at most this many seconds late
+DATA_VERSION_TTL_S = 5.0
+
+_caches = {}
+_caches_lock = threading.Lock()
+_local = threading.local()
+
+# Database URL -> (monotonic time of the lookup, data version)
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+def get_data_version(engine=None, max_age_s=DATA_VERSION_TTL_S):
+    """
+    Get an identifier that changes whenever the marts are rebuilt.
+    
+    Args:
+        engine: SQLAlchemy engine (default: get_read_engine())
+        max_age_s: Reuse a version looked up this many seconds ago at
+            most; 0 always queries the database
+    
+    Returns:
+        str: Data version
+    """
+    engine = engine or get_read_engine()
+    url = str(engine.url)
+    now = time.monotonic()
+    with _versions_lock:
+        cached = _versions.get(url)
+    if cached is not None and now - cached[0] < max_age_s:
+        return cached[1]
+    version = _query_data_version(engine)
+    with _versions_lock:
+        _versions[url] = (now, version)
+    return version
+
+
+def _query_data_version(engine):
+    try:
+        with engine.connect() as conn:
+            built_at = conn.execute(text("SELECT MAX(built_at) FROM ops.mart_builds")).scalar()
+        if built_at is not None:
+            return str(built_at)
+    except Exception:
+        # ops.mart_builds is missing on databases built before it existed
+        pass
+    
+    with engine.connect() as conn:
+        row = conn.execute(text(
+            "SELECT SUM(total_requests), MAX(month) FROM marts.kpi_monthly"
+        )).fetchone()
+    return f"kpi:{row[0]}:{row[1]}"
+
+
+def cache_key(name, params, version):
+    """
+    Hash a result's query or analysis name, parameters and data version.
+    
+    Returns:
+        str: Hex digest, used as the file name
+    """
+    parts = [str(name), sorted((params or {}).items()), str(version)]
+    return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    DataFrames stored as Arrow IPC files in a directory, evicted LRU by size.
+    
+    Safe to share between processes: writes are atomic renames, and a file
+    deleted by another process while it is read is simply a miss.
+    
+    Args:
+        directory: Cache directory, created if missing
+        max_bytes: Size the directory is trimmed to after each write
+    """
+    
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+    
+    def _path(self, key, suffix=SUFFIX):
+        return os.path.join(self.directory, key + suffix)
+    
+    def _write(self, path, write):
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            write(temp_path)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+        self.evict()
+        return True
+    
+    def get(self, key):
+        """
+        Read a cached result.
+        
+        Returns:
+            pandas DataFrame, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with pa.memory_map(path) as source:
+                table = pa.ipc.open_file(source).read_all()
+            # The file's mtime is its last use, for LRU eviction
+            os.utime(path)
+        except (OSError, pa.ArrowInvalid):
+            self.misses += 1
+            return None
+        self.hits += 1
+        df = table.to_pandas(split_blocks=True)
+        metadata = table.schema.metadata or {}
+        if _ATTRS_KEY in metadata:
+            df.attrs.update(json.loads(metadata[_ATTRS_KEY]))
+        return df
+    
+    def put(self, key, df):
+        """
+        Store a result, then evict least recently used results over the limit.
+        
+        Returns:
+            bool: False if the DataFrame has columns Arrow cannot store
+        """
+        try:
+            table = pa.Table.from_pandas(df)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            return False
+        if df.attrs:
+            table = table.replace_schema_metadata({
+                **(table.schema.metadata or {}), _ATTRS_KEY: json.dumps(df.attrs, default=str)
+            })
+        
+        def write(temp_path):
+            with pa.OSFile(temp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        return self._write(self._path(key), write)
+    
+    def get_text(self, key):
+        """
+        Read a cached text result.
+        
+        Returns:
+            str, or None on a miss
+        """
+        path = self._path(key, TEXT_SUFFIX)
+        try:
+            with open(path, encoding='utf-8') as f:
+                value = f.read()
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+    
+    def put_text(self, key, value):
+        """
+        Store a text result, then evict least recently used results over the limit.
+        
+        Returns:
+            bool: False if the file could not be written
+        """
+        def write(temp_path):
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(value)
+        return self._write(self._path(key, TEXT_SUFFIX), write)
+    
+    def entries(self):
+        """
+        List cached results, least recently used first.
+        
+        Returns:
+            list of (path, size in bytes, last use as a timestamp)
+        """
+        found = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith((SUFFIX, TEXT_SUFFIX)):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                found.append((entry.path, stat.st_size, stat.st_mtime))
+        return sorted(found, key=lambda item: item[2])
+    
+    def evict(self):
+        """
+        Delete least recently used results until the cache fits max_bytes.
+        
+        Returns:
+            int: Number of files deleted
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                # Already evicted by another process
+                pass
+            total -= size
+        return removed
+    
+    def clear(self):
+        """
+        Delete every cached result.
+        """
+        for path, _, _ in self.entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    
+    def stats(self):
+        """
+        Hits and misses of this process, and the cache's current size.
+        """
+        entries = self.entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        }
+
+
+def get_result_cache():
+    """
+    Get the shared result cache configured by RESULT_CACHE_DIR.
+    
+    Returns:
+        ResultCache, or None when RESULT_CACHE_DIR is not set (or inside disabled())
+    """
+    directory = get_result_cache_dir()
+    if not directory or getattr(_local, 'disabled', False):
+        return None
+    settings = (os.path.abspath(directory), get_result_cache_max_mb())
+    with _caches_lock:
+        if settings not in _caches:
+            _caches[settings] = ResultCache(settings[0], int(settings[1] * 1e6))
+        return _caches[settings]
+
+
+@contextlib.contextmanager
+def disabled():
+    """
+    Bypass the shared cache in this thread, e.g. to see every query a page runs.
+    """
+    previous = getattr(_local, 'disabled', False)
+    _local.disabled = True
+    try:
+        yield
+    finally:
+        _local.disabled = previous
+
+
+def cached_result(name, params, version, compute):
+    """
+    Get a result from the shared cache, computing and storing it on a miss.
+    
+    Args:
+        name: Query text or analysis name
+        params: Dict of parameters that the result depends on
+        version: Data version (see get_data_version)
+        compute: Function that returns the result as a DataFrame
+    
+    Returns:
+        pandas DataFrame
+    """
+    cache = get_result_cache()
+    if cache is None:
+        return compute()
+    key = cache_key(name, params, version)
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.put(key, result)
+    return result
+
+
+def cached_read_sql(sql, engine=None, params=None, version=None):
+    """
+    read_sql through the shared result cache, for queries on the marts.
+    
+    Without RESULT_CACHE_DIR this is read_sql plus nothing.
+    
+    Args:
+        sql: Query string or SQLAlchemy text()
+        engine: SQLAlchemy engine (default: get_read_engine())
+        params: Bind parameters
+        version: Data version, if the caller already has it (default:
+            get_data_version(engine))
+    
+    Returns:
+        pandas DataFrame
+    """
+    engine = engine or get_read_engine()
+    if get_result_cache() is None:
+        return read_sql(sql, engine, params=params)
+    return cached_result(
+        str(sql), params, version or get_data_version(engine), lambda: read_sql(sql, engine, params=params)
+    )
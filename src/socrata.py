@@ -0,0 +1,99 @@
+"""
+Paged access to the NYC 311 Socrata resource, shared by fetch_311.py and
+the streaming refresh (src/streaming.py).
+"""
+import time
+from datetime import datetime, timedelta
+import requests
+from src.decoding import PAGE_FORMATS, decode_page
+from src.transform import RAW_COLUMNS
+
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Fields requested from the API, in raw table order
+FIELDS = list(RAW_COLUMNS)
+
+
+def window_params(days):
+    """
+    Build the query parameters for the last `days` days, without paging.
+    
+    Args:
+        days: Number of days to fetch
+    
+    Returns:
+        tuple: (params dict, start datetime, end datetime)
+    """
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days)
+    params = {
+        "$select": ",".join(FIELDS),
+        "$where": f"created_date >= '{start_date.strftime('%Y-%m-%dT%H:%M:%S')}'",
+        "$order": "unique_key"
+    }
+    return params, start_date, end_date
+
+
+def resource_url(base_url, page_format):
+    """
+    Point a resource URL at the endpoint for a page format.
+    
+    Args:
+        base_url: Resource URL ending in .json or .csv
+        page_format: 'json' or 'csv'
+    
+    Returns:
+        str: URL with the matching extension
+    """
+    stem, dot, extension = base_url.rpartition(".")
+    if not dot or extension not in PAGE_FORMATS:
+        raise ValueError(f"Resource URL must end in .json or .csv: {base_url}")
+    return f"{stem}.{page_format}"
+
+
+def get_page(base_url, params, max_retries=3):
+    """
+    GET one page, retrying throttled (429) and server-error responses.
+    
+    Waits for the Retry-After header when the server sends one, otherwise
+    backs off exponentially (1s, 2s, 4s, ...).
+    
+    Args:
+        base_url: Resource URL
+        params: Query parameters
+        max_retries: Retries before giving up
+    
+    Returns:
+        requests.Response
+    
+    Raises:
+        requests.exceptions.RequestException: If the page still fails after all retries
+    """
+    for attempt in range(max_retries + 1):
+        response = requests.get(base_url, params=params, timeout=30)
+        if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+            response.raise_for_status()
+            return response
+        
+        retry_after = response.headers.get("Retry-After")
+        wait = float(retry_after) if retry_after and retry_after.isdigit() else 2 ** attempt
+        print(f"HTTP {response.status_code}, retrying in {wait:g}s...", end=" ", flush=True)
+        time.sleep(wait)
+
+
+def get_decoded_page(base_url, params, page_format="json", max_retries=3):
+    """
+    GET one page in the given format and decode it into typed columns.
+    
+    Args:
+        base_url: Resource URL (.json or .csv)
+        params: Query parameters
+        page_format: 'json' or 'csv' (see src/decoding.py)
+        max_retries: Retries before giving up
+    
+    Returns:
+        pandas DataFrame with the raw columns, typed
+    """
+    response = get_page(resource_url(base_url, page_format), params, max_retries)
+    return decode_page(response.content, page_format)
@@ -0,0 +1,328 @@
+"""
+Local stand-in for the Socrata resource API used by fetch_311.py.
+
+Serves a DataFrame (normally generated by src.synthetic) over HTTP and
+implements the subset of SoQL the fetcher sends:
+- $select: comma-separated column names
+- $where: comparisons joined with AND, e.g.
+  created_date >= '2025-01-01T00:00:00' AND unique_key > 60000000
+- $order: comma-separated columns, each optionally ASC or DESC
+- $limit / $offset
+
+Pages are served as JSON (/resource/<id>.json) or CSV (/resource/<id>.csv).
+Like Socrata, every value is returned as a string and null fields are left
+out of JSON records (empty in CSV). Latency, throttling (429) and server
+errors can be injected so paging and retry behavior can be tested offline.
+"""
+import io
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+
+DATE_COLUMNS = ('created_date', 'closed_date')
+NUMERIC_COLUMNS = ('unique_key', 'latitude', 'longitude')
+
+_CONDITION = re.compile(
+    r"^\s*(\w+)\s*(?:(>=|<=|!=|<>|=|>|<)\s*('(?:[^']|'')*'|-?\d+(?:\.\d+)?)|(IS\s+NOT\s+NULL|IS\s+NULL))\s*$",
+    re.IGNORECASE
+)
+
+
+def _records(page):
+    """
+    Turn a page of strings into JSON records, leaving null fields out.
+    """
+    return [
+        {k: v for k, v in record.items() if v is not None}
+        for record in page.to_dict(orient='records')
+    ]
+
+
+class SoQLError(ValueError):
+    """
+    Raised for queries outside the supported SoQL subset (returned as HTTP 400).
+    """
+
+
+class FaultConfig:
+    """
+    Faults injected into responses. Rates are fractions of requests.
+    """
+    
+    def __init__(self, latency=0.0, jitter=0.0, throttle_rate=0.0, error_rate=0.0,
+                 retry_after=1, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.seed = seed
+
+
+class SocrataDataset:
+    """
+    In-memory table that answers SoQL queries.
+    
+    Filtering and sorting run on typed copies of the columns (dates as
+    datetime64, keys and coordinates as numbers); responses are built from
+    the string form.
+    """
+    
+    def __init__(self, df):
+        self.columns = list(df.columns)
+        self._text = pd.DataFrame(index=df.index)
+        self._typed = {}
+        for column in self.columns:
+            text = df[column].astype(str).astype(object)
+            text[df[column].isna()] = None
+            self._text[column] = text
+            if column in DATE_COLUMNS:
+                self._typed[column] = pd.to_datetime(df[column], format='ISO8601').to_numpy()
+            elif column in NUMERIC_COLUMNS:
+                self._typed[column] = pd.to_numeric(df[column]).to_numpy()
+            else:
+                self._typed[column] = df[column].to_numpy(dtype=object)
+        self._order_cache = {}
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._text)
+    
+    def _literal(self, column, raw):
+        """
+        Convert a SoQL literal to the type of the column it is compared with.
+        """
+        value = raw[1:-1].replace("''", "'") if raw.startswith("'") else raw
+        try:
+            if column in DATE_COLUMNS:
+                return np.datetime64(pd.Timestamp(value))
+            if column in NUMERIC_COLUMNS:
+                return float(value)
+        except ValueError:
+            raise SoQLError(f"Cannot compare {column} with {raw}")
+        return value
+    
+    def _mask(self, where):
+        mask = np.ones(len(self), dtype=bool)
+        if not where:
+            return mask
+        for condition in re.split(r"\s+AND\s+", where.strip(), flags=re.IGNORECASE):
+            match = _CONDITION.match(condition)
+            if not match:
+                raise SoQLError(f"Unsupported $where condition: {condition}")
+            column, op, raw, null_test = match.groups()
+            if column not in self._typed:
+                raise SoQLError(f"No such column: {column}")
+            values = self._typed[column]
+            is_null = pd.isna(values)
+            if null_test:
+                mask &= ~is_null if 'NOT' in null_test.upper() else is_null
+                continue
+            
+            literal = self._literal(column, raw)
+            present = values[~is_null]
+            result = np.zeros(len(values), dtype=bool)
+            if op == '=':
+                result[~is_null] = present == literal
+            elif op in ('!=', '<>'):
+                result[~is_null] = present != literal
+            elif op == '>':
+                result[~is_null] = present > literal
+            elif op == '>=':
+                result[~is_null] = present >= literal
+            elif op == '<':
+                result[~is_null] = present < literal
+            else:
+                result[~is_null] = present <= literal
+            mask &= result
+        return mask
+    
+    def _order(self, order):
+        """
+        Row positions sorted by an $order clause (cached, since pages repeat it).
+        """
+        order = (order or '').strip()
+        with self._lock:
+            if order in self._order_cache:
+                return self._order_cache[order]
+        
+        keys = []
+        for term in [t.strip() for t in order.split(',') if t.strip()]:
+            parts = term.split()
+            column = parts[0]
+            if column not in self._typed or len(parts) > 2 or (
+                    len(parts) == 2 and parts[1].upper() not in ('ASC', 'DESC')):
+                raise SoQLError(f"Unsupported $order term: {term}")
+            descending = len(parts) == 2 and parts[1].upper() == 'DESC'
+            keys.append((pd.Series(self._typed[column]), descending))
+        
+        if keys:
+            frame = pd.DataFrame({i: values for i, (values, _) in enumerate(keys)})
+            positions = frame.sort_values(
+                list(frame.columns),
+                ascending=[not descending for _, descending in keys],
+                kind='stable',
+                na_position='last'
+            ).index.to_numpy()
+        else:
+            positions = np.arange(len(self))
+        with self._lock:
+            self._order_cache[order] = positions
+        return positions
+    
+    def query(self, select=None, where=None, order=None, limit=1000, offset=0):
+        """
+        Run a SoQL query.
+        
+        Args:
+            select: $select value (default: all columns)
+            where: $where value
+            order: $order value
+            limit: $limit value
+            offset: $offset value
+        
+        Returns:
+            list of dict: Records with string values and nulls left out
+        
+        Raises:
+            SoQLError: If the query uses unsupported SoQL
+        """
+        return _records(self.query_frame(select, where, order, limit, offset))
+    
+    def query_frame(self, select=None, where=None, order=None, limit=1000, offset=0):
+        """
+        Run a SoQL query and return the page as a DataFrame of strings (None for nulls).
+        """
+        columns = [c.strip() for c in select.split(',')] if select else self.columns
+        unknown = [c for c in columns if c not in self.columns]
+        if unknown:
+            raise SoQLError(f"No such column: {', '.join(unknown)}")
+        
+        positions = self._order(order)
+        positions = positions[self._mask(where)[positions]]
+        positions = positions[int(offset):int(offset) + int(limit)]
+        
+        return self._text.iloc[positions][columns]
+
+
+class SocrataStubServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server answering GET /resource/<id>.json (or .csv) from a SocrataDataset.
+    """
+    daemon_threads = True
+    
+    def __init__(self, address, dataset, faults=None):
+        super().__init__(address, _SocrataHandler)
+        self.dataset = dataset
+        self.faults = faults or FaultConfig()
+        self.stats = {'requests': 0, 'throttled': 0, 'errors': 0, 'rows': 0}
+        self._random = random.Random(self.faults.seed)
+        self._lock = threading.Lock()
+    
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/resource/erm2-nwe9.json"
+    
+    def next_fault(self):
+        """
+        Decide the outcome of the next request: (delay seconds, status or None).
+        """
+        faults = self.faults
+        with self._lock:
+            self.stats['requests'] += 1
+            delay = faults.latency + (self._random.uniform(0, faults.jitter) if faults.jitter else 0.0)
+            roll = self._random.random()
+            if roll < faults.throttle_rate:
+                self.stats['throttled'] += 1
+                return delay, 429
+            if roll < faults.throttle_rate + faults.error_rate:
+                self.stats['errors'] += 1
+                return delay, 500
+        return delay, None
+
+
+class _SocrataHandler(BaseHTTPRequestHandler):
+    
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not (url.path.startswith('/resource/') and url.path.endswith(('.json', '.csv'))):
+            self._send_json(404, {'error': True, 'message': f"Not found: {url.path}"})
+            return
+        
+        delay, status = self.server.next_fault()
+        if delay:
+            time.sleep(delay)
+        if status == 429:
+            self._send_json(429, {'error': True, 'message': 'Too many requests'},
+                            {'Retry-After': str(self.server.faults.retry_after)})
+            return
+        if status is not None:
+            self._send_json(status, {'error': True, 'message': 'Injected server error'})
+            return
+        
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            page = self.server.dataset.query_frame(
+                select=params.get('$select'),
+                where=params.get('$where'),
+                order=params.get('$order'),
+                limit=int(params.get('$limit', 1000)),
+                offset=int(params.get('$offset', 0))
+            )
+        except ValueError as e:
+            # SoQLError, or a non-integer $limit/$offset
+            self._send_json(400, {'error': True, 'code': 'query.compiler.malformed', 'message': str(e)})
+            return
+        
+        with self.server._lock:
+            self.server.stats['rows'] += len(page)
+        if url.path.endswith('.csv'):
+            buffer = io.StringIO()
+            page.to_csv(buffer, index=False)
+            self._send_body(200, buffer.getvalue().encode(), 'text/csv')
+            return
+        self._send_json(200, _records(page))
+    
+    def _send_json(self, status, payload, headers=None):
+        self._send_body(status, json.dumps(payload).encode(), 'application/json', headers)
+    
+    def _send_body(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        # Per-request access logs would swamp benchmark output
+        pass
+
+
+def start_stub_server(df, host='127.0.0.1', port=0, faults=None):
+    """
+    Start a stand-in server on a background thread.
+    
+    Args:
+        df: DataFrame to serve (raw 311 columns)
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        faults: FaultConfig (default: no faults)
+    
+    Returns:
+        SocrataStubServer: Running server; use .base_url and .shutdown()
+    """
+    server = SocrataStubServer((host, port), SocrataDataset(df), faults)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
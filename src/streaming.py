@@ -0,0 +1,335 @@
+"""
+Streaming refresh: fetch pages straight into a database staging table.
+
+stream_to_staging() runs `workers` fetcher threads that request pages of the
+Socrata resource by offset, decode them into typed columns (see
+src/decoding.py) and push each page onto a bounded queue.
+The calling thread takes pages off the queue and writes them to
+raw.nyc311_requests_staging while later pages are still downloading:
+- Postgres: COPY ... FROM STDIN (CSV) into an UNLOGGED table
+- DuckDB: the page is registered as a relation and inserted in one statement
+When the queue is full the fetchers wait, so memory stays at about
+queue_size pages however large the window is.
+
+On the way, each page is hashed for change capture and added to a
+DataQualityCheck. Duplicate keys are counted once over the whole staging
+table when every page is written (StagingTable.duplicate_keys()).
+StagingTable.publish() then replaces raw.nyc311_requests with the staged
+rows (deduplicated on unique_key, latest page wins) and appends new and
+changed rows to raw.nyc311_requests_history in one transaction. The result is the same as fetch_311.py followed by
+load_311_to_postgres.py, without the intermediate file.
+"""
+import io
+import queue
+import threading
+import time
+
+import numpy as np
+from src.cdc import HISTORY_COLUMNS, HISTORY_TABLE, close_superseded_sql, row_hashes, sql_timestamp
+from src.db import get_engine
+from src.quality import DUPLICATE_KEYS_SQL
+from src.socrata import get_decoded_page
+from src.transform import RAW_COLUMNS, coerce_raw_types
+
+
+STAGING_TABLE = "raw.nyc311_requests_staging"
+# page and page_row order the staged rows so the latest duplicate wins
+STAGING_COLUMNS = RAW_COLUMNS + ["row_hash", "page", "page_row"]
+
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 8
+
+
+def prepare_page(data, page):
+    """
+    Type and hash one fetched page.
+    
+    Args:
+        data: DataFrame with the raw columns, as decoded or as fetched
+        page: Page number, starting at 0
+    
+    Returns:
+        pandas DataFrame with STAGING_COLUMNS
+    """
+    batch = coerce_raw_types(data)
+    batch["row_hash"] = row_hashes(batch)
+    batch["page"] = page
+    batch["page_row"] = np.arange(len(batch))
+    return batch
+
+
+class StagingTable:
+    """
+    The staging table and the connection pages are written over.
+    
+    Usage:
+        staging = StagingTable(backend)
+        try:
+            staging.create()
+            staging.write(batch)  # per page
+            counts = staging.publish(loaded_at)
+        finally:
+            staging.close()
+    """
+    
+    def __init__(self, backend):
+        self.backend = backend
+        self.rows = 0
+        # DuckDB autocommits unless a transaction was begun explicitly
+        self._in_transaction = False
+        # Opened through the engine so other DuckDB connections of this
+        # process (e.g. for ops.data_quality) share its configuration
+        self.engine = get_engine()
+        self.pooled = self.engine.raw_connection()
+        self.conn = self.pooled.driver_connection
+    
+    def execute(self, sql):
+        """
+        Run one statement on the staging connection and return its rows.
+        """
+        if self.backend == 'duckdb':
+            return self.conn.execute(sql).fetchall()
+        with self.conn.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchall() if cursor.description else []
+    
+    def create(self):
+        """
+        (Re)create the empty staging table with the raw table's column types.
+        """
+        unlogged = "UNLOGGED " if self.backend == 'postgres' else ""
+        self.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+        self.execute(
+            f"CREATE {unlogged}TABLE {STAGING_TABLE} AS "
+            f"SELECT {', '.join(RAW_COLUMNS + ['row_hash'])} FROM raw.nyc311_requests WHERE 1 = 0"
+        )
+        self.execute(f"ALTER TABLE {STAGING_TABLE} ADD COLUMN page INTEGER")
+        self.execute(f"ALTER TABLE {STAGING_TABLE} ADD COLUMN page_row INTEGER")
+        self.commit()
+    
+    def write(self, batch):
+        """
+        Append one prepared page (see prepare_page) to the staging table.
+        """
+        columns = ', '.join(STAGING_COLUMNS)
+        if self.backend == 'duckdb':
+            self.conn.register('page_df', batch[STAGING_COLUMNS])
+            self.conn.execute(f"INSERT INTO {STAGING_TABLE} ({columns}) SELECT {columns} FROM page_df")
+            self.conn.unregister('page_df')
+        else:
+            buffer = io.StringIO()
+            batch[STAGING_COLUMNS].to_csv(buffer, index=False, header=False, date_format='%Y-%m-%d %H:%M:%S.%f')
+            buffer.seek(0)
+            with self.conn.cursor() as cursor:
+                cursor.copy_expert(f"COPY {STAGING_TABLE} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+            self.conn.commit()
+        self.rows += len(batch)
+    
+    def duplicate_keys(self):
+        """
+        Count staged rows that repeat an earlier row's unique_key.
+        
+        Returns:
+            int: Non-null keys minus distinct keys
+        """
+        return self.execute(DUPLICATE_KEYS_SQL.format(source=STAGING_TABLE))[0][0]
+    
+    def publish(self, loaded_at):
+        """
+        Replace raw.nyc311_requests with the staged rows and record the changes.
+        
+        Runs in one transaction; the staging table is dropped at the end.
+        
+        Args:
+            loaded_at: Load timestamp of the new history versions
+        
+        Returns:
+            dict with rows, inserted and updated counts
+        """
+        raw_columns = ', '.join(RAW_COLUMNS + ['row_hash'])
+        latest = f"""(
+            SELECT DISTINCT ON (unique_key) *
+            FROM {STAGING_TABLE}
+            WHERE unique_key IS NOT NULL
+            ORDER BY unique_key, page DESC, page_row DESC
+        )"""
+        loaded = sql_timestamp(loaded_at)
+        statements = [
+            f"""
+            INSERT INTO {HISTORY_TABLE} ({', '.join(HISTORY_COLUMNS)})
+            SELECT
+                {', '.join(f's.{c}' for c in RAW_COLUMNS)},
+                s.row_hash,
+                CASE WHEN r.unique_key IS NULL THEN 'insert' ELSE 'update' END,
+                {loaded},
+                CAST(NULL AS TIMESTAMP)
+            FROM {latest} s
+            LEFT JOIN raw.nyc311_requests r ON r.unique_key = s.unique_key
+            WHERE r.unique_key IS NULL OR r.row_hash IS DISTINCT FROM s.row_hash
+            """,
+            close_superseded_sql(loaded_at),
+            "DELETE FROM raw.nyc311_requests",
+            f"INSERT INTO raw.nyc311_requests ({raw_columns}) SELECT {raw_columns} FROM {latest} s",
+            f"DROP TABLE {STAGING_TABLE}",
+        ]
+        
+        if self.backend == 'duckdb':
+            self.execute("BEGIN TRANSACTION")
+            self._in_transaction = True
+        try:
+            for statement in statements:
+                self.execute(statement)
+            rows = self.execute("SELECT COUNT(*) FROM raw.nyc311_requests")[0][0]
+            changes = dict(self.execute(
+                f"SELECT change_type, COUNT(*) FROM {HISTORY_TABLE} "
+                f"WHERE valid_from = {loaded} GROUP BY change_type"
+            ))
+            self.commit()
+        except Exception:
+            self.rollback()
+            raise
+        return {'rows': rows, 'inserted': changes.get('insert', 0), 'updated': changes.get('update', 0)}
+    
+    def drop(self):
+        """
+        Drop the staging table, e.g. after failed data-quality checks.
+        """
+        self.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+        self.commit()
+    
+    def commit(self):
+        if self.backend != 'duckdb':
+            self.conn.commit()
+        elif self._in_transaction:
+            self.conn.execute("COMMIT")
+            self._in_transaction = False
+    
+    def rollback(self):
+        if self.backend != 'duckdb':
+            self.conn.rollback()
+        elif self._in_transaction:
+            self.conn.execute("ROLLBACK")
+            self._in_transaction = False
+    
+    def close(self):
+        self.pooled.close()
+        self.engine.dispose()
+
+
+def _put(pages, item, abort):
+    """
+    Put an item on the queue, waiting while it is full unless the stream is aborted.
+    
+    Returns:
+        bool: False if the stream was aborted first
+    """
+    while not abort.is_set():
+        try:
+            pages.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def stream_to_staging(staging, check, base_url, params, limit=50000, workers=DEFAULT_WORKERS,
+                      queue_size=DEFAULT_QUEUE_SIZE, max_retries=3, page_format="json"):
+    """
+    Fetch every page of a query into the staging table.
+    
+    Pages are claimed in offset order by the fetcher threads. A page shorter
+    than `limit` marks the end; pages after it are not requested, except by
+    workers that had already claimed them.
+    
+    Args:
+        staging: StagingTable, already created
+        check: DataQualityCheck updated with every page; its
+            duplicate_keys are counted on the staging table once every
+            page is written
+        base_url: Resource URL
+        params: Query parameters without $limit and $offset (see socrata.window_params)
+        limit: Records per page
+        workers: Concurrent fetcher threads
+        queue_size: Pages that may wait for the writer before fetchers block
+        max_retries: Retries per page on 429/5xx responses
+        page_format: API response format, 'json' or 'csv'
+    
+    Returns:
+        dict with pages, rows, fetch_s (fetching and decoding, summed over
+        workers), write_s and wall_s
+    
+    Raises:
+        Exception: The first error of a fetcher or the writer
+    """
+    pages = queue.Queue(maxsize=queue_size)
+    abort = threading.Event()
+    lock = threading.Lock()
+    state = {'next_page': 0, 'last_page': None, 'fetch_s': 0.0}
+    errors = []
+    
+    def fetcher():
+        try:
+            while not abort.is_set():
+                with lock:
+                    page = state['next_page']
+                    if state['last_page'] is not None and page > state['last_page']:
+                        break
+                    state['next_page'] += 1
+                start = time.perf_counter()
+                page_params = dict(params, **{"$limit": limit, "$offset": page * limit})
+                data = get_decoded_page(base_url, page_params, page_format, max_retries)
+                with lock:
+                    state['fetch_s'] += time.perf_counter() - start
+                    if len(data) < limit and (state['last_page'] is None or page < state['last_page']):
+                        state['last_page'] = page
+                if len(data) and not _put(pages, (page, data), abort):
+                    break
+        except Exception as e:
+            errors.append(e)
+            abort.set()
+        finally:
+            _put(pages, None, abort)
+    
+    started = time.perf_counter()
+    threads = [threading.Thread(target=fetcher, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    
+    write_s = 0.0
+    page_count = 0
+    finished = 0
+    try:
+        while finished < workers and not abort.is_set():
+            try:
+                item = pages.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is None:
+                finished += 1
+                continue
+            page, data = item
+            start = time.perf_counter()
+            batch = prepare_page(data, page)
+            check.update(batch)
+            staging.write(batch)
+            write_s += time.perf_counter() - start
+            page_count += 1
+            print(f"Staged page {page + 1} ({len(batch):,} records, total: {staging.rows:,}, "
+                  f"queued: {pages.qsize()})")
+    except BaseException:
+        abort.set()
+        raise
+    finally:
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+    check.duplicate_keys = staging.duplicate_keys()
+    
+    return {
+        'pages': page_count,
+        'rows': staging.rows,
+        'fetch_s': state['fetch_s'],
+        'write_s': write_s,
+        'wall_s': time.perf_counter() - started,
+    }
@@ -0,0 +1,276 @@
+"""
+Seeded synthetic NYC 311 data for tests and benchmarks.
+
+Rows have the same fields and string formats as scripts/fetch_311.py
+output, with skewed complaint/agency mixes, heavy-tailed resolution times,
+open requests, duplicate keys and a share of dirty values. Data is produced
+in fixed-size batches, so any volume can be written without holding it all
+in memory.
+"""
+import os
+import numpy as np
+import pandas as pd
+from src.transform import RAW_COLUMNS
+
+
+# complaint_type -> (agency, descriptors, median resolution hours)
+COMPLAINT_TYPES = {
+    "Noise - Residential": ("NYPD", ["Loud Music/Party", "Banging/Pounding", "Loud Talking"], 2.0),
+    "Illegal Parking": ("NYPD", ["Blocked Hydrant", "Double Parked Blocking Traffic", "Posted Parking Sign Violation"], 3.0),
+    "HEAT/HOT WATER": ("HPD", ["ENTIRE BUILDING", "APARTMENT ONLY"], 60.0),
+    "Blocked Driveway": ("NYPD", ["No Access", "Partial Access"], 2.5),
+    "Noise - Street/Sidewalk": ("NYPD", ["Loud Music/Party", "Loud Talking"], 2.0),
+    "UNSANITARY CONDITION": ("HPD", ["PESTS", "MOLD", "GARBAGE"], 240.0),
+    "Street Condition": ("DOT", ["Pothole", "Cave-in", "Defective Hardware"], 72.0),
+    "Noise - Vehicle": ("NYPD", ["Car/Truck Music", "Engine Idling"], 2.0),
+    "Water System": ("DEP", ["Hydrant Running", "No Water (WNW)", "Leak (Use Comments) (WA2)"], 24.0),
+    "Dirty Condition": ("DSNY", ["Trash", "Litter", "Dumping"], 48.0),
+    "Abandoned Vehicle": ("NYPD", ["With License Plate", "No License Plate"], 6.0),
+    "Sanitation Condition": ("DSNY", ["Garbage", "Recycling"], 48.0),
+    "PLUMBING": ("HPD", ["WATER SUPPLY", "LEAKY FAUCET", "TOILET"], 200.0),
+    "Street Light Condition": ("DOT", ["Street Light Out", "Lamppost Damaged"], 120.0),
+    "Rodent": ("DOHMH", ["Rat Sighting", "Mouse Sighting"], 300.0),
+    "Sewer": ("DEP", ["Sewer Backup (Use Comments) (SA)", "Catch Basin Clogged/Flooding (Use Comments) (SC)"], 18.0),
+    "Noise - Commercial": ("NYPD", ["Loud Music/Party", "Banging/Pounding"], 2.0),
+    "Traffic Signal Condition": ("DOT", ["Controller", "Ped Flasher"], 4.0),
+    "Damaged Tree": ("DPR", ["Branch Cracked and Will Fall", "Tree Leaning/Uprooted"], 150.0),
+    "Building/Use": ("DOB", ["Illegal Conversion Of Residential Building/Space"], 400.0),
+    "Noise": ("DEP", ["Noise: Construction Before/After Hours (NM1)", "Noise: Jack Hammering (NC2)"], 96.0),
+    "Graffiti": ("DSNY", ["Graffiti"], 500.0),
+    "Homeless Person Assistance": ("DHS", ["Chronic", "Non-Chronic"], 1.5),
+    "Consumer Complaint": ("DCWP", ["Overcharge", "False Advertising"], 700.0),
+    "Taxi Complaint": ("TLC", ["Driver Complaint - Passenger", "Insurance Information Requested"], 900.0),
+}
+
+# borough -> (share, lat, lon, zip range)
+BOROUGHS = {
+    "BROOKLYN": (0.30, 40.650, -73.950, (11201, 11256)),
+    "QUEENS": (0.25, 40.728, -73.795, (11101, 11697)),
+    "MANHATTAN": (0.21, 40.776, -73.971, (10001, 10282)),
+    "BRONX": (0.19, 40.845, -73.865, (10451, 10475)),
+    "STATEN ISLAND": (0.04, 40.579, -74.151, (10301, 10314)),
+    "Unspecified": (0.01, 40.712, -73.960, (10001, 11697)),
+}
+
+# Hour-of-day weights: quiet overnight, peaks in the morning and evening
+HOUR_WEIGHTS = np.array([
+    3, 2, 1.5, 1, 1, 1.5, 3, 5, 7, 8, 8, 7,
+    7, 7, 7, 7, 7, 7, 7, 7, 7, 6, 5, 4
+], dtype=float)
+
+
+class SyntheticConfig:
+    """
+    Knobs for the generated data. Rates are fractions of rows.
+    """
+    
+    def __init__(self, start="2025-01-01", days=30, open_rate=0.2, duplicate_rate=0.005,
+                 dirty_rate=0.01, zipf_exponent=1.1, first_key=60_000_000):
+        self.start = pd.Timestamp(start)
+        self.days = days
+        self.open_rate = open_rate
+        self.duplicate_rate = duplicate_rate
+        self.dirty_rate = dirty_rate
+        self.zipf_exponent = zipf_exponent
+        self.first_key = first_key
+
+
+def _socrata_timestamps(values):
+    """
+    Format datetime64 values like the Socrata API ('2025-01-01T08:30:00.000').
+    """
+    text = np.datetime_as_string(values.astype("datetime64[ms]"), unit="ms")
+    return np.where(np.isnat(values), None, text)
+
+
+def generate_batch(n_rows, rng, config, first_key):
+    """
+    Generate one batch of synthetic rows.
+    
+    Args:
+        n_rows: Rows in the batch
+        rng: numpy Generator
+        config: SyntheticConfig
+        first_key: unique_key of the first row
+    
+    Returns:
+        pandas DataFrame with the raw columns, formatted like fetched data
+    """
+    types = list(COMPLAINT_TYPES)
+    ranks = np.arange(1, len(types) + 1)
+    type_weights = ranks ** -config.zipf_exponent
+    type_idx = rng.choice(len(types), size=n_rows, p=type_weights / type_weights.sum())
+    
+    agencies = np.array([COMPLAINT_TYPES[t][0] for t in types], dtype=object)[type_idx]
+    median_hours = np.array([COMPLAINT_TYPES[t][2] for t in types])[type_idx]
+    complaint_types = np.array(types, dtype=object)[type_idx]
+    
+    descriptors = np.empty(n_rows, dtype=object)
+    for i, complaint_type in enumerate(types):
+        rows = type_idx == i
+        options = COMPLAINT_TYPES[complaint_type][1]
+        descriptors[rows] = np.array(options, dtype=object)[rng.integers(0, len(options), rows.sum())]
+    
+    borough_names = list(BOROUGHS)
+    shares = np.array([BOROUGHS[b][0] for b in borough_names])
+    borough_idx = rng.choice(len(borough_names), size=n_rows, p=shares / shares.sum())
+    boroughs = np.array(borough_names, dtype=object)[borough_idx]
+    lat = np.array([BOROUGHS[b][1] for b in borough_names])[borough_idx] + rng.normal(0, 0.03, n_rows)
+    lon = np.array([BOROUGHS[b][2] for b in borough_names])[borough_idx] + rng.normal(0, 0.03, n_rows)
+    zip_low = np.array([BOROUGHS[b][3][0] for b in borough_names])[borough_idx]
+    zip_high = np.array([BOROUGHS[b][3][1] for b in borough_names])[borough_idx]
+    zips = rng.integers(zip_low, zip_high + 1).astype(str).astype(object)
+    
+    day = rng.integers(0, config.days, n_rows)
+    hour = rng.choice(24, size=n_rows, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+    seconds = day * 86400 + hour * 3600 + rng.integers(0, 3600, n_rows)
+    created = np.datetime64(config.start.to_datetime64(), "s") + seconds.astype("timedelta64[s]")
+    
+    # Log-normal resolution times around each complaint type's median (heavy right tail)
+    hours = median_hours * rng.lognormal(0.0, 1.2, n_rows)
+    closed = created + (hours * 3600).astype("int64").astype("timedelta64[s]")
+    is_open = rng.random(n_rows) < config.open_rate
+    closed = np.where(is_open, np.datetime64("NaT"), closed).astype("datetime64[s]")
+    status = np.where(is_open, rng.choice(["Open", "In Progress", "Assigned"], n_rows), "Closed").astype(object)
+    
+    keys = first_key + np.arange(n_rows, dtype=np.int64)
+    
+    df = pd.DataFrame({
+        "unique_key": keys,
+        "created_date": _socrata_timestamps(created),
+        "closed_date": _socrata_timestamps(closed),
+        "agency": agencies,
+        "complaint_type": complaint_types,
+        "descriptor": descriptors,
+        "status": status,
+        "borough": boroughs,
+        "incident_zip": zips,
+        "city": boroughs.copy(),
+        "latitude": lat.round(6),
+        "longitude": lon.round(6),
+    })
+    _make_dirty(df, rng, config, created)
+    _add_duplicates(df, rng, config)
+    return df[RAW_COLUMNS]
+
+
+def _make_dirty(df, rng, config, created):
+    """
+    Inject the kinds of problems seen in real fetches, each on ~dirty_rate of rows.
+    """
+    n_rows = len(df)
+    
+    def pick():
+        return rng.random(n_rows) < config.dirty_rate
+    
+    rows = pick()
+    df.loc[rows, "borough"] = df.loc[rows, "borough"].str.lower()
+    df.loc[pick(), ["latitude", "longitude"]] = np.nan
+    rows = pick()
+    df.loc[rows, "latitude"] = df.loc[rows, "latitude"] + 5.0
+    df.loc[pick(), "city"] = None
+    df.loc[pick(), "descriptor"] = None
+    df.loc[pick(), "incident_zip"] = None
+    
+    # Closed a little before it was created
+    rows = pick() & df["closed_date"].notna().to_numpy()
+    early = created[rows] - rng.integers(60, 86400, rows.sum()).astype("timedelta64[s]")
+    df.loc[rows, "closed_date"] = _socrata_timestamps(early)
+    
+    # A handful of rows with no created_date at all
+    df.loc[rng.random(n_rows) < config.dirty_rate / 20, "created_date"] = None
+
+
+def _add_duplicates(df, rng, config):
+    """
+    Re-use the key of the preceding row on ~duplicate_rate of rows, as a re-fetched
+    record would. Keys stay in non-decreasing order, like a fetch ordered by unique_key.
+    """
+    rows = np.flatnonzero(rng.random(len(df)) < config.duplicate_rate)
+    rows = rows[rows > 0]
+    keys = df["unique_key"].to_numpy().copy()
+    keys[rows] = keys[rows - 1]
+    df["unique_key"] = keys
+
+
+def generate_batches(n_rows, seed=0, batch_size=100_000, config=None):
+    """
+    Yield synthetic batches totalling n_rows.
+    
+    The same (n_rows, seed, batch_size, config) always yields the same data.
+    
+    Args:
+        n_rows: Total rows to generate
+        seed: Random seed
+        batch_size: Rows per batch
+        config: SyntheticConfig (default: SyntheticConfig())
+    
+    Yields:
+        pandas DataFrame
+    """
+    config = config or SyntheticConfig()
+    rng = np.random.default_rng(seed)
+    generated = 0
+    while generated < n_rows:
+        size = min(batch_size, n_rows - generated)
+        yield generate_batch(size, rng, config, config.first_key + generated)
+        generated += size
+
+
+def generate_dataframe(n_rows, seed=0, config=None):
+    """
+    Generate a single in-memory DataFrame (for small test datasets).
+    
+    Args:
+        n_rows: Rows to generate
+        seed: Random seed
+        config: SyntheticConfig (default: SyntheticConfig())
+    
+    Returns:
+        pandas DataFrame
+    """
+    return pd.concat(list(generate_batches(n_rows, seed=seed, config=config)), ignore_index=True)
+
+
+def write_synthetic(path, n_rows, seed=0, batch_size=100_000, config=None):
+    """
+    Write synthetic data to CSV or Parquet one batch at a time.
+    
+    Args:
+        path: Output path ending in .csv or .parquet
+        n_rows: Total rows to write
+        seed: Random seed
+        batch_size: Rows per batch (bounds memory use)
+        config: SyntheticConfig (default: SyntheticConfig())
+    
+    Returns:
+        int: Rows written
+    """
+    out_dir = os.path.dirname(path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    
+    written = 0
+    if path.endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        # Fixed schema so a batch where a column happens to be all-null still matches
+        schema = pa.schema([
+            (column, pa.int64() if column == "unique_key"
+             else pa.float64() if column in ("latitude", "longitude")
+             else pa.string())
+            for column in RAW_COLUMNS
+        ])
+        writer = pq.ParquetWriter(path, schema)
+        try:
+            for batch in generate_batches(n_rows, seed, batch_size, config):
+                writer.write_table(pa.Table.from_pandas(batch, schema=schema, preserve_index=False))
+                written += len(batch)
+        finally:
+            writer.close()
+        return written
+    
+    for batch in generate_batches(n_rows, seed, batch_size, config):
+        batch.to_csv(path, mode="w" if written == 0 else "a", header=written == 0, index=False)
+        written += len(batch)
+    return written
@@ -0,0 +1,123 @@
+"""
+Adaptive resolution for the dashboard's trend charts.
+
+A trend over a few days is worth drawing per hour, one over years per week
+or month. choose_bucket() picks the finest bucket that keeps a date range
+within a point budget (TREND_MAX_POINTS), and the trend queries group by
+it in the database, so the page never receives more rows than it draws.
+
+Series that are still longer than the budget (a fixed daily grain, such as
+the backlog snapshots, or a range longer than the coarsest bucket allows)
+are reduced with largest-triangle-three-buckets (LTTB). LTTB keeps the
+first and last points and, from each of max_points - 2 equal slices of the
+series, the point that forms the largest triangle with the previous kept
+point and the next slice's average. Peaks and dips survive, unlike with
+averaging or taking every n-th point.
+"""
+import numpy as np
+import pandas as pd
+
+
+# Finest first; each is a unit of the SQL date_trunc() function
+BUCKETS = {
+    'hour': pd.Timedelta(hours=1),
+    'day': pd.Timedelta(days=1),
+    'week': pd.Timedelta(weeks=1),
+    'month': pd.Timedelta(days=30.44),
+}
+
+
+def choose_bucket(start, end, max_points, finest='hour'):
+    """
+    Pick the finest time bucket that splits a date range into at most
+    max_points buckets.
+    
+    Args:
+        start: Inclusive start of the range
+        end: Exclusive end of the range
+        max_points: Point budget; 0 or None returns `finest`
+        finest: Finest bucket the data has
+    
+    Returns:
+        str: 'hour', 'day', 'week' or 'month' (the coarsest if none fits)
+    """
+    units = list(BUCKETS)
+    candidates = units[units.index(finest):]
+    if not max_points:
+        return candidates[0]
+    span = pd.Timestamp(end) - pd.Timestamp(start)
+    for unit in candidates:
+        if span / BUCKETS[unit] <= max_points:
+            return unit
+    return candidates[-1]
+
+
+def lttb(x, y, max_points):
+    """
+    Select the points of a series that largest-triangle-three-buckets keeps.
+    
+    Args:
+        x: Sorted x values (numbers, datetimes or dates)
+        y: y values; NaN counts as 0 when comparing triangles
+        max_points: Number of points to keep (at least 3)
+    
+    Returns:
+        numpy int array: Positions of the kept points, ascending
+    """
+    n = len(y)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+    x = np.asarray(x)
+    if x.dtype == object:
+        # datetime.date values, e.g. DATE columns read through the driver
+        x = pd.to_datetime(x).to_numpy()
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype('datetime64[ns]').astype(np.int64)
+    x = x.astype(np.float64)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    
+    # Slice edges: slice i covers positions edges[i]:edges[i + 1], with the
+    # first and last point kept outside the slices
+    edges = (np.arange(max_points - 1) * (n - 2) / (max_points - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    kept = np.empty(max_points, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = n - 1
+    previous = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[hi:edges[i + 2]].mean()
+            next_y = y[hi:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Twice the triangle areas; the factor does not change the argmax
+        areas = np.abs(
+            (x[previous] - next_x) * (y[lo:hi] - y[previous])
+            - (x[previous] - x[lo:hi]) * (next_y - y[previous])
+        )
+        previous = lo + int(np.argmax(areas))
+        kept[i + 1] = previous
+    return kept
+
+
+def downsample(df, x, y, max_points):
+    """
+    Reduce a DataFrame time series to at most max_points rows with LTTB.
+    
+    Rows are chosen on one column; with several series (e.g. stacked
+    areas) pass their total, and every column keeps the chosen rows.
+    
+    Args:
+        df: DataFrame sorted by x
+        x: Time column
+        y: Column the rows are chosen on
+        max_points: Row budget; 0 or None keeps every row
+    
+    Returns:
+        pandas DataFrame (df itself when it already fits)
+    """
+    if not max_points or len(df) <= max_points:
+        return df
+    kept = df.iloc[lttb(df[x].to_numpy(), df[y].to_numpy(), max(int(max_points), 3))]
+    return kept.reset_index(drop=True)
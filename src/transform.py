@@ -0,0 +1,80 @@
+"""
+Vectorized transforms that mirror sql/schema/03_create_core_311.sql.
+
+The functions here apply the core cleaning rules to a pandas DataFrame
+(a full fetch or a single page batch) so the same logic is available
+outside the database. Keep them in sync with the SQL file.
+"""
+import numpy as np
+import pandas as pd
+
+
+RAW_COLUMNS = [
+    "unique_key", "created_date", "closed_date", "agency",
+    "complaint_type", "descriptor", "status", "borough",
+    "incident_zip", "city", "latitude", "longitude"
+]
+CORE_COLUMNS = RAW_COLUMNS + ["resolution_hours"]
+
+
+def coerce_raw_types(df):
+    """
+    Cast a fetched batch to the types of raw.nyc311_requests.
+    
+    Socrata returns every field as a string; unparseable values become
+    NaT/NaN, matching how the loader treats them.
+    
+    Args:
+        df: DataFrame with the raw columns
+    
+    Returns:
+        pandas DataFrame (new object) with typed columns
+    """
+    out = df[RAW_COLUMNS].copy()
+    out["unique_key"] = pd.to_numeric(out["unique_key"], errors="coerce").astype("Int64")
+    out["created_date"] = pd.to_datetime(out["created_date"], errors="coerce")
+    out["closed_date"] = pd.to_datetime(out["closed_date"], errors="coerce")
+    out["latitude"] = pd.to_numeric(out["latitude"], errors="coerce").astype("float64")
+    out["longitude"] = pd.to_numeric(out["longitude"], errors="coerce").astype("float64")
+    return out
+
+
+def resolution_hours(created_date, closed_date):
+    """
+    Hours between creation and closure, NaN while a request is open.
+    
+    Equivalent to EXTRACT(EPOCH FROM (closed_date - created_date)) / 3600.0.
+    
+    Args:
+        created_date: datetime64 Series
+        closed_date: datetime64 Series
+    
+    Returns:
+        float64 Series
+    """
+    delta = (closed_date - created_date).to_numpy(dtype="timedelta64[us]")
+    hours = delta.astype("int64") / 3_600_000_000.0
+    hours[np.isnat(delta)] = np.nan
+    return pd.Series(hours, index=created_date.index, name="resolution_hours")
+
+
+def clean_requests(df):
+    """
+    Apply the core cleaning rules to a raw batch.
+    
+    Rules (same as core.requests_clean):
+    - drop rows with a NULL created_date
+    - UPPER(borough)
+    - resolution_hours from the closed - created epoch difference
+    
+    Args:
+        df: DataFrame with the raw columns, typed or as fetched
+    
+    Returns:
+        pandas DataFrame with CORE_COLUMNS
+    """
+    out = coerce_raw_types(df)
+    out = out[out["created_date"].notna()].reset_index(drop=True)
+    out["borough"] = out["borough"].astype("string").str.upper()
+    out["resolution_hours"] = resolution_hours(out["created_date"], out["closed_date"])
+    return out[CORE_COLUMNS]